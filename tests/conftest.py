@@ -0,0 +1,28 @@
+import struct
+import pytest
+from tools import nrbf_synth, parse_cache
+
+# Length-prefixed string, as written by the synthetic save generator
+lps = nrbf_synth._lps
+
+def make_stream(name: str = "Damage", level: int = 7) -> bytes:
+    # Hand-built stream shared by the decoder, index and diff tests. Card 1
+    # (level 4) names string 3 and points at card 5 through a reference;
+    # card 5 reuses the layout via ClassWithId.
+    data = b"\x00" + struct.pack("<iiii", 1, -1, 1, 0)
+    data += b"\x0c" + struct.pack("<i", 2) + lps("Assembly-CSharp")
+    data += b"\x05" + struct.pack("<i", 1) + lps("Card") + struct.pack("<i", 3)
+    data += lps("level") + lps("name") + lps("next")
+    data += bytes([0, 1, 2]) + bytes([8])
+    data += struct.pack("<i", 2)
+    data += struct.pack("<i", 4) + b"\x06" + struct.pack("<i", 3) + lps(name) + b"\x09" + struct.pack("<i", 5)
+    data += b"\x01" + struct.pack("<ii", 5, 1)
+    data += struct.pack("<i", level) + b"\x0d\x02"
+    data += b"\x0b"
+    return data
+
+@pytest.fixture(autouse=True)
+def isolated_parse_cache(tmp_path, monkeypatch):
+    # The CLIs cache by default; keep every test (and the subprocesses it
+    # starts, which inherit the environment) out of ~/.cache
+    monkeypatch.setenv(parse_cache.CACHE_ENV, str(tmp_path / "parse-cache"))
@@ -0,0 +1,95 @@
+import os, asyncio, gzip, json, shutil, subprocess, sys
+from tools import ingest_service
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "tools", "sample_data", "playerInfo.dat")
+
+def test_dropbox_once_runs_every_stage(tmp_path):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    shutil.copy(SAMPLE, inbox / "alice.dat")
+    with open(SAMPLE, "rb") as f:
+        (inbox / "bob.dat.gz").write_bytes(gzip.compress(f.read()))
+    (inbox / "carol.json").write_text(json.dumps({"coins": 7}), encoding="utf-8")
+    (inbox / "dave.dat").write_bytes(b"\x1f\x8bnot really gzip")
+    out_dir = tmp_path / "out"
+    proc = subprocess.run([sys.executable, "-m", "tools.ingest_service", "--inbox", str(inbox), "--out", str(out_dir),
+                           "--once", "--queue-size", "1", "--decode-workers", "2"], capture_output=True, text=True)
+    assert proc.returncode == 1
+    bob = json.loads((out_dir / "bob" / "playerInfo.json").read_text(encoding="utf-8"))
+    assert bob["_meta"]["method"] == "gzip_binaryformatter_v13"
+    assert bob["_meta"]["route"] == "gzip+nrbf"
+    assert set(bob["_meta"]["ingest"]) == {"read", "sniff", "decode"}
+    carol = json.loads((out_dir / "carol" / "playerInfo.json").read_text(encoding="utf-8"))
+    assert carol["currencies"] == {"coins": 7}
+    assert sorted(os.listdir(inbox / ".done")) == ["alice.dat", "bob.dat.gz", "carol.json"]
+    assert os.listdir(inbox / ".failed") == ["dave.dat"]
+    metrics = json.loads((out_dir / ingest_service.METRICS_NAME).read_text(encoding="utf-8"))
+    assert metrics["stages"]["read"]["processed"] == 4
+    assert metrics["stages"]["sniff"]["failed"] == 1
+    assert metrics["stages"]["write"]["processed"] == 3
+    assert metrics["stages"]["decode"]["capacity"] == 1
+    assert metrics["errors"][0]["name"] == "dave"
+
+def test_socket_uploads_and_stats(tmp_path):
+    async def scenario():
+        service = ingest_service.IngestService(str(tmp_path / "out"), queue_size=2, read_workers=2, decode_workers=1)
+        service.start()
+        sock = str(tmp_path / "ingest.sock")
+        server = await service.serve_socket(sock)
+        with open(SAMPLE, "rb") as f:
+            data = f.read()
+        replies = await asyncio.gather(*(ingest_service.upload(sock, f"p{i}.dat", data) for i in range(4)))
+        bad = await ingest_service.upload(sock, "../escape.dat", data)
+        await service.drain()
+        stats = await ingest_service.query_stats(sock)
+        server.close()
+        await server.wait_closed()
+        await service.close()
+        return replies, bad, stats
+    replies, bad, stats = asyncio.run(scenario())
+    assert replies == ["queued"] * 4
+    assert bad.startswith("error")
+    assert stats["stages"]["write"]["processed"] == 4
+    assert all(stage["depth"] == 0 and stage["in_flight"] == 0 for stage in stats["stages"].values())
+    result = json.loads((tmp_path / "out" / "p3" / "playerInfo.json").read_text(encoding="utf-8"))
+    assert result["_meta"]["method"] == "binaryformatter_v13"
+
+def test_socket_slow_chunked_upload_and_cut_off_save(tmp_path):
+    async def send_slowly(sock, name, data, chunk=16 << 10):
+        reader, writer = await asyncio.open_unix_connection(sock)
+        writer.write(name.encode("utf-8") + b"\n")
+        for i in range(0, len(data), chunk):
+            writer.write(data[i:i + chunk])
+            await writer.drain()
+            await asyncio.sleep(0.02)
+        writer.write_eof()
+        reply = await reader.readline()
+        writer.close()
+        await writer.wait_closed()
+        return reply.decode("utf-8").strip()
+
+    async def scenario():
+        service = ingest_service.IngestService(str(tmp_path / "out"), queue_size=2, read_workers=2, decode_workers=1)
+        service.start()
+        sock = str(tmp_path / "ingest.sock")
+        server = await service.serve_socket(sock, max_upload=200 << 10)
+        with open(SAMPLE, "rb") as f:
+            data = f.read()
+        replies = [await send_slowly(sock, "slow.dat", data),
+                   await send_slowly(sock, "cut.dat", data[:len(data) // 2]),
+                   await send_slowly(sock, "big.dat", data * 2)]
+        await service.drain()
+        stats = service.stats()
+        server.close()
+        await server.wait_closed()
+        await service.close()
+        return replies, stats
+    replies, stats = asyncio.run(scenario())
+    assert replies == ["queued", "queued", "error: upload too large"]
+    result = json.loads((tmp_path / "out" / "slow" / "playerInfo.json").read_text(encoding="utf-8"))
+    assert result["_meta"]["nrbf"]["offset_last"] == os.path.getsize(SAMPLE)
+    assert "skipped" not in result["_meta"]["nrbf"]
+    # The half save is a failed decode, not a written result
+    assert not (tmp_path / "out" / "cut").exists()
+    assert stats["stages"]["decode"]["failed"] == 1 and stats["stages"]["write"]["processed"] == 1
+    assert "incomplete save" in stats["errors"][0]["error"]
@@ -0,0 +1,32 @@
+import json, pytest
+from tools import key_classifier
+
+def test_default_rules_keep_first_match_order():
+    classify = key_classifier.default_classifier()
+    assert classify("Coins") == "currencies"
+    assert classify("towerHealth") == "towers" and classify("towerHealthMax") == "_raw"
+    # "module" occurs first in the key, but the card rule comes first in the file
+    assert classify("moduleCardSlots") == "cards"
+    assert classify("highestLabLevel") == "labs"
+    assert classify("workshopCoins") == "workshop_upgrades"
+    assert classify("gameSpeedMemory") == "_raw"
+    assert "currencies" in classify.categories
+
+def test_results_are_memoised_per_key(tmp_path):
+    rules = tmp_path / "rules.json"
+    rules.write_text(json.dumps([
+        {"category": "gems", "match": "exact", "names": ["gems"]},
+        {"category": "stones", "match": "contains", "names": ["stone", "rock"]},
+    ]), encoding="utf-8")
+    classify = key_classifier.KeyClassifier(key_classifier.load_rules(str(rules)), default="other")
+    keys = ["GEMS", "eliteStones", "bedrock", "gemstone", "gem"] * 100
+    assert [classify(k) for k in keys[:5]] == ["gems", "stones", "stones", "stones", "other"]
+    for k in keys:
+        classify(k)
+    assert classify.cache_size() == 5
+
+def test_bad_rules_file_is_rejected(tmp_path):
+    rules = tmp_path / "rules.json"
+    rules.write_text(json.dumps([{"category": "gems", "match": "prefix", "names": ["gem"]}]), encoding="utf-8")
+    with pytest.raises(ValueError, match="rule 0"):
+        key_classifier.load_rules(str(rules))
@@ -0,0 +1,220 @@
+import array, bisect, io, json, os, struct, pytest
+from tools import nrbf, nrbf_index
+from conftest import lps, make_stream
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "tools", "sample_data", "playerInfo.dat")
+
+def test_decode_hand_built_stream():
+    result = nrbf.decode(make_stream())
+    assert "error" not in result
+    first, second = result["objects"]
+    assert first["class"] == "Card" and first["library"] == "Assembly-CSharp"
+    assert first["members"] == {"level": 4, "name": "Damage", "next": {"$ref": 5}}
+    assert second["type"] == "ClassWithId"
+    assert second["members"] == {"level": 7, "name": None, "next": None}
+    assert result["strings"] == {3: "Damage"}
+    assert result["records"][-1]["type"] == "MessageEnd"
+
+def test_unknown_record_stops_without_resync():
+    data = make_stream()[:-1] + b"\x63" + b"\x00" * 100
+    result = nrbf.decode(data)
+    assert "unknown record type 99" in result["error"]
+    assert result["record_summary"]["ClassWithId"] == 1
+    assert len(result["records"]) == 3
+
+def test_decode_sample_single_pass():
+    with open(SAMPLE, "rb") as f:
+        data = f.read()
+    result = nrbf.decode(data)
+    assert "error" not in result
+    assert result["offset_last"] == len(data)
+    root = result["records"][1]
+    assert root["class"] == "SaveLoad+PlayerData"
+    assert isinstance(root["members"]["coins"], float)
+
+def test_member_primitive_typed_values():
+    data = b"\x08\x09" + struct.pack("<q", -2**40)
+    data += b"\x08\x06" + struct.pack("<d", 1.5)
+    data += b"\x08\x0d" + struct.pack("<Q", (1 << 62) | 637864856103696200)
+    data += b"\x08\x03" + "é".encode("utf-8")
+    data += b"\x08\x05" + lps("12.50")
+    data += b"\x08\x10" + struct.pack("<Q", 2**64 - 1)
+    result = nrbf.decode(data)
+    assert "error" not in result
+    assert [rec["value"] for rec in result["records"]] == [-2**40, 1.5, 637864856103696200, "é", "12.50", 2**64 - 1]
+
+def test_zero_copy_strings_are_lazy_spans():
+    with open(SAMPLE, "rb") as f:
+        data = f.read()
+    eager = nrbf.decode(data)
+    lazy = nrbf.decode(data, zero_copy=True)
+    assert isinstance(lazy["strings"], nrbf.StringTable)
+    assert all(isinstance(span, nrbf.StringSpan) for span in lazy["strings"].spans.values())
+    assert dict(lazy["strings"]) == eager["strings"]
+    assert lazy["records"][1]["members"]["coins"] == eager["records"][1]["members"]["coins"]
+
+def test_iter_records_across_chunk_boundaries():
+    with open(SAMPLE, "rb") as f:
+        data = f.read()
+    expected = nrbf.decode(data)["records"]
+    chunks = (data[i:i + 7] for i in range(0, len(data), 7))
+    records = list(nrbf.iter_records(chunks, chunk_size=64))
+    assert [rec["type"] for rec in records] == [rec["type"] for rec in expected]
+    assert records[1]["members"] == expected[1]["members"]
+
+def test_iter_records_from_file_object_is_incremental():
+    with open(SAMPLE, "rb") as f:
+        it = nrbf.iter_records(f, chunk_size=4096)
+        assert next(it)["type"] == "SerializedStreamHeader"
+        assert f.tell() == 4096
+
+def test_iter_records_truncated_stream_raises():
+    data = make_stream()[:-6]
+    with pytest.raises(nrbf.NrbfTruncated):
+        list(nrbf.iter_records(iter([data[:20], data[20:]])))
+
+def test_decode_stream_matches_decode():
+    with open(SAMPLE, "rb") as f:
+        data = f.read()
+    whole = nrbf.decode(data, resolve_refs=True)
+    streamed = nrbf.decode_stream(io.BytesIO(data), chunk_size=4096, resolve_refs=True)
+    assert len(streamed["objects"]) == len(whole["objects"]) > 0
+    assert [obj["id"] for obj in streamed["objects"]] == [obj["id"] for obj in whole["objects"]]
+    assert streamed["strings"] == whole["strings"] and streamed["strings"]
+    assert len(streamed["records"]) == len(whole["records"])
+    assert streamed["record_summary"] == whole["record_summary"]
+    assert streamed["root_id"] == whole["root_id"] and streamed["unresolved_refs"] == whole["unresolved_refs"] == []
+
+def test_primitive_arrays_decode_in_bulk():
+    data = b"\x0f" + struct.pack("<ii", 1, 3) + b"\x08" + struct.pack("<3i", 5, -6, 7)
+    data += b"\x07" + struct.pack("<i", 2) + b"\x00" + struct.pack("<ii", 1, 2) + b"\x00\x06" + struct.pack("<2d", 0.5, 2.5)
+    data += b"\x0f" + struct.pack("<ii", 3, 2) + b"\x01" + b"\x01\x00"
+    eager = nrbf.decode(data)
+    ints, doubles, bools = (rec["values"] for rec in eager["records"])
+    assert isinstance(ints, array.array) and ints.tolist() == [5, -6, 7]
+    assert isinstance(doubles, array.array) and doubles.tolist() == [0.5, 2.5]
+    assert bools == [True, False]
+    lazy = nrbf.decode(data, zero_copy=True)
+    view = lazy["records"][0]["values"]
+    assert isinstance(view, memoryview) and view.tolist() == [5, -6, 7]
+    assert json.loads(json.dumps(lazy["records"], default=nrbf.json_default))[1]["values"] == [0.5, 2.5]
+
+def test_class_layout_cached_with_collapsed_steps():
+    result = nrbf.decode(make_stream())
+    assert result["objects"][1]["members"]["level"] == 7
+    types = [(0, 8), (0, 8), (0, 6), (0, 13), (0, 1), (1, None), (0, 11)]
+    steps = nrbf._build_steps(types, len(types))
+    assert [step[0] for step in steps] == [nrbf._STEP_FIXED, nrbf._STEP_PRIMITIVE, nrbf._STEP_FIXED, nrbf._STEP_RECORD, nrbf._STEP_FIXED]
+    assert steps[0][2] == 16
+
+def test_resolve_refs_builds_graph_in_one_pass():
+    # Root card's "next" is a forward reference to object 5, which points back at the root
+    data = b"\x00" + struct.pack("<iiii", 1, -1, 1, 0)
+    data += b"\x05" + struct.pack("<i", 1) + lps("Card") + struct.pack("<i", 2) + lps("level") + lps("next")
+    data += bytes([0, 4]) + bytes([8]) + lps("Card") + struct.pack("<i", 2) + struct.pack("<i", 2)
+    data += struct.pack("<i", 4) + b"\x09" + struct.pack("<i", 5)
+    data += b"\x01" + struct.pack("<ii", 5, 1) + struct.pack("<i", 9) + b"\x09" + struct.pack("<i", 1)
+    data += b"\x0b"
+    result = nrbf.decode(data, resolve_refs=True)
+    root = result["root"]
+    assert result["unresolved_refs"] == []
+    assert root["members"]["next"]["members"]["level"] == 9
+    assert root["members"]["next"]["members"]["next"] is root
+    assert nrbf.to_tree(root) == {"level": 4, "next": {"level": 9, "next": {"$ref": 1}}}
+    assert nrbf.decode(data)["objects"][0]["members"]["next"] == {"$ref": 5}
+
+def test_summarize_counts_without_decoding():
+    with open(SAMPLE, "rb") as f:
+        data = f.read()
+    summary = nrbf.summarize(data)
+    full = nrbf.decode(data)
+    assert summary["record_summary"] == full["record_summary"]
+    assert summary["root_id"] == full["root_id"] and summary["offset_last"] == len(data)
+    # Bytes go to the innermost record, so the per-type totals cover the stream once
+    assert sum(summary["record_bytes"].values()) == len(data)
+    classes = {}
+    for obj in full["objects"]:
+        if "class" in obj:
+            classes[obj["class"]] = classes.get(obj["class"], 0) + 1
+    assert summary["class_summary"] == classes
+
+def test_summarize_hand_built_stream():
+    summary = nrbf.summarize(make_stream())
+    assert summary["class_summary"] == {"Card": 2}
+    assert summary["record_summary"]["ObjectNullMultiple256"] == 1
+    assert summary["record_bytes"]["BinaryObjectString"] == 1 + 4 + 7
+    bad = nrbf.summarize(make_stream()[:-1] + b"\x63")
+    assert "unknown record type 99" in bad["error"] and bad["class_summary"] == {"Card": 2}
+
+def test_profile_charges_bytes_to_innermost_record():
+    with open(SAMPLE, "rb") as f:
+        data = f.read()
+    plain = nrbf.decode(data, resolve_refs=True)
+    profiled = nrbf.decode(data, resolve_refs=True, profile=True)
+    assert "profile" not in plain
+    profile = profiled["profile"]
+    assert {row["name"]: row["count"] for row in profile["records"]} == plain["record_summary"]
+    assert sum(row["bytes"] for row in profile["records"]) == len(data)
+    assert [row["ns"] for row in profile["records"]] == sorted((row["ns"] for row in profile["records"]), reverse=True)
+    assert profile["classes"][0]["count"] >= 1 and sum(row["ns"] for row in profile["records"]) == profile["ns"]
+    # Records re-read after a chunk boundary are only counted once
+    streamed = nrbf.decode_stream(io.BytesIO(data), chunk_size=256, resolve_refs=True, profile=True)["profile"]
+    key = lambda rows: sorted((row["name"], row["count"], row["bytes"]) for row in rows)
+    assert key(streamed["records"]) == key(profile["records"])
+    assert key(streamed["classes"]) == key(profile["classes"])
+
+def test_records_are_compact_and_read_like_dicts():
+    result = nrbf.decode(make_stream())
+    first, second = result["objects"]
+    assert not hasattr(first, "__dict__")
+    # Both instances share one layout; each keeps only its value tuple
+    assert first.layout is second.layout and first.fields[:2] == (4, "Damage")
+    assert type(first["members"]["next"]) is nrbf.Ref
+    assert dict(first) == {"type": "ClassWithMembersAndTypes", "id": 1, "class": "Card", "library": "Assembly-CSharp",
+                           "members": {"level": 4, "name": "Damage", "next": {"$ref": 5}}}
+    assert result["records"][0].get("root_id") == 1 and "lower_bounds" not in result["records"][0]
+    out = json.loads(json.dumps(result["records"], default=nrbf.json_default))
+    assert out[1]["members"]["next"] == {"$ref": 5}
+    assert out[-1] == {"type": "MessageEnd"}
+
+def test_recover_skips_corrupt_span_as_one_range():
+    data = make_stream()
+    at = data.index(b"\x01" + struct.pack("<ii", 5, 1))
+    # Junk that includes a false BinaryObjectString header with a bad length
+    junk = b"\xfe" * 40 + b"\x06" + struct.pack("<i", 7) + b"\xff" * 6 + b"\xee" * 4000
+    result = nrbf.decode(data[:at] + junk + data[at:], resolve_refs=True, recover=True)
+    assert result["skipped"] == [{"start": at, "end": at + len(junk), "error": "unknown record type 254 at offset %d" % at}]
+    assert "error" not in result
+    assert result["records"][-1]["type"] == "MessageEnd"
+    assert result["root"]["members"]["next"]["members"]["level"] == 7
+    assert nrbf.decode(data, recover=True)["skipped"] == []
+
+def test_recover_skips_zero_filled_region_as_one_span():
+    with open(SAMPLE, "rb") as f:
+        raw = f.read()
+    offsets = sorted(entry[0] for entry in nrbf_index.build_index(raw)["entries"].values())
+    at = offsets[bisect.bisect(offsets, len(raw) * 3 // 10)]
+    data = bytearray(raw)
+    # A torn write: 4 KB of zeros from a record boundary on
+    data[at:at + 4096] = bytes(4096)
+    result = nrbf.decode(bytes(data), resolve_refs=True, recover=True)
+    assert len(result["skipped"]) == 1
+    span = result["skipped"][0]
+    assert span["start"] == at and span["end"] >= at + 4096
+    assert "SerializedStreamHeader" in span["error"]
+    assert result["record_summary"]["SerializedStreamHeader"] == 1
+    assert result["records"][-1]["type"] == "MessageEnd"
+
+def test_scan_strings_matches_decoded_strings():
+    with open(SAMPLE, "rb") as f:
+        data = f.read()
+    found = nrbf.scan_strings(data)
+    full = nrbf.decode(data)
+    assert {k: found["strings"][k] for k in full["strings"]} == full["strings"]
+    # Anything extra is a zero-length look-alike
+    assert all(v == "" for k, v in found["strings"].items() if k not in full["strings"])
+    assert found["libraries"] == full["libraries"]
+    root = next(obj for obj in full["objects"] if obj.get("class") == "SaveLoad+PlayerData")
+    assert found["classes"]["SaveLoad+PlayerData"] == list(root["members"])
+    scanned = nrbf.scan_strings(memoryview(make_stream()))
+    assert scanned["strings"] == {3: "Damage"} and scanned["classes"] == {"Card": ["level", "name", "next"]}
@@ -0,0 +1,79 @@
+import os, struct, subprocess, sys
+from tools import nrbf_diff, nrbf_index
+from conftest import make_stream
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "tools", "sample_data", "playerInfo.dat")
+
+def patched_sample(tmp_path):
+    before = tmp_path / "before.dat"
+    after = tmp_path / "after.dat"
+    data = bytearray(open(SAMPLE, "rb").read())
+    before.write_bytes(data)
+    with nrbf_index.open_index(str(before), write=False) as idx:
+        root = idx.entries[idx.root_id]
+        slots = dict(zip(idx.members(idx.root_id), root[3]))
+        coins = idx.member(idx.root_id, "coins")
+        tiers_id = idx.member(idx.root_id, "highestCoinsEarnedThisTier", follow_refs=False)["$ref"]
+        tiers = idx.entries[tiers_id]
+    struct.pack_into("<d", data, slots["coins"], coins + 1200)
+    # ArraySinglePrimitive: type, id, length and element type precede the values
+    struct.pack_into("<d", data, tiers[0] + 10 + 8 * 3, 42.0)
+    after.write_bytes(data)
+    return before, after, coins
+
+def test_aligned_diff_reports_changed_members(tmp_path):
+    before, after, coins = patched_sample(tmp_path)
+    for save in (before, after):
+        nrbf_index.open_index(str(save)).close()
+    result = nrbf_diff.diff_saves(str(before), str(after))
+    stats = result["stats"]
+    assert stats["mode"] == "aligned" and stats["records_changed"] == 2
+    assert stats["index_rebuilt"] == [False, False]
+    changes = {c["path"]: c for c in result["changes"]}
+    assert set(changes) == {"coins", "highestCoinsEarnedThisTier[3]"}
+    assert changes["coins"]["old"] == coins and changes["coins"]["delta"] == 1200
+    assert changes["highestCoinsEarnedThisTier[3]"]["new"] == 42.0
+
+def test_cold_diff_decodes_without_building_sidecars(tmp_path):
+    before, after, _ = patched_sample(tmp_path)
+    cold = nrbf_diff.diff_saves(str(before), str(after))
+    assert cold["stats"]["mode"] == "decode"
+    assert not any(os.path.exists(nrbf_index.index_path(str(p))) for p in (before, after))
+    nrbf_index.open_index(str(before)).close()
+    warm = nrbf_diff.diff_saves(str(before), str(after))
+    assert warm["stats"]["mode"] == "aligned" and warm["stats"]["index_rebuilt"] == [False, True]
+    assert sorted(map(str, cold["changes"])) == sorted(map(str, warm["changes"]))
+
+def test_walk_diff_follows_references(tmp_path):
+    a = tmp_path / "a.dat"
+    b = tmp_path / "b.dat"
+    a.write_bytes(make_stream())
+    # A longer string shifts every later record, so the graphs are walked
+    b.write_bytes(make_stream(name="Damage+", level=9))
+    expected = [
+        {"path": "name", "old": "Damage", "new": "Damage+"},
+        {"path": "next.level", "old": 7, "new": 9, "delta": 2},
+    ]
+    assert nrbf_diff.diff_saves(str(a), str(b))["changes"] == expected
+    nrbf_index.open_index(str(b)).close()
+    result = nrbf_diff.diff_saves(str(a), str(b), write_index=False)
+    assert result["stats"]["mode"] == "walk"
+    assert result["changes"] == expected
+    assert not os.path.exists(nrbf_index.index_path(str(a)))
+
+def test_identical_saves(tmp_path):
+    a = tmp_path / "a.dat"
+    b = tmp_path / "b.dat"
+    a.write_bytes(make_stream())
+    b.write_bytes(make_stream())
+    result = nrbf_diff.diff_saves(str(a), str(b), write_index=False)
+    assert result["changes"] == [] and result["stats"]["identical_files"]
+
+def test_diff_cli(tmp_path):
+    before, after, _ = patched_sample(tmp_path)
+    out = tmp_path / "diff.json"
+    proc = subprocess.run([sys.executable, "-m", "tools.nrbf_diff", str(before), str(after), "--json", str(out)],
+                          capture_output=True, text=True)
+    assert proc.returncode == 1
+    assert "coins:" in proc.stdout and "(+1200)" in proc.stdout
+    assert "2 changed values" in proc.stdout and out.exists()
@@ -0,0 +1,69 @@
+import os, shutil, subprocess, sys
+from tools import nrbf, nrbf_index
+from conftest import make_stream
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "tools", "sample_data", "playerInfo.dat")
+
+def test_index_matches_full_decode(tmp_path):
+    save = tmp_path / "playerInfo.dat"
+    shutil.copy(SAMPLE, save)
+    full = nrbf.decode(save.read_bytes(), resolve_refs=True)
+    root = full["root"]["members"]
+    with nrbf_index.open_index(str(save)) as idx:
+        assert idx.rebuilt and idx.root_id == full["root_id"]
+        assert os.path.exists(nrbf_index.index_path(str(save)))
+        for name in ("coins", "cells", "gameSpeedMemory", "rateGameBetaBool"):
+            assert idx.member(idx.root_id, name) == root[name]
+        # References are followed through the index to the target record
+        tiers = idx.member(idx.root_id, "highestCoinsEarnedThisTier")
+        assert list(tiers["values"]) == list(root["highestCoinsEarnedThisTier"]["values"])
+        assert idx.ids("SaveLoad+PlayerData") == [idx.root_id]
+    with nrbf_index.open_index(str(save)) as idx:
+        assert not idx.rebuilt
+        assert idx.member(idx.root_id, "coins") == root["coins"]
+
+def test_class_with_id_member_loads_layout_lazily(tmp_path):
+    save = tmp_path / "cards.dat"
+    save.write_bytes(make_stream())
+    with nrbf_index.open_index(str(save)) as idx:
+        # Object 5 only names metadata 1; its layout is read on first use
+        assert idx.members(5) == ("level", "name", "next")
+        assert idx.member(5, "level") == 7
+        assert idx.member(5, "name") is None
+        assert idx.member(1, "name") == "Damage"
+        assert idx.member(1, "next")["members"]["level"] == 7
+        assert idx.member(1, "next", follow_refs=False) == {"$ref": 5}
+
+def test_stale_index_is_rebuilt(tmp_path):
+    save = tmp_path / "cards.dat"
+    data = bytearray(make_stream())
+    save.write_bytes(data)
+    nrbf_index.open_index(str(save)).close()
+    # Same size, different bytes: only the hash can tell
+    data[data.index(b"Damage")] = ord("R")
+    save.write_bytes(data)
+    assert nrbf_index.load_index(str(save), check_hash=False) is not None
+    assert nrbf_index.load_index(str(save)) is None
+    with nrbf_index.open_index(str(save)) as idx:
+        assert idx.rebuilt
+        assert idx.member(1, "name") == "Ramage"
+
+def test_unwritable_sidecar_still_opens(tmp_path):
+    save = tmp_path / "cards.dat"
+    save.write_bytes(make_stream())
+    # A folder in the sidecar's place: the swap-in fails with an OSError
+    os.mkdir(nrbf_index.index_path(str(save)))
+    with nrbf_index.open_index(str(save)) as idx:
+        assert idx.rebuilt
+        assert idx.member(1, "name") == "Damage"
+    # ...and leaves no temporary file behind
+    assert sorted(os.listdir(tmp_path)) == sorted(["cards.dat", os.path.basename(nrbf_index.index_path(str(save)))])
+
+def test_index_cli(tmp_path):
+    save = tmp_path / "playerInfo.dat"
+    shutil.copy(SAMPLE, save)
+    cmd = [sys.executable, "-m", "tools.nrbf_index", str(save), "--member", "cells"]
+    first = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    second = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    assert "Index built" in first.stdout and "Index reused" in second.stdout
+    assert "cells: 596876" in second.stdout
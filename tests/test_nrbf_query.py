@@ -0,0 +1,40 @@
+import os, shutil, subprocess, sys
+import pytest
+from tools import nrbf, nrbf_index, nrbf_query
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "tools", "sample_data", "playerInfo.dat")
+
+def test_query_through_index_matches_full_decode(tmp_path):
+    save = tmp_path / "playerInfo.dat"
+    shutil.copy(SAMPLE, save)
+    full = nrbf.decode(save.read_bytes(), resolve_refs=True)
+    root = full["root"]["members"]
+    labs = root["completedLabs"]["members"]
+    levels = [lab["members"]["Level"] for lab in labs["_items"]["values"][:labs["_size"]]]
+    with nrbf_index.open_index(str(save)) as idx:
+        assert nrbf_query.query(idx, "completedLabs[*].Level") == levels
+        assert nrbf_query.query(full, "completedLabs[*].Level") == levels
+        assert nrbf_query.query(idx, "$.completedLabs[-1].Level") == levels[-1:]
+        assert nrbf_query.query(idx, "cardLevel[2]") == [root["cardLevel"]["values"][2]]
+        assert nrbf_query.query(idx, "completedLabs[100000]") == []
+        found = dict(nrbf_query.compile_query("*Workshop*").find(idx))
+        assert found and all("Workshop" in name for name in found)
+        assert found["totalCoinsSpentWorkshop"] == root["totalCoinsSpentWorkshop"]
+        assert found == dict(nrbf_query.compile_query("*Workshop*").find(full))
+
+def test_compile_query_is_cached_and_rejects_bad_paths():
+    assert nrbf_query.compile_query("cards[*].level") is nrbf_query.compile_query("cards[*].level")
+    assert nrbf_query.query({"a": {"b": [1, 2, 3]}}, "a.b[1]") == [2]
+    assert nrbf_query.query({"ab": 1, "ac": 2, "b": 3}, "a?") == [1, 2]
+    for bad in ("cards..level", "cards.", ".cards", "cards.[0]", "cards[x]", "cards level"):
+        with pytest.raises(ValueError):
+            nrbf_query.compile_query(bad)
+
+def test_query_cli(tmp_path):
+    save = tmp_path / "playerInfo.dat"
+    shutil.copy(SAMPLE, save)
+    cmd = [sys.executable, "-m", "tools.nrbf_query", str(save), "cells", "completedLabs[0].LabNumber"]
+    out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+    assert "cells: 596876" in out
+    assert "completedLabs[0].LabNumber: " in out
+    assert os.path.exists(nrbf_index.index_path(str(save)))
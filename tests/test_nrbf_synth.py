@@ -0,0 +1,44 @@
+import json, subprocess, sys
+from tools import bench_nrbf, nrbf, nrbf_synth
+from tools import parse_playerinfo_staged_v13 as parser
+
+def test_synthetic_save_decodes_at_requested_size():
+    stats = {}
+    items = nrbf_synth.items_for_size(nrbf_synth.MIN_BYTES)
+    data = b"".join(nrbf_synth.iter_save(items, seed=3, chunk_size=4096, stats=stats))
+    assert nrbf_synth.MIN_BYTES - 200 <= len(data) <= nrbf_synth.MIN_BYTES
+    summary = nrbf.summarize(data)
+    assert "error" not in summary and summary["offset_last"] == len(data)
+    assert sum(summary["record_summary"].values()) == stats["records"]
+    assert summary["class_summary"]["CompletedLab"] == summary["class_summary"]["ModuleItem"] == items
+    # Shared names are written once and referenced afterwards
+    assert summary["record_summary"]["BinaryObjectString"] == 1 + 3 + len(nrbf_synth.LAB_NAMES) + len(nrbf_synth.MODULE_NAMES)
+    root = nrbf.to_tree(nrbf.decode(data, resolve_refs=True)["root"])
+    assert root["completedLabs"]["_size"] == items
+    assert root["completedLabs"]["_items"][len(nrbf_synth.LAB_NAMES)]["labName"] == nrbf_synth.LAB_NAMES[0]
+    assert len(root["inventory"]["_items"][5]["substats"]) == nrbf_synth.SUBSTATS
+
+def test_synthetic_save_cli_and_parse(tmp_path):
+    out = tmp_path / "synthetic.dat"
+    proc = subprocess.run([sys.executable, "-m", "tools.nrbf_synth", str(out), "--size", "150K", "--seed", "1"],
+                          capture_output=True, text=True, check=True)
+    assert "records" in proc.stdout
+    result = parser.parse_playerinfo(str(out))
+    assert result["_meta"]["method"] == "binaryformatter_v13"
+    assert "completedLabs" in result["labs"] and "coins" in result["currencies"]
+    assert nrbf_synth.parse_size("1G") == 1 << 30 and nrbf_synth.parse_size("2.5MB") == 5 << 19
+
+def test_throughput_report(tmp_path):
+    report = bench_nrbf.bench_throughput([nrbf_synth.MIN_BYTES], keep_dir=str(tmp_path))
+    assert [run["target"] for run in report["runs"]] == list(bench_nrbf.THROUGHPUT_TARGETS)
+    for run in report["runs"]:
+        assert run["ok"] and run["mb_per_sec"] > 0 and run["records_per_sec"] > 0 and run["max_rss_kb"] > 0
+    json.dumps(report)
+
+def test_diff_report(tmp_path):
+    report = bench_nrbf.bench_diff([nrbf_synth.MIN_BYTES], keep_dir=str(tmp_path))
+    run, = report["runs"]
+    assert run["changes"] == 1
+    assert run["cold"]["mode"] == "decode" and run["warm"]["mode"] == "aligned"
+    assert run["cold"]["seconds"] > 0 and run["warm"]["seconds"] > 0 and run["index_seconds"] > 0
+    json.dumps(report)
@@ -0,0 +1,54 @@
+import os, json, shutil, subprocess, sys
+from tools import parse_playerinfo_batch as batch
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "tools", "sample_data", "playerInfo.dat")
+
+def make_tree(tmp_path):
+    root = tmp_path / "saves"
+    for player in ("alice", "bob"):
+        (root / player).mkdir(parents=True)
+        shutil.copy(SAMPLE, root / player / "playerInfo.dat")
+    (root / "bob" / "notes.txt").write_text("not a save", encoding="utf-8")
+    (tmp_path / "extra.dat").write_text(json.dumps({"coins": 3}), encoding="utf-8")
+    return root
+
+def test_expand_inputs_keeps_relative_keys(tmp_path):
+    root = make_tree(tmp_path)
+    jobs = batch.expand_inputs([str(root), str(tmp_path / "*.dat")], recursive=True)
+    assert [key for _, key in jobs] == [os.path.join("alice", "playerInfo"), os.path.join("bob", "playerInfo"), "extra"]
+    # The same file name from two arguments gets its own folder
+    jobs = batch.expand_inputs([str(root / "alice" / "playerInfo.dat"), str(root / "bob" / "playerInfo.dat")])
+    assert [key for _, key in jobs] == ["playerInfo", "playerInfo~2"]
+
+def test_batch_cli_over_process_pool(tmp_path):
+    root = make_tree(tmp_path)
+    out_dir = tmp_path / "out"
+    proc = subprocess.run(
+        [sys.executable, "-m", "tools.parse_playerinfo_batch", str(root), str(tmp_path / "*.dat"), str(tmp_path / "missing.dat"),
+         "--recursive", "--workers", "2", "--chunksize", "1", "--out", str(out_dir), "--no-cache"],
+        capture_output=True, text=True)
+    assert proc.returncode == 1
+    summary = json.loads((out_dir / "summary.json").read_text(encoding="utf-8"))
+    totals = summary["totals"]
+    assert (totals["files"], totals["ok"], totals["failed"], totals["workers"]) == (4, 3, 1, 2)
+    assert totals["methods"] == {"binaryformatter_v13": 2, "json": 1}
+    rows = {row["file"]: row for row in summary["files"]}
+    assert "FileNotFoundError" in rows[str(tmp_path / "missing.dat")]["error"]
+    assert rows[str(tmp_path / "extra.dat")]["counts"]["currencies"] == 1
+    alice = json.loads((out_dir / "alice" / "playerInfo" / "playerInfo.json").read_text(encoding="utf-8"))
+    assert alice["_meta"]["method"] == "binaryformatter_v13"
+    assert (out_dir / "bob" / "playerInfo" / "playerInfo_raw.json").exists()
+
+def test_recovered_decode_is_reported_partial(tmp_path):
+    with open(SAMPLE, "rb") as f:
+        data = bytearray(f.read())
+    at = len(data) // 4
+    data[at:at + 300] = bytes(range(256)) + b"\xfe" * 44
+    save = tmp_path / "torn.dat"
+    save.write_bytes(data)
+    summary = batch.run_batch([(str(save), "torn")], {"out": str(tmp_path / "out"), "zero_copy": False, "no_cache": True,
+                                                      "cache_dir": None, "cache_max_bytes": 0})
+    (row,) = summary["files"]
+    assert "error" not in row and "corrupt spans skipped" in row["decoder_error"]
+    assert len(row["skipped"]) == 1
+    assert (summary["totals"]["ok"], summary["totals"]["partial"]) == (1, 1)
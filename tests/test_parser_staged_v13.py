@@ -0,0 +1,287 @@
+import os, json, gzip, shutil, subprocess, sys, pytest
+from tools import parse_playerinfo_staged_v13 as parser
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "tools", "sample_data", "playerInfo.dat")
+
+def make_json_file(tmp_path):
+    path = tmp_path / "test.json"
+    data = {"gold": 500, "towerHealth": 250, "cardSpeed": 1, "moduleDamage": 2}
+    path.write_text(json.dumps(data), encoding="utf-8")
+    return path
+
+def make_gzip_json_file(tmp_path):
+    path = tmp_path / "test_gzip.dat"
+    data = {"xp": 777}
+    raw = json.dumps(data).encode("utf-8")
+    compressed = gzip.compress(raw)
+    path.write_bytes(compressed)
+    return path
+
+def test_parse_json(tmp_path):
+    path = make_json_file(tmp_path)
+    result = parser.parse_playerinfo(str(path))
+    assert result["currencies"]["gold"] == 500
+    assert result["towers"]["towerHealth"] == 250
+    assert "cardSpeed" in result["cards"]
+    assert "moduleDamage" in result["modules"]
+
+def test_parse_gzip_json(tmp_path):
+    path = make_gzip_json_file(tmp_path)
+    result = parser.parse_playerinfo(str(path))
+    assert result["currencies"]["xp"] == 777
+
+def test_parse_sample_binary():
+    result = parser.parse_playerinfo(SAMPLE)
+    assert result["_meta"]["method"] == "binaryformatter_v13"
+    meta = result["_meta"]["nrbf"]
+    assert "error" not in meta and "skipped" not in meta and "truncated" not in meta
+    assert not meta["unresolved_refs"]
+    assert meta["offset_last"] == os.path.getsize(SAMPLE)
+    assert meta["record_summary"]["MessageEnd"] == 1
+    assert meta["root_class"] == "SaveLoad+PlayerData"
+    assert meta["unresolved_refs"] == []
+    assert isinstance(result["currencies"]["coins"], float)
+    assert len(result["_raw"]["highestCoinsEarnedThisTier"]) > 0
+
+def test_cli_report_creates_files(tmp_path):
+    path = make_json_file(tmp_path)
+    out_dir = tmp_path / "out"
+    os.makedirs(out_dir, exist_ok=True)
+    subprocess.run([sys.executable, "-m", "tools.parse_playerinfo_staged_v13", str(path), "--out", str(out_dir)], check=True)
+    schema_file = out_dir / "playerInfo.json"
+    raw_file = out_dir / "playerInfo_raw.json"
+    assert schema_file.exists()
+    assert raw_file.exists()
+    data = json.loads(schema_file.read_text(encoding="utf-8"))
+    counts = parser.count_schema_fields(data)
+    assert counts["currencies"] >= 1
+
+def test_cli_zero_copy_binary(tmp_path):
+    out_dir = tmp_path / "out"
+    subprocess.run([sys.executable, "-m", "tools.parse_playerinfo_staged_v13", SAMPLE, "--out", str(out_dir), "--zero-copy"], check=True)
+    eager = parser.parse_playerinfo(SAMPLE)
+    data = json.loads((out_dir / "playerInfo.json").read_text(encoding="utf-8"))
+    assert data["currencies"] == eager["currencies"]
+    assert data["_raw"]["highestCoinsEarnedThisTier"] == list(eager["_raw"]["highestCoinsEarnedThisTier"])
+
+def test_read_buffer_maps_regular_files(tmp_path):
+    path = make_json_file(tmp_path)
+    buf = parser.read_buffer(str(path))
+    assert isinstance(buf, parser.mmap.mmap)
+    buf.close()
+    assert isinstance(parser.read_buffer(str(path), use_mmap=False), bytes)
+
+def test_cli_reads_stdin(tmp_path):
+    out_dir = tmp_path / "out"
+    with open(SAMPLE, "rb") as f:
+        subprocess.run([sys.executable, "-m", "tools.parse_playerinfo_staged_v13", "-", "--out", str(out_dir)], stdin=f, check=True)
+    data = json.loads((out_dir / "playerInfo.json").read_text(encoding="utf-8"))
+    assert data["_meta"]["method"] == "binaryformatter_v13"
+
+def test_sniff_format_routes_on_magic_bytes():
+    with open(SAMPLE, "rb") as f:
+        head = f.read(64)
+    assert parser.sniff_format(head) == "nrbf"
+    assert parser.sniff_format(gzip.compress(b"{}")[:64]) == "gzip"
+    assert parser.sniff_format(parser.zlib.compress(b"{}")[:64]) == "zlib"
+    assert parser.sniff_format(b"  \n[1]") == "json"
+    assert parser.sniff_format(b"\xef\xbb\xbf{}") == "json"
+    assert parser.sniff_format(b"hello") == "unknown"
+
+def test_route_and_sniff_cost_in_meta(tmp_path):
+    path = tmp_path / "save.dat"
+    path.write_bytes(parser.zlib.compress("﻿{\"coins\": 5}".encode("utf-8")))
+    result = parser.parse_playerinfo(str(path))
+    assert result["_meta"]["method"] == "zlib_json"
+    assert result["_meta"]["route"] == "zlib+json"
+    assert result["_meta"]["sniff_ns"] > 0
+    assert result["currencies"]["coins"] == 5
+    assert parser.parse_playerinfo(SAMPLE)["_meta"]["route"] == "nrbf"
+
+def test_gzip_wrapped_nrbf_streams(tmp_path):
+    with open(SAMPLE, "rb") as f:
+        raw = f.read()
+    path = tmp_path / "playerInfo.dat.gz"
+    path.write_bytes(gzip.compress(raw))
+    result = parser.parse_playerinfo(str(path))
+    assert result["_meta"]["route"] == "gzip+nrbf"
+    assert result["_meta"]["method"] == "gzip_binaryformatter_v13"
+    assert result["_meta"]["nrbf"]["offset_last"] == len(raw)
+    assert result["currencies"] == parser.parse_playerinfo(SAMPLE)["currencies"]
+
+def test_iter_json_members_across_chunk_boundaries():
+    doc = {"coins": 12345, "name": "tøwer", "cards": [{"level": 5}] * 50, "ok": True}
+    raw = json.dumps(doc).encode("utf-8")
+    chunks = [raw[i:i + 3] for i in range(0, len(raw), 3)]
+    assert list(parser.iter_json_members(chunks)) == list(doc.items())
+    with pytest.raises(EOFError):
+        list(parser.iter_decompressed(gzip.compress(raw)[:-12], "gzip"))
+
+def test_parse_cache_hits_on_unchanged_content(tmp_path):
+    from tools import parse_cache
+    cache = parse_cache.ParseCache(str(tmp_path / "cache"))
+    save = tmp_path / "playerInfo.dat"
+    save.write_bytes(open(SAMPLE, "rb").read())
+    cold = parser.parse_playerinfo(str(save), cache=cache)
+    assert cold["_meta"]["cache"] == {"status": "miss"}
+    # Zero-copy decodes are stored as plain values and share the entry
+    warm = parser.parse_playerinfo(str(save), zero_copy=True, cache=cache)
+    assert warm["_meta"]["cache"]["status"] == "hit"
+    assert warm["currencies"] == cold["currencies"]
+    assert list(warm["_raw"]["highestCoinsEarnedThisTier"]) == list(cold["_raw"]["highestCoinsEarnedThisTier"])
+    save.write_bytes(json.dumps({"coins": 5}).encode("utf-8"))
+    assert parser.parse_playerinfo(str(save), cache=cache)["_meta"]["cache"]["status"] == "miss"
+    assert len(cache.entries()) == 2
+
+def test_parse_cache_ignores_entries_others_can_write(tmp_path):
+    from tools import parse_cache
+    cache = parse_cache.ParseCache(str(tmp_path / "cache"))
+    cache.put("k", {"coins": 5})
+    path = cache.path_for("k")
+    assert os.stat(path).st_mode & 0o777 == 0o600
+    assert cache.get("k") == {"coins": 5}
+    os.chmod(path, 0o666)
+    assert cache.get("k") is None
+
+def test_parse_cache_evicts_least_recently_used(tmp_path):
+    from tools import parse_cache
+    cache = parse_cache.ParseCache(str(tmp_path), max_bytes=1300 << 10)
+    blob = b"x" * (400 << 10)
+    for i, key in enumerate("abc"):
+        cache.put(key, blob)
+        os.utime(cache.path_for(key), ns=(i * 10**9, i * 10**9))
+    assert cache.get("a") == blob  # touched: now the most recent
+    cache.put("d", blob)
+    assert cache.get("b") is None
+    assert [cache.get(k) is not None for k in "acd"] == [True, True, True]
+
+def test_unwritable_cache_leaves_the_parse_uncached(tmp_path):
+    from tools import parse_cache
+    blocker = tmp_path / "file"
+    blocker.write_bytes(b"")
+    cache = parse_cache.ParseCache(str(blocker / "cache"))
+    assert cache.put("k", {"coins": 5}) is False
+    result = parser.parse_playerinfo(SAMPLE, cache=cache)
+    assert result["_meta"]["cache"] == {"status": "miss", "stored": False}
+    assert result["currencies"]
+    env = dict(os.environ, PLAYERINFO_CACHE_DIR=str(blocker / "cache"))
+    cmd = [sys.executable, "-m", "tools.parse_playerinfo_staged_v13", SAMPLE, "--out", str(tmp_path / "out")]
+    subprocess.run(cmd, check=True, capture_output=True, env=env)
+
+def test_cli_no_cache_and_cache_dir(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cmd = [sys.executable, "-m", "tools.parse_playerinfo_staged_v13", SAMPLE, "--out", str(tmp_path / "out"), "--cache-dir", str(cache_dir)]
+    subprocess.run(cmd + ["--no-cache"], check=True)
+    assert not cache_dir.exists()
+    subprocess.run(cmd, check=True, capture_output=True)
+    warm = subprocess.run(cmd, check=True, capture_output=True, text=True)
+    assert "served from the parse cache" in warm.stdout
+
+def test_cli_summary_only(tmp_path):
+    with open(SAMPLE, "rb") as f:
+        raw = f.read()
+    path = tmp_path / "playerInfo.dat.gz"
+    path.write_bytes(gzip.compress(raw))
+    out = tmp_path / "out"
+    proc = subprocess.run([sys.executable, "-m", "tools.parse_playerinfo_staged_v13", str(path), "--out", str(out), "--summary-only"],
+                          capture_output=True, text=True, check=True)
+    assert "ClassWithId: 2097" in proc.stdout and "CompletedLab: 755" in proc.stdout
+    summary = json.loads((out / "playerInfo_summary.json").read_text(encoding="utf-8"))
+    assert summary["route"] == "gzip+nrbf" and summary["offset_last"] == len(raw)
+    assert not (out / "playerInfo.json").exists()
+
+def test_cli_profile_report(tmp_path):
+    out = tmp_path / "out"
+    proc = subprocess.run([sys.executable, "-m", "tools.parse_playerinfo_staged_v13", SAMPLE, "--out", str(out), "--profile"],
+                          capture_output=True, text=True, check=True)
+    assert "Profile (phases):" in proc.stdout and "Profile (classes" in proc.stdout
+    profile = json.loads((out / "playerInfo_profile.json").read_text(encoding="utf-8"))
+    assert set(profile["phases"]) == {"read_ns", "sniff_ns", "decode_ns", "map_ns", "write_ns"}
+    assert profile["records"][0]["ns"] >= profile["records"][-1]["ns"]
+    meta = json.loads((out / "playerInfo.json").read_text(encoding="utf-8"))["_meta"]
+    assert meta["profile"]["classes"] == profile["classes"] and "cache" not in meta
+
+def test_corrupt_region_is_skipped_not_fatal():
+    with open(SAMPLE, "rb") as f:
+        data = bytearray(f.read())
+    at = len(data) // 4
+    data[at:at + 300] = bytes(range(256)) + b"\xfe" * 44
+    raw = parser.parse_binaryformatter(bytes(data))
+    assert "error" not in raw and raw["records"][-1]["type"] == "MessageEnd"
+    (span,) = raw["skipped"]
+    assert span["start"] <= at + 300 <= span["end"]
+    result = parser.map_playerinfo(raw, "binaryformatter_v13", {})
+    assert result["_meta"]["nrbf"]["skipped"] == [span] and result["currencies"]
+
+def test_cli_strings_only(tmp_path):
+    out = tmp_path / "out"
+    proc = subprocess.run([sys.executable, "-m", "tools.parse_playerinfo_staged_v13", SAMPLE, "--out", str(out), "--strings-only"],
+                          capture_output=True, text=True, check=True)
+    assert "UnityEngine.CoreModule, Version=0.0.0.0" in proc.stdout and "SaveLoad+PlayerData (" in proc.stdout
+    found = json.loads((out / "playerInfo_strings.json").read_text(encoding="utf-8"))
+    assert found["route"] == "nrbf" and found["strings"]["77"] == "Ikata89"
+    assert not (out / "playerInfo.json").exists()
+
+def test_watch_reparses_on_content_change_and_writes_on_result_change(tmp_path):
+    a, b = tmp_path / "alice" / "playerInfo.dat", tmp_path / "bob" / "playerInfo.dat"
+    for path in (a, b):
+        path.parent.mkdir()
+        path.write_text(json.dumps({"coins": 1, "gems": 2}), encoding="utf-8")
+    watches = parser.watch_targets([str(a), str(b), str(a)], str(tmp_path / "out"))
+    assert [w.out_dir for w in watches] == [str(tmp_path / "out" / "alice" / "playerInfo"), str(tmp_path / "out" / "bob" / "playerInfo")]
+    w = watches[0]
+    settle = 10
+    # First sight only starts the settle clock
+    assert parser.check_watch(w, 0, settle) is None
+    assert parser.check_watch(w, 5, settle) is None
+    assert "outputs written" in parser.check_watch(w, 10, settle)
+    schema = tmp_path / "out" / "alice" / "playerInfo" / "playerInfo.json"
+    written = schema.stat().st_mtime_ns
+    assert parser.check_watch(w, 20, settle) is None
+    # Same bytes rewritten: new mtime/inode, no parse
+    a.write_text(json.dumps({"coins": 1, "gems": 2}), encoding="utf-8")
+    os.utime(a, ns=(1, 1))
+    assert parser.check_watch(w, 30, settle) is None
+    assert parser.check_watch(w, 40, settle) is None
+    # Different bytes, same mapped result: parsed, outputs left alone
+    a.write_text(json.dumps({"coins": 1, "gems": 2}, indent=4), encoding="utf-8")
+    os.utime(a, ns=(2, 2))
+    assert parser.check_watch(w, 50, settle) is None
+    assert parser.check_watch(w, 60, settle) == "parsed, mapped result unchanged"
+    assert schema.stat().st_mtime_ns == written
+    a.write_text(json.dumps({"coins": 7, "gems": 2}), encoding="utf-8")
+    os.utime(a, ns=(3, 3))
+    parser.check_watch(w, 70, settle)
+    assert "outputs written" in parser.check_watch(w, 80, settle)
+    assert json.loads(schema.read_text(encoding="utf-8"))["currencies"]["coins"] == 7
+    a.unlink()
+    assert parser.check_watch(w, 90, settle) == "missing"
+
+def test_watch_keeps_outputs_of_last_good_parse(tmp_path, monkeypatch):
+    save = tmp_path / "playerInfo.dat"
+    shutil.copy(SAMPLE, save)
+    w = parser.watch_targets([str(save)], str(tmp_path / "out"))[0]
+    parser.check_watch(w, 0, 10)
+    assert "outputs written" in parser.check_watch(w, 10, 10)
+    schema = tmp_path / "out" / "playerInfo.json"
+    good = schema.read_bytes()
+    # The game stopped mid-write: the half save holds still past settle
+    with open(SAMPLE, "rb") as f:
+        save.write_bytes(f.read()[:60000])
+    os.utime(save, ns=(1, 1))
+    parser.check_watch(w, 20, 10)
+    assert parser.check_watch(w, 30, 10).startswith("incomplete save")
+    assert schema.read_bytes() == good
+    # A read that fails between stat and open is retried, not fatal
+    shutil.copy(SAMPLE, save)
+    os.utime(save, ns=(2, 2))
+    real_read = parser.read_buffer
+    def locked(path, use_mmap=True):
+        raise PermissionError(13, "locked", path)
+    monkeypatch.setattr(parser, "read_buffer", locked)
+    parser.check_watch(w, 40, 10)
+    assert parser.check_watch(w, 50, 10).startswith("read failed, retrying")
+    monkeypatch.setattr(parser, "read_buffer", real_read)
+    # Same bytes as the last good parse: nothing to do
+    assert parser.check_watch(w, 60, 10) is None
+    assert w.done_stat == w.stat
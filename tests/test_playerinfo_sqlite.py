@@ -0,0 +1,60 @@
+import os, shutil, sqlite3, subprocess, sys
+import pytest
+from tools import playerinfo_sqlite
+from tools import parse_playerinfo_staged_v13 as parser
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "tools", "sample_data", "playerInfo.dat")
+
+def fake_result(level, ticks=638928376653460000):
+    return {
+        "currencies": {"coins": 1.5, "cells": 1 << 70},
+        "cards": {"cardLevel": [level, 2], "cardFirstOpenBool": True},
+        "_raw": {"playfabID": "P1", "lastCloudSaveTime": ticks},
+        "_meta": {"method": "json"},
+    }
+
+def test_export_replaces_a_snapshot_and_keeps_history(tmp_path):
+    db = playerinfo_sqlite.connect(str(tmp_path / "h.sqlite"))
+    first = playerinfo_sqlite.export_result(db, fake_result(1))
+    assert first == {"player": "P1", "snapshot": "2025-09-07T10:27:45.346000Z", "fields": 4}
+    # Same player and save time: replaced, not duplicated
+    playerinfo_sqlite.export_result(db, fake_result(3))
+    playerinfo_sqlite.export_result(db, fake_result(5, ticks=638929000000000000))
+    history = db.execute("SELECT snapshot, json FROM cards WHERE key = 'cardLevel' ORDER BY snapshot").fetchall()
+    assert [json for _, json in history] == ["[3,2]", "[5,2]"]
+    assert db.execute("SELECT value FROM currencies WHERE key = 'cells'").fetchall() == [(str(1 << 70),)] * 2
+    assert db.execute("SELECT COUNT(*) FROM snapshots").fetchone() == (2,)
+    plan = db.execute("EXPLAIN QUERY PLAN SELECT value FROM fields WHERE category = 'cards' AND key = 'cardLevel' "
+                      "AND snapshot > '2025'").fetchall()
+    assert "fields_category_key_snapshot" in str(plan)
+    with pytest.raises(ValueError):
+        playerinfo_sqlite.export_result(db, {"cards": {"cardLevel": 1}, "_meta": {}})
+
+def test_save_ids_win_over_fallbacks(tmp_path):
+    db = playerinfo_sqlite.connect(str(tmp_path / "h.sqlite"))
+    # The save names its player and time: --player / snapshot are ignored
+    named = playerinfo_sqlite.export_result(db, fake_result(1), player="someone", snapshot="2020-01-01T00:00:00.000000Z")
+    assert (named["player"], named["snapshot"]) == ("P1", "2025-09-07T10:27:45.346000Z")
+    # A save without them takes the fallbacks, then the file's mtime
+    bare = {"cards": {"cardLevel": 1}, "_meta": {}}
+    fallback = playerinfo_sqlite.export_result(db, bare, player="someone", snapshot="2020-01-01T00:00:00.000000Z")
+    assert (fallback["player"], fallback["snapshot"]) == ("someone", "2020-01-01T00:00:00.000000Z")
+    save = tmp_path / "bare.json"
+    save.write_text("{}", encoding="utf-8")
+    os.utime(save, (0, 0))
+    assert playerinfo_sqlite.export_result(db, bare, player="someone", source=str(save))["snapshot"] == "1970-01-01T00:00:00.000000Z"
+
+def test_sample_export_matches_mapped_result(tmp_path):
+    save = tmp_path / "playerInfo.dat"
+    shutil.copy(SAMPLE, save)
+    db_path = tmp_path / "h.sqlite"
+    cmd = [sys.executable, "-m", "tools.playerinfo_sqlite", str(save), "--db", str(db_path), "--no-cache", "--player", "fallback"]
+    out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+    assert "Exported 1/1 saves" in out
+    result = parser.parse_playerinfo(str(save))
+    db = sqlite3.connect(str(db_path))
+    for category in playerinfo_sqlite.CATEGORIES:
+        keys = {key for (key,) in db.execute(f"SELECT key FROM {category}")}
+        assert keys == set(result[category])
+    assert db.execute("SELECT player, fields FROM snapshots").fetchone() == (
+        "E46F92DDF540AD0D", sum(len(result[c]) for c in playerinfo_sqlite.CATEGORIES))
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+import argparse, json, os, platform, random, struct, subprocess, sys, tempfile, time
+from typing import Dict, Any, List
+
+try:
+    from tools import nrbf, nrbf_diff, nrbf_index, nrbf_synth
+except ImportError:  # run as a script from inside tools/
+    import nrbf, nrbf_diff, nrbf_index, nrbf_synth
+
+# Fixed-size primitives mixed the way Tower saves use them
+MIXED_PRIMITIVES = (1, 2, 6, 7, 8, 9, 11, 12, 13, 14, 15, 16)
+
+def make_primitive_stream(count: int, seed: int = 0) -> bytes:
+    # [type code][value] repeated, like a run of MemberPrimitiveTyped payloads
+    rng = random.Random(seed)
+    out = bytearray()
+    for _ in range(count):
+        code = rng.choice(MIXED_PRIMITIVES)
+        out.append(code)
+        out += nrbf.PRIMITIVE_STRUCTS[code].pack(rng.randint(0, 127))
+    return bytes(out)
+
+def _decode_format_strings(data: bytes) -> int:
+    # Previous approach: format string literal + calcsize per value
+    formats = nrbf.PRIMITIVE_FORMATS
+    pos = 0
+    end = len(data)
+    n = 0
+    while pos < end:
+        code = data[pos]
+        pos += 1
+        fmt = formats[code]
+        struct.unpack_from(fmt, data, pos)[0]
+        pos += struct.calcsize(fmt)
+        n += 1
+    return n
+
+def _decode_precompiled(data: bytes) -> int:
+    # One table lookup and one bound unpack_from per value
+    table = nrbf._FIXED_PRIMITIVES
+    pos = 0
+    end = len(data)
+    n = 0
+    while pos < end:
+        unpack, size = table[data[pos]]
+        unpack(data, pos + 1)[0]
+        pos += 1 + size
+        n += 1
+    return n
+
+def _read_primitive_format_strings(r, prim_type: int):
+    fmt = nrbf.PRIMITIVE_FORMATS[prim_type]
+    size = struct.calcsize(fmt)
+    r.need(size)
+    val = struct.unpack_from(fmt, r.data, r.pos)[0]
+    r.pos += size
+    return val
+
+def _decode_reader_before(data: bytes) -> int:
+    return _decode_reader(data, _read_primitive_format_strings)
+
+def _decode_reader_after(data: bytes) -> int:
+    return _decode_reader(data, nrbf._read_primitive)
+
+def _decode_reader(data: bytes, read) -> int:
+    # Through the decoder's bounds-checked _Reader
+    r = nrbf._Reader(data)
+    end = r.end
+    n = 0
+    while r.pos < end:
+        code = data[r.pos]
+        r.pos += 1
+        read(r, code)
+        n += 1
+    return n
+
+BENCHMARKS = (
+    ("format_strings", _decode_format_strings),
+    ("precompiled", _decode_precompiled),
+    ("decoder_before", _decode_reader_before),
+    ("decoder_after", _decode_reader_after),
+)
+
+def bench_primitives(count: int = 1_000_000) -> Dict[str, Any]:
+    data = make_primitive_stream(count)
+    report = {"values": count, "bytes": len(data)}
+    for name, fn in BENCHMARKS:
+        t0 = time.perf_counter()
+        n = fn(data)
+        elapsed = time.perf_counter() - t0
+        assert n == count
+        report[name] = {"seconds": round(elapsed, 4), "values_per_sec": int(count / elapsed)}
+    report["speedup_loop"] = round(report["precompiled"]["values_per_sec"] / report["format_strings"]["values_per_sec"], 2)
+    report["speedup_decoder"] = round(report["decoder_after"]["values_per_sec"] / report["decoder_before"]["values_per_sec"], 2)
+    return report
+
+_LOAD_PROBE = """
+import json, resource, sys, time
+from tools import parse_playerinfo_staged_v13 as parser
+t0 = time.perf_counter()
+# zero_copy keeps the source buffer alive, so its pages show up in the split below
+raw, method = parser.load_file(sys.argv[1], zero_copy=True, use_mmap=sys.argv[2] == "mmap")
+elapsed = time.perf_counter() - t0
+rss = {"max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+try:
+    # Private (anonymous) vs file-backed pages: mapped save pages are the latter
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(("RssAnon:", "RssFile:")):
+                key, kb = line.split()[:2]
+                rss[key[:-1].lower() + "_kb"] = int(kb)
+except OSError:
+    pass
+print(json.dumps(dict(rss, method=method, seconds=elapsed)))
+"""
+
+def bench_load(path: str, repeat: int = 3) -> Dict[str, Any]:
+    # Each run gets a fresh interpreter so ru_maxrss reflects that path only
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    report = {"file": path, "bytes": os.path.getsize(path)}
+    for mode in ("read", "mmap"):
+        runs = []
+        for _ in range(repeat):
+            out = subprocess.run([sys.executable, "-c", _LOAD_PROBE, path, mode], cwd=root, check=True, capture_output=True, text=True)
+            runs.append(json.loads(out.stdout))
+        report[mode] = {
+            "method": runs[0]["method"],
+            "seconds": round(min(r["seconds"] for r in runs), 4),
+            "max_rss_kb": min(r["max_rss_kb"] for r in runs),
+        }
+        for key in ("rssanon_kb", "rssfile_kb"):
+            if key in runs[0]:
+                report[mode][key] = min(r[key] for r in runs)
+    return report
+
+_THROUGHPUT_PROBE = """
+import json, resource, sys, time
+from tools import parse_playerinfo_staged_v13 as parser
+path, target = sys.argv[1], sys.argv[2]
+baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if target == "parse_binaryformatter":
+    with open(path, "rb") as f:
+        data = f.read()
+    t0 = time.perf_counter()
+    result = parser.parse_binaryformatter(data)
+    # Decodes recover past corrupt data: skipped spans are failures too
+    ok = "error" not in result and not result.get("skipped")
+else:
+    t0 = time.perf_counter()
+    result = parser.parse_playerinfo(path, cache=None)
+    meta = result["_meta"].get("nrbf", {})
+    ok = "error" not in meta and not meta.get("skipped")
+elapsed = time.perf_counter() - t0
+print(json.dumps({"seconds": elapsed, "ok": ok, "baseline_kb": baseline_kb,
+                  "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+"""
+
+THROUGHPUT_TARGETS = ("parse_binaryformatter", "parse_playerinfo")
+
+def bench_throughput(sizes: List[int], repeat: int = 1, seed: int = 0, keep_dir: str = None) -> Dict[str, Any]:
+    # Decode synthetic saves of each size in fresh interpreters: seconds are
+    # the best of `repeat` runs, peak memory is ru_maxrss of that run
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "seed": seed,
+        "runs": [],
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = keep_dir or tmp
+        os.makedirs(folder, exist_ok=True)
+        for size in sizes:
+            save = nrbf_synth.write_save(os.path.join(folder, f"synthetic_{size}.dat"), size, seed)
+            for target in THROUGHPUT_TARGETS:
+                runs = []
+                for _ in range(repeat):
+                    out = subprocess.run([sys.executable, "-c", _THROUGHPUT_PROBE, save["file"], target], cwd=root,
+                                         check=True, capture_output=True, text=True)
+                    runs.append(json.loads(out.stdout))
+                best = min(runs, key=lambda r: r["seconds"])
+                report["runs"].append({
+                    "target": target,
+                    "bytes": save["bytes"],
+                    "records": save["records"],
+                    "ok": best["ok"],
+                    "seconds": round(best["seconds"], 4),
+                    "mb_per_sec": round(save["bytes"] / best["seconds"] / 1e6, 3),
+                    "records_per_sec": int(save["records"] / best["seconds"]),
+                    "max_rss_kb": best["max_rss_kb"],
+                    "peak_over_baseline_kb": best["max_rss_kb"] - best["baseline_kb"],
+                })
+    return report
+
+def bench_diff(sizes: List[int], seed: int = 0, keep_dir: str = None) -> Dict[str, Any]:
+    # Diff a synthetic save against a copy with more coins: cold (no
+    # sidecars, both decoded), the one-off cost of building both sidecars,
+    # then warm (aligned through the sidecars)
+    report = {"python": platform.python_version(), "machine": platform.machine(), "seed": seed, "runs": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = keep_dir or tmp
+        os.makedirs(folder, exist_ok=True)
+        for size in sizes:
+            before = os.path.join(folder, f"diff_{size}_before.dat")
+            after = os.path.join(folder, f"diff_{size}_after.dat")
+            save = nrbf_synth.write_save(before, size, seed)
+            with open(before, "rb") as f:
+                data = bytearray(f.read())
+            with nrbf_index.open_index(before, write=False) as idx:
+                coins_at = idx.entries[idx.root_id][3][0]
+            struct.pack_into("<d", data, coins_at, struct.unpack_from("<d", data, coins_at)[0] + 1200)
+            with open(after, "wb") as f:
+                f.write(data)
+            for path in (before, after):
+                if os.path.exists(nrbf_index.index_path(path)):
+                    os.remove(nrbf_index.index_path(path))
+            cold = nrbf_diff.diff_saves(before, after)
+            t0 = time.perf_counter()
+            for path in (before, after):
+                nrbf_index.open_index(path).close()
+            index_seconds = time.perf_counter() - t0
+            warm = nrbf_diff.diff_saves(before, after)
+            report["runs"].append({
+                "bytes": save["bytes"],
+                "records": save["records"],
+                "changes": len(warm["changes"]),
+                "cold": {"mode": cold["stats"]["mode"], "seconds": cold["stats"]["seconds"]},
+                "index_seconds": round(index_seconds, 4),
+                "warm": {"mode": warm["stats"]["mode"], "seconds": warm["stats"]["seconds"]},
+            })
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the NRBF decoder")
+    parser.add_argument("--count", type=int, default=1_000_000, help="Number of primitives in the synthetic stream")
+    parser.add_argument("--load", metavar="FILE", help="Compare read() and mmap loading of FILE instead")
+    parser.add_argument("--synthetic", metavar="SIZES", help="Decode synthetic saves of these sizes instead, e.g. 100K,10M,1G")
+    parser.add_argument("--diff", metavar="SIZES", help="Time cold and warm diffs of synthetic saves of these sizes instead")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per size and target for --synthetic (best is kept)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic saves")
+    parser.add_argument("--keep", metavar="DIR", help="Keep the synthetic saves in DIR")
+    parser.add_argument("--json", metavar="FILE", help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        sizes = [nrbf_synth.parse_size(s) for s in args.synthetic.split(",")]
+        report = bench_throughput(sizes, args.repeat, args.seed, args.keep)
+        print(f"Synthetic saves, Python {report['python']} on {report['machine']}:")
+        for run in report["runs"]:
+            flag = "" if run["ok"] else "  (decoder error)"
+            print(f"  {run['target']:22s} {run['bytes']:>12,d} B  {run['mb_per_sec']:>8.2f} MB/s  "
+                  f"{run['records_per_sec']:>10,d} rec/s  peak +{run['peak_over_baseline_kb']:>10,d} KB{flag}")
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            print(f"Report written to {args.json}")
+        return
+
+    if args.diff:
+        report = bench_diff([nrbf_synth.parse_size(s) for s in args.diff.split(",")], args.seed, args.keep)
+        print(f"Save diffs, Python {report['python']} on {report['machine']}:")
+        for run in report["runs"]:
+            print(f"  {run['bytes']:>12,d} B  cold {run['cold']['seconds']:>9.3f}s ({run['cold']['mode']})  "
+                  f"sidecars {run['index_seconds']:>9.3f}s  warm {run['warm']['seconds']:>9.3f}s ({run['warm']['mode']})")
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            print(f"Report written to {args.json}")
+        return
+
+    if args.load:
+        report = bench_load(args.load)
+        print(f"load_file on {report['file']} ({report['bytes']} bytes):")
+        for mode in ("read", "mmap"):
+            r = report[mode]
+            split = f"  anon {r['rssanon_kb']:>8,d} KB  file {r['rssfile_kb']:>8,d} KB" if "rssanon_kb" in r else ""
+            print(f"  {mode:5s} {r['seconds']:>8}s  max RSS {r['max_rss_kb']:>8,d} KB{split}  ({r['method']})")
+        return
+
+    report = bench_primitives(args.count)
+    print(f"Primitive decode, {report['values']} mixed values ({report['bytes']} bytes):")
+    for name, _ in BENCHMARKS:
+        print(f"  {name:15s} {report[name]['values_per_sec']:>12,d} values/s  ({report[name]['seconds']}s)")
+    print(f"  speedup         {report['speedup_loop']}x (loop), {report['speedup_decoder']}x (decoder)")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+import argparse, asyncio, json, os, signal, sys, time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Any, Optional
+
+try:
+    from tools import parse_playerinfo_staged_v13 as parser
+except ImportError:  # run as a script from inside tools/
+    import parse_playerinfo_staged_v13 as parser
+
+# Long-running collector: read -> sniff/decompress -> decode -> write, each
+# stage fed by a bounded asyncio.Queue. A full queue makes the stage before
+# it wait, back to the input source, so a burst of uploads queues up on
+# disk (drop-box) or in the client's socket rather than in this process.
+PROCESSING_DIR = ".processing"
+DONE_DIR = ".done"
+FAILED_DIR = ".failed"
+METRICS_NAME = "_ingest_metrics.json"
+STATS_COMMAND = "STATS"
+MAX_ERRORS = 100
+
+class Job:
+    __slots__ = ("name", "path", "data", "route", "result", "queued_ns", "timings")
+
+    def __init__(self, name: str, path: Optional[str] = None, data: Optional[bytes] = None):
+        self.name = name
+        self.path = path
+        self.data = data
+        self.route = None
+        self.result = None
+        self.queued_ns = time.perf_counter_ns()
+        self.timings = {}
+
+class Stage:
+    # `workers` coroutines draining one bounded inbox into the next stage's inbox
+    def __init__(self, name: str, handler, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue], workers: int, on_error):
+        self.name = name
+        self.handler = handler
+        self.inbox = inbox
+        self.outbox = outbox
+        self.workers = workers
+        self.on_error = on_error
+        self.tasks = []
+        self.in_flight = 0
+        self.processed = 0
+        self.failed = 0
+        self.busy_ns = 0
+        self.max_ns = 0
+        self.wait_ns = 0
+
+    def start(self):
+        self.tasks = [asyncio.create_task(self._work(), name=f"{self.name}-{i}") for i in range(self.workers)]
+
+    async def _work(self):
+        while True:
+            job = await self.inbox.get()
+            start = time.perf_counter_ns()
+            self.wait_ns += start - job.queued_ns
+            self.in_flight += 1
+            try:
+                await self.handler(job)
+            except Exception as e:
+                self.failed += 1
+                elapsed = time.perf_counter_ns() - start
+                await self.on_error(job, self.name, e)
+            else:
+                self.processed += 1
+                elapsed = time.perf_counter_ns() - start
+                job.timings[self.name] = elapsed
+                if self.outbox is not None:
+                    job.queued_ns = time.perf_counter_ns()
+                    await self.outbox.put(job)
+            finally:
+                self.in_flight -= 1
+                self.inbox.task_done()
+            self.busy_ns += elapsed
+            self.max_ns = max(self.max_ns, elapsed)
+
+    def stats(self) -> Dict[str, Any]:
+        done = self.processed + self.failed
+        return {
+            "depth": self.inbox.qsize(),
+            "capacity": self.inbox.maxsize,
+            "in_flight": self.in_flight,
+            "workers": self.workers,
+            "processed": self.processed,
+            "failed": self.failed,
+            "avg_ms": round(self.busy_ns / done / 1e6, 3) if done else None,
+            "max_ms": round(self.max_ns / 1e6, 3),
+            "avg_wait_ms": round(self.wait_ns / done / 1e6, 3) if done else None,
+        }
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+def _decompress(data: bytes, route: str) -> bytes:
+    return b"".join(parser.iter_decompressed(data, route))
+
+def _decode(data: bytes) -> Dict[str, Any]:
+    # Runs in a worker process; only the mapped result comes back
+    return parser.parse_buffer(data)
+
+COMPRESSED_SUFFIXES = (".gz", ".zlib")
+
+def job_name(filename: str) -> str:
+    # Output folder for an input: "alice.dat.gz" -> "alice"
+    for suffix in COMPRESSED_SUFFIXES:
+        if filename.endswith(suffix):
+            filename = filename[:-len(suffix)]
+            break
+    return os.path.splitext(filename)[0] or filename
+
+def _move(path: str, folder: str):
+    os.makedirs(folder, exist_ok=True)
+    os.replace(path, os.path.join(folder, os.path.basename(path)))
+
+class IngestService:
+    def __init__(self, out: str, queue_size: int = 8, read_workers: int = 4, decode_workers: int = 0):
+        self.out = out
+        self.decode_workers = decode_workers or os.cpu_count() or 1
+        self.threads = ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix="ingest")
+        self.processes = ProcessPoolExecutor(max_workers=self.decode_workers)
+        self.started = time.time()
+        self.errors = []
+        queues = [asyncio.Queue(maxsize=queue_size) for _ in range(4)]
+        self.stages = [
+            Stage("read", self._read, queues[0], queues[1], read_workers, self._failed),
+            Stage("sniff", self._sniff, queues[1], queues[2], read_workers, self._failed),
+            Stage("decode", self._decode, queues[2], queues[3], self.decode_workers, self._failed),
+            Stage("write", self._write, queues[3], None, read_workers, self._failed),
+        ]
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    async def submit(self, job: Job):
+        # Waits while the read queue is full: this is where backpressure
+        # reaches the input source
+        job.queued_ns = time.perf_counter_ns()
+        await self.stages[0].inbox.put(job)
+
+    async def drain(self):
+        for stage in self.stages:
+            await stage.inbox.join()
+
+    async def close(self):
+        for stage in self.stages:
+            for task in stage.tasks:
+                task.cancel()
+        await asyncio.gather(*(t for s in self.stages for t in s.tasks), return_exceptions=True)
+        self.threads.shutdown(wait=True)
+        self.processes.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "uptime_seconds": round(time.time() - self.started, 3),
+            "stages": {stage.name: stage.stats() for stage in self.stages},
+            "errors": self.errors[-10:],
+        }
+
+    def write_metrics(self) -> str:
+        os.makedirs(self.out, exist_ok=True)
+        path = os.path.join(self.out, METRICS_NAME)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.stats(), f, indent=2)
+        os.replace(tmp, path)
+        return path
+
+    async def _read(self, job: Job):
+        if job.data is None:
+            loop = asyncio.get_running_loop()
+            job.data = await loop.run_in_executor(self.threads, _read_bytes, job.path)
+
+    async def _sniff(self, job: Job):
+        route = parser.sniff_format(job.data[:64])
+        if route in ("gzip", "zlib"):
+            loop = asyncio.get_running_loop()
+            job.data = await loop.run_in_executor(self.threads, _decompress, job.data, route)
+            route = f"{route}+{parser.sniff_format(job.data[:64])}"
+        job.route = route
+
+    async def _decode(self, job: Job):
+        loop = asyncio.get_running_loop()
+        data, job.data = job.data, None
+        job.result = await loop.run_in_executor(self.processes, _decode, data)
+        reason = parser.incomplete_reason(job.result)
+        if reason:
+            # A cut-off upload or torn file: fail the job rather than write
+            # what the decoder could salvage over a good result
+            job.result = None
+            raise ValueError(f"incomplete save: {reason}")
+
+    async def _write(self, job: Job):
+        meta = job.result["_meta"]
+        if "+" in job.route:
+            # Same naming as load_file's gzip_/zlib_ methods
+            meta["method"] = f"{job.route.split('+')[0]}_{meta['method']}"
+        meta["route"] = job.route
+        meta["ingest"] = {name: round(ns / 1e6, 3) for name, ns in job.timings.items()}
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.threads, parser.write_outputs, job.result, os.path.join(self.out, job.name))
+        job.result = None
+        if job.path is not None:
+            _move(job.path, os.path.join(os.path.dirname(os.path.dirname(job.path)), DONE_DIR))
+
+    async def _failed(self, job: Job, stage: str, error: Exception):
+        self.errors.append({"name": job.name, "stage": stage, "error": f"{type(error).__name__}: {error}"})
+        del self.errors[:-MAX_ERRORS]
+        job.data = job.result = None
+        if job.path is not None:
+            try:
+                _move(job.path, os.path.join(os.path.dirname(os.path.dirname(job.path)), FAILED_DIR))
+            except OSError:
+                pass
+
+    async def watch_inbox(self, inbox: str, poll: float = 0.5, settle: float = 0.5, once: bool = False):
+        # Drop-box input: a file is claimed by renaming it into .processing
+        # once it has not been modified for `settle` seconds. Files left in
+        # .processing by an earlier run are picked up first.
+        processing = os.path.join(inbox, PROCESSING_DIR)
+        os.makedirs(processing, exist_ok=True)
+        for name in sorted(os.listdir(processing)):
+            await self.submit(Job(job_name(name), path=os.path.join(processing, name)))
+        while True:
+            now = time.time()
+            with os.scandir(inbox) as it:
+                ready = sorted(e.name for e in it if e.is_file() and not e.name.startswith(".")
+                               and (once or now - e.stat().st_mtime >= settle))
+            for name in ready:
+                claimed = os.path.join(processing, name)
+                try:
+                    os.replace(os.path.join(inbox, name), claimed)
+                except FileNotFoundError:
+                    continue
+                await self.submit(Job(job_name(name), path=claimed))
+            if once:
+                return
+            await asyncio.sleep(poll)
+
+    async def serve_socket(self, path: str, max_upload: int = 256 << 20):
+        # Socket input: "<name>\n" followed by the save bytes until EOF; the
+        # reply "queued" is sent once the job is in the read queue. A first
+        # line of STATS returns the metrics instead.
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            try:
+                name = (await reader.readline()).decode("utf-8", "replace").strip()
+                if name == STATS_COMMAND:
+                    writer.write(json.dumps(self.stats()).encode("utf-8") + b"\n")
+                elif not name or os.path.basename(name) != name or name.startswith("."):
+                    writer.write(b"error: bad name\n")
+                else:
+                    data = await _read_upload(reader, max_upload)
+                    if data is None:
+                        writer.write(b"error: upload too large\n")
+                    else:
+                        await self.submit(Job(job_name(name), data=data))
+                        writer.write(b"queued\n")
+                await writer.drain()
+            finally:
+                writer.close()
+
+        if os.path.exists(path):
+            os.remove(path)
+        return await asyncio.start_unix_server(handle, path=path)
+
+UPLOAD_CHUNK = 1 << 16
+
+async def _read_upload(reader: asyncio.StreamReader, max_upload: int) -> Optional[bytes]:
+    # Everything up to EOF, or None past max_upload. read(n) returns what is
+    # buffered so far, not n bytes: a slow client sends its save in pieces.
+    chunks = []
+    total = 0
+    while True:
+        chunk = await reader.read(UPLOAD_CHUNK)
+        if not chunk:
+            return b"".join(chunks)
+        total += len(chunk)
+        if total > max_upload:
+            # Discard the rest so the client, still sending, gets the reply
+            while await reader.read(UPLOAD_CHUNK):
+                pass
+            return None
+        chunks.append(chunk)
+
+async def upload(socket_path: str, name: str, data: bytes) -> str:
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    writer.write(name.encode("utf-8") + b"\n" + data)
+    await writer.drain()
+    writer.write_eof()
+    reply = await reader.readline()
+    writer.close()
+    await writer.wait_closed()
+    return reply.decode("utf-8").strip()
+
+async def query_stats(socket_path: str) -> Dict[str, Any]:
+    return json.loads(await upload(socket_path, STATS_COMMAND, b""))
+
+async def _metrics_loop(service: IngestService, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        service.write_metrics()
+
+async def serve(args) -> Dict[str, Any]:
+    service = IngestService(args.out, args.queue_size, args.read_workers, args.decode_workers)
+    service.start()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+    background = [asyncio.create_task(_metrics_loop(service, args.metrics_interval))]
+    server = None
+    try:
+        if args.socket:
+            server = await service.serve_socket(args.socket, args.max_upload_mb << 20)
+        if args.inbox:
+            watcher = asyncio.create_task(service.watch_inbox(args.inbox, args.poll, args.settle, args.once))
+            if args.once:
+                await watcher
+                stop.set()
+            else:
+                background.append(watcher)
+        await stop.wait()
+    finally:
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+        for task in background:
+            task.cancel()
+        await service.drain()
+        service.write_metrics()
+        stats = service.stats()
+        await service.close()
+    return stats
+
+def main():
+    ap = argparse.ArgumentParser(description="Asyncio ingestion service for playerInfo saves (staged v13)")
+    ap.add_argument("--inbox", help="Drop-box folder to watch for new saves")
+    ap.add_argument("--socket", help="Unix socket path to accept uploads on")
+    ap.add_argument("--out", default="out", help="Output folder; one subfolder per save name")
+    ap.add_argument("--queue-size", type=int, default=8, help="Capacity of each stage's queue")
+    ap.add_argument("--read-workers", type=int, default=4, help="Threads for reading, decompressing and writing")
+    ap.add_argument("--decode-workers", type=int, default=0, help="Decoder processes (default: CPU count)")
+    ap.add_argument("--poll", type=float, default=0.5, help="Seconds between drop-box scans")
+    ap.add_argument("--settle", type=float, default=0.5, help="Seconds a file must be unmodified before it is claimed")
+    ap.add_argument("--max-upload-mb", type=int, default=256, help="Largest accepted socket upload")
+    ap.add_argument("--metrics-interval", type=float, default=5.0, help=f"Seconds between {METRICS_NAME} updates")
+    ap.add_argument("--once", action="store_true", help="Process what is in the drop-box now, then exit")
+    args = ap.parse_args()
+    if not args.inbox and not args.socket:
+        ap.error("one of --inbox or --socket is required")
+
+    stats = asyncio.run(serve(args))
+    for name, stage in stats["stages"].items():
+        print(f"{name:6s} processed {stage['processed']:>6}  failed {stage['failed']:>4}  avg {stage['avg_ms']} ms  max {stage['max_ms']} ms")
+    for error in stats["errors"]:
+        print(f"❌ {error['name']} ({error['stage']}): {error['error']}")
+    return 1 if any(stage["failed"] for stage in stats["stages"].values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+import argparse, functools, json, os, re, sys
+from typing import Dict, Any, List, Optional
+
+# Rules are tried in file order and the first match wins. "exact" compares
+# the whole key, "contains" looks for a substring; both ignore case.
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "category_rules.json")
+DEFAULT_CATEGORY = "_raw"
+MATCH_KINDS = ("exact", "contains")
+
+def load_rules(path: str = RULES_PATH) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        rules = json.load(f)
+    for i, rule in enumerate(rules):
+        if rule.get("match") not in MATCH_KINDS or not rule.get("category") or not rule.get("names"):
+            raise ValueError(f"{path}: rule {i} needs a category, names and a match of {MATCH_KINDS}")
+    return rules
+
+def compile_rules(rules: List[Dict[str, Any]]) -> "re.Pattern":
+    # One pattern, one alternative per rule, each anchored at the start of
+    # the key: re.match tries them left to right, so rule order is kept
+    # even where a later rule's substring occurs earlier in the key
+    branches = []
+    for i, rule in enumerate(rules):
+        names = "|".join(re.escape(name) for name in rule["names"])
+        if rule["match"] == "exact":
+            branches.append(f"(?:{names})\\Z(?P<r{i}>)")
+        else:
+            branches.append(f"(?=.*?(?:{names}))(?P<r{i}>)")
+    return re.compile("|".join(branches), re.IGNORECASE | re.DOTALL)
+
+class KeyClassifier:
+    # key -> category. Results are memoised per distinct key, so across a
+    # batch each member name is matched once per process.
+    def __init__(self, rules: List[Dict[str, Any]], default: str = DEFAULT_CATEGORY):
+        self.default = default
+        self.categories = tuple(dict.fromkeys(rule["category"] for rule in rules))
+        self._pattern = compile_rules(rules)
+        self._by_group = {f"r{i}": rule["category"] for i, rule in enumerate(rules)}
+        self._memo: Dict[str, str] = {}
+
+    def __call__(self, key: str) -> str:
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+        m = self._pattern.match(key)
+        category = self._by_group[m.lastgroup] if m else self.default
+        self._memo[key] = category
+        return category
+
+    def cache_size(self) -> int:
+        return len(self._memo)
+
+@functools.lru_cache(maxsize=None)
+def default_classifier(path: Optional[str] = None) -> KeyClassifier:
+    return KeyClassifier(load_rules(path or RULES_PATH))
+
+def main():
+    parser = argparse.ArgumentParser(description="Show which schema category each key maps to")
+    parser.add_argument("keys", nargs="+", help="Member names to classify")
+    parser.add_argument("--rules", default=RULES_PATH, help="Category rules file (JSON)")
+    args = parser.parse_args()
+
+    classify = default_classifier(args.rules)
+    for key in args.keys:
+        print(f"{key}: {classify(key)}")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1541 @@
+#!/usr/bin/env python3
+# MS-NRBF (.NET BinaryFormatter) decoder used by the staged playerInfo parsers.
+import array, heapq, mmap, os, re, stat, struct, sys, time
+from collections.abc import Mapping
+from typing import Dict, Any, Iterator, List
+
+RECORD_NAMES = {
+    0: "SerializedStreamHeader",
+    1: "ClassWithId",
+    2: "SystemClassWithMembers",
+    3: "ClassWithMembers",
+    4: "SystemClassWithMembersAndTypes",
+    5: "ClassWithMembersAndTypes",
+    6: "BinaryObjectString",
+    7: "BinaryArray",
+    8: "MemberPrimitiveTyped",
+    9: "MemberReference",
+    10: "ObjectNull",
+    11: "MessageEnd",
+    12: "BinaryLibrary",
+    13: "ObjectNullMultiple256",
+    14: "ObjectNullMultiple",
+    15: "ArraySinglePrimitive",
+    16: "ArraySingleObject",
+    17: "ArraySingleString",
+}
+
+# BinaryTypeEnum
+BT_PRIMITIVE, BT_STRING, BT_OBJECT, BT_SYSTEM_CLASS, BT_CLASS, BT_OBJECT_ARRAY, BT_STRING_ARRAY, BT_PRIMITIVE_ARRAY = range(8)
+
+# PrimitiveTypeEnum -> struct format (Char, Decimal, Null and String are handled separately)
+PRIMITIVE_FORMATS = {
+    1: "<?",   # Boolean
+    2: "<B",   # Byte
+    6: "<d",   # Double
+    7: "<h",   # Int16
+    8: "<i",   # Int32
+    9: "<q",   # Int64
+    10: "<b",  # SByte
+    11: "<f",  # Single
+    12: "<q",  # TimeSpan (ticks)
+    13: "<Q",  # DateTime (ticks + kind bits)
+    14: "<H",  # UInt16
+    15: "<I",  # UInt32
+    16: "<Q",  # UInt64
+}
+PRIM_CHAR, PRIM_DECIMAL, PRIM_DATETIME, PRIM_NULL, PRIM_STRING = 3, 5, 13, 17, 18
+
+# Precompiled once: type code -> (bound unpack_from, size)
+PRIMITIVE_STRUCTS = {code: struct.Struct(fmt) for code, fmt in PRIMITIVE_FORMATS.items()}
+_FIXED_PRIMITIVES = {code: (s.unpack_from, s.size) for code, s in PRIMITIVE_STRUCTS.items()}
+
+# Primitive arrays that can be copied (or viewed) in one call; Boolean and
+# DateTime need per-element conversion. Only typecodes whose native size
+# matches the wire size qualify.
+_LITTLE_ENDIAN = sys.byteorder == "little"
+ARRAY_TYPECODES = {
+    code: typecode
+    for code, typecode in ((2, "B"), (6, "d"), (7, "h"), (8, "i"), (9, "q"), (10, "b"), (11, "f"),
+                           (12, "q"), (14, "H"), (15, "I"), (16, "Q"))
+    if array.array(typecode).itemsize == PRIMITIVE_STRUCTS[code].size
+}
+
+_INT32 = struct.Struct("<i")
+_INT32_PAIR = struct.Struct("<ii")
+_STREAM_HEADER = struct.Struct("<iiii")
+_unpack_int32 = _INT32.unpack_from
+_unpack_int32_pair = _INT32_PAIR.unpack_from
+
+class NrbfError(ValueError):
+    pass
+
+_MISSING = object()
+
+class NrbfTruncated(NrbfError):
+    # The buffer ended mid-record; more input may complete it
+    pass
+
+class StringSpan:
+    # (offset, length) into the source buffer; decoded to str only when read
+    __slots__ = ("buf", "offset", "length")
+
+    def __init__(self, buf, offset: int, length: int):
+        self.buf = buf
+        self.offset = offset
+        self.length = length
+
+    def __str__(self) -> str:
+        return str(self.buf[self.offset:self.offset + self.length], "utf-8", "replace")
+
+    def __repr__(self) -> str:
+        return f"StringSpan({self.offset}, {self.length})"
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, StringSpan):
+            other = str(other)
+        return str(self) == other
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+class StringTable(Mapping):
+    # Read-only object id -> str view over StringSpan values
+    __slots__ = ("spans",)
+
+    def __init__(self, spans: Dict[int, StringSpan]):
+        self.spans = spans
+
+    def __getitem__(self, obj_id: int) -> str:
+        return str(self.spans[obj_id])
+
+    def __iter__(self):
+        return iter(self.spans)
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+# Decoded records. Each is a small __slots__ object rather than a dict: a
+# record costs a few pointers instead of a hash table, and the decoder reads
+# fields as attributes. They still read like the dicts they replace
+# (rec["type"], rec.get("class"), "values" in rec, dict(rec)), and
+# json_default turns them into dicts at output time.
+class Record(Mapping):
+    __slots__ = ()
+    type = None
+    # Mapping keys after "type", and the attributes holding them where the
+    # key is not a valid name; unset optional slots are left out
+    _keys = ()
+    _attrs = {}
+
+    def __getitem__(self, key: str):
+        if key == "type":
+            return self.type
+        if key in self._keys:
+            try:
+                return getattr(self, self._attrs.get(key, key))
+            except AttributeError:
+                pass
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield "type"
+        for key in self._keys:
+            if hasattr(self, self._attrs.get(key, key)):
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self)!r})"
+
+class StreamHeader(Record):
+    __slots__ = ("root_id", "header_id", "version")
+    type = "SerializedStreamHeader"
+    _keys = __slots__
+
+    def __init__(self, root_id: int, header_id: int, version: str):
+        self.root_id = root_id
+        self.header_id = header_id
+        self.version = version
+
+class Ref(Mapping):
+    # An unresolved MemberReference; reads as {"$ref": id}
+    __slots__ = ("id",)
+
+    def __init__(self, obj_id: int):
+        self.id = obj_id
+
+    def __getitem__(self, key: str):
+        if key != "$ref":
+            raise KeyError(key)
+        return self.id
+
+    def __iter__(self):
+        yield "$ref"
+
+    def __len__(self) -> int:
+        return 1
+
+    def __repr__(self) -> str:
+        return f"{{'$ref': {self.id}}}"
+
+class Members(Mapping):
+    # A class record's member values by name. The name -> position map is
+    # built once per class layout and shared; each object only keeps its
+    # value list, which is where forward references get patched in.
+    __slots__ = ("_slots", "_values")
+
+    def __init__(self, slots: Dict[str, int], values: List):
+        self._slots = slots
+        self._values = values
+
+    def __getitem__(self, name: str):
+        return self._values[self._slots[name]]
+
+    def __iter__(self):
+        return iter(self._slots)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+class Layout:
+    # What every object of one class shares: its name, library and member
+    # name -> position map. Repeated names keep the last value, as
+    # dict(zip(members, values)) would.
+    __slots__ = ("class_name", "library", "slots")
+
+    def __init__(self, class_name: str, library, members):
+        self.class_name = class_name
+        self.library = library
+        self.slots = {name: i for i, name in enumerate(members)}
+
+class ClassRecord(Record):
+    # All four class record types and ClassWithId. Objects keep only their
+    # value list next to the shared layout; member_offsets only while indexing
+    __slots__ = ("type", "id", "layout", "fields", "member_offsets")
+    _keys = ("id", "class", "library", "members", "member_offsets")
+    _attrs = {"class": "class_name"}
+
+    def __init__(self, type_name: str, obj_id: int, layout: Layout, fields):
+        self.type = type_name
+        self.id = obj_id
+        self.layout = layout
+        self.fields = fields
+
+    @property
+    def class_name(self) -> str:
+        return self.layout.class_name
+
+    @property
+    def library(self):
+        return self.layout.library
+
+    @property
+    def members(self) -> Members:
+        return Members(self.layout.slots, self.fields)
+
+class StringRecord(Record):
+    __slots__ = ("id", "value")
+    type = "BinaryObjectString"
+    _keys = __slots__
+
+    def __init__(self, obj_id: int, value):
+        self.id = obj_id
+        self.value = value
+
+# Array items live in .elements (.values would hide Mapping.values) and
+# read back as rec["values"]
+_ELEMENTS = {"values": "elements"}
+
+class BinaryArrayRecord(Record):
+    __slots__ = ("id", "array_type", "lengths", "elements", "lower_bounds", "member_offsets")
+    type = "BinaryArray"
+    _keys = ("id", "array_type", "lengths", "values", "lower_bounds", "member_offsets")
+    _attrs = _ELEMENTS
+
+    def __init__(self, obj_id: int, array_type: int, lengths: List[int], values):
+        self.id = obj_id
+        self.array_type = array_type
+        self.lengths = lengths
+        self.elements = values
+
+class PrimitiveTypedRecord(Record):
+    __slots__ = ("primitive", "value")
+    type = "MemberPrimitiveTyped"
+    _keys = __slots__
+
+    def __init__(self, primitive: int, value):
+        self.primitive = primitive
+        self.value = value
+
+class ReferenceRecord(Record):
+    __slots__ = ("ref_id",)
+    type = "MemberReference"
+    _keys = __slots__
+
+    def __init__(self, ref_id: int):
+        self.ref_id = ref_id
+
+class MarkerRecord(Record):
+    # ObjectNull and MessageEnd carry nothing; one shared instance each
+    __slots__ = ("type",)
+
+    def __init__(self, type_name: str):
+        self.type = type_name
+
+OBJECT_NULL = MarkerRecord("ObjectNull")
+MESSAGE_END = MarkerRecord("MessageEnd")
+
+class LibraryRecord(Record):
+    __slots__ = ("id", "name")
+    type = "BinaryLibrary"
+    _keys = __slots__
+
+    def __init__(self, library_id: int, name: str):
+        self.id = library_id
+        self.name = name
+
+class NullRunRecord(Record):
+    __slots__ = ("type", "count")
+    _keys = ("count",)
+
+    def __init__(self, type_name: str, count: int):
+        self.type = type_name
+        self.count = count
+
+class PrimitiveArrayRecord(Record):
+    __slots__ = ("id", "primitive", "elements")
+    type = "ArraySinglePrimitive"
+    _keys = ("id", "primitive", "values")
+    _attrs = _ELEMENTS
+
+    def __init__(self, obj_id: int, primitive: int, values):
+        self.id = obj_id
+        self.primitive = primitive
+        self.elements = values
+
+class ValueArrayRecord(Record):
+    # ArraySingleObject and ArraySingleString
+    __slots__ = ("type", "id", "elements", "member_offsets")
+    _keys = ("id", "values", "member_offsets")
+    _attrs = _ELEMENTS
+
+    def __init__(self, type_name: str, obj_id: int, values: List):
+        self.type = type_name
+        self.id = obj_id
+        self.elements = values
+
+def json_default(o):
+    # json.dump(default=...) hook for the lazy and bulk types the decoder produces
+    if isinstance(o, StringSpan):
+        return str(o)
+    if isinstance(o, Mapping):
+        return dict(o)
+    if isinstance(o, (array.array, memoryview)):
+        return o.tolist()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+class _Reader:
+    __slots__ = ("data", "pos", "end", "base", "zero_copy", "resolve", "classes", "libraries", "strings",
+                 "objects", "summary", "ids", "pending", "journal", "index", "profile")
+
+    def __init__(self, data, zero_copy: bool = False, resolve: bool = False):
+        self.data = memoryview(data).cast("B") if zero_copy else data
+        self.zero_copy = zero_copy
+        self.resolve = resolve
+        self.pos = 0
+        self.end = len(data)
+        self.base = 0  # bytes already dropped from the front of a streaming buffer
+        self.classes = {}
+        self.libraries = {}
+        self.strings = {}
+        self.objects = []
+        self.summary = {}
+        # Object graph: id -> decoded value, and id -> [(container, key)]
+        # slots still waiting for a forward reference to arrive
+        self.ids = {}
+        self.pending = {}
+        # Undo log of graph changes while a streamed record may still be retried
+        self.journal = None
+        # id -> (offset, record type, class name, slot offsets, end) when indexing
+        self.index = None
+        # Per record type and class timings when profiling (see Profile)
+        self.profile = None
+
+    def need(self, n: int):
+        if self.pos + n > self.end:
+            raise NrbfTruncated(f"truncated record at offset {self.pos}")
+
+    def int32(self) -> int:
+        self.need(4)
+        val = _unpack_int32(self.data, self.pos)[0]
+        self.pos += 4
+        return val
+
+    def int32_pair(self):
+        self.need(8)
+        pair = _unpack_int32_pair(self.data, self.pos)
+        self.pos += 8
+        return pair
+
+    def byte(self) -> int:
+        self.need(1)
+        val = self.data[self.pos]
+        self.pos += 1
+        return val
+
+    def string_length(self) -> int:
+        # LengthPrefixedString: 7-bit encoded length, at most 5 bytes
+        length = 0
+        shift = 0
+        while True:
+            b = self.byte()
+            length |= (b & 0x7F) << shift
+            if b < 0x80:
+                break
+            shift += 7
+            if shift > 28:
+                raise NrbfError(f"bad string length at offset {self.pos}")
+        self.need(length)
+        return length
+
+    def string(self) -> str:
+        length = self.string_length()
+        s = str(self.data[self.pos:self.pos + length], "utf-8", "replace")
+        self.pos += length
+        return s
+
+    def string_span(self) -> "StringSpan":
+        length = self.string_length()
+        span = StringSpan(self.data, self.pos, length)
+        self.pos += length
+        return span
+
+def _read_primitive(r: _Reader, prim_type: int) -> Any:
+    fixed = _FIXED_PRIMITIVES.get(prim_type)
+    if fixed is not None:
+        unpack, size = fixed
+        pos = r.pos
+        if pos + size > r.end:
+            raise NrbfTruncated(f"truncated primitive at offset {pos}")
+        val = unpack(r.data, pos)[0]
+        r.pos = pos + size
+        if prim_type == PRIM_DATETIME:
+            val &= 0x3FFFFFFFFFFFFFFF
+        return val
+    if prim_type in (PRIM_DECIMAL, PRIM_STRING):
+        return r.string()
+    if prim_type == PRIM_CHAR:
+        lead = r.data[r.pos] if r.pos < r.end else 0
+        size = 1 if lead < 0x80 else 2 if lead < 0xE0 else 3 if lead < 0xF0 else 4
+        r.need(size)
+        val = str(r.data[r.pos:r.pos + size], "utf-8", "replace")
+        r.pos += size
+        return val
+    if prim_type == PRIM_NULL:
+        return None
+    raise NrbfError(f"unknown primitive type {prim_type} at offset {r.pos}")
+
+def _read_primitive_array(r: _Reader, prim_type: int, length: int):
+    if length < 0:
+        # Would move the cursor backwards
+        raise NrbfError(f"negative array length {length} at offset {r.pos}")
+    typecode = ARRAY_TYPECODES.get(prim_type)
+    if typecode is not None:
+        # One bulk call for the whole array instead of one unpack per element
+        size = PRIMITIVE_STRUCTS[prim_type].size * length
+        r.need(size)
+        start = r.pos
+        r.pos = start + size
+        if r.zero_copy and _LITTLE_ENDIAN:
+            return r.data[start:start + size].cast(typecode)
+        values = array.array(typecode)
+        with memoryview(r.data) as mv:
+            values.frombytes(mv[start:start + size])
+        if not _LITTLE_ENDIAN:
+            values.byteswap()
+        return values
+    fixed = _FIXED_PRIMITIVES.get(prim_type)
+    if fixed is not None and prim_type != PRIM_DATETIME:
+        unpack, size = fixed
+        r.need(size * length)
+        data = r.data
+        start = r.pos
+        r.pos = start + size * length
+        return [unpack(data, pos)[0] for pos in range(start, start + size * length, size)]
+    if prim_type == PRIM_NULL:
+        raise NrbfError(f"array of Null primitives at offset {r.pos}")
+    # Char, Decimal and String elements take at least a byte each
+    r.need(length)
+    return [_read_primitive(r, prim_type) for _ in range(length)]
+
+def _read_rank(r: _Reader) -> int:
+    rank = r.int32()
+    if not 0 < rank <= 32:
+        raise NrbfError(f"bad array rank {rank} at offset {r.pos}")
+    return rank
+
+def _read_class_info(r: _Reader):
+    obj_id = r.int32()
+    name = r.string()
+    count = r.int32()
+    if count < 0:
+        raise NrbfError(f"negative member count {count} at offset {r.pos}")
+    # Every member name takes at least a byte
+    r.need(count)
+    members = [r.string() for _ in range(count)]
+    return obj_id, name, members
+
+def _read_member_types(r: _Reader, count: int) -> List:
+    btypes = [r.byte() for _ in range(count)]
+    types = []
+    for bt in btypes:
+        if bt in (BT_PRIMITIVE, BT_PRIMITIVE_ARRAY):
+            types.append((bt, r.byte()))
+        elif bt == BT_SYSTEM_CLASS:
+            types.append((bt, r.string()))
+        elif bt == BT_CLASS:
+            types.append((bt, (r.string(), r.int32())))
+        elif bt in (BT_STRING, BT_OBJECT, BT_OBJECT_ARRAY, BT_STRING_ARRAY):
+            types.append((bt, None))
+        else:
+            raise NrbfError(f"unknown binary type {bt} at offset {r.pos}")
+    return types
+
+def _read_values(r: _Reader, count: int, marks: List = None) -> List:
+    # Record-valued slots (array elements); null runs may fill several at once.
+    # marks, when given, receives each slot's offset (a run shares its record's).
+    values = []
+    while len(values) < count:
+        if marks is not None:
+            marks.append(r.pos)
+        rec = _read_record(r)
+        rtype = rec.type
+        if rtype in ("ObjectNullMultiple", "ObjectNullMultiple256"):
+            if len(values) + rec.count > count:
+                break
+            values.extend([None] * rec.count)
+            if marks is not None:
+                marks.extend([marks[-1]] * (rec.count - 1))
+        elif rtype == "MemberReference" and r.resolve:
+            target = _resolve_ref(r, rec.ref_id)
+            if target is _MISSING:
+                _park(r, rec.ref_id, values, len(values))
+                values.append(_value_of(rec))
+            else:
+                values.append(target)
+        else:
+            values.append(_value_of(rec))
+    if len(values) != count:
+        raise NrbfError(f"null run overflows value list at offset {r.pos}")
+    return values
+
+def _resolve_ref(r: _Reader, ref_id: int):
+    # The referenced value if it is already decoded, else _MISSING
+    return r.ids.get(ref_id, _MISSING)
+
+def _park(r: _Reader, ref_id: int, container, key):
+    r.pending.setdefault(ref_id, []).append((container, key))
+    if r.journal is not None:
+        r.journal.append((ref_id, None, None))
+
+def _link(r: _Reader, obj_id: int, value):
+    # Register a decoded id and patch every slot that was waiting for it
+    if r.journal is not None:
+        r.journal.append((obj_id, r.ids.get(obj_id, _MISSING), r.pending.get(obj_id)))
+    r.ids[obj_id] = value
+    waiting = r.pending.pop(obj_id, None)
+    if waiting:
+        for container, key in waiting:
+            container[key] = value
+
+def _undo(r: _Reader):
+    # Reverse the _park/_link calls of an abandoned record attempt
+    for obj_id, previous, waiting in reversed(r.journal):
+        if previous is None:
+            slots = r.pending[obj_id]
+            slots.pop()
+            if not slots:
+                del r.pending[obj_id]
+            continue
+        if previous is _MISSING:
+            del r.ids[obj_id]
+        else:
+            r.ids[obj_id] = previous
+        if waiting:
+            for container, key in waiting:
+                container[key] = Ref(obj_id)
+            r.pending[obj_id] = waiting
+    r.journal = []
+
+def _value_of(rec: Record) -> Any:
+    rtype = rec.type
+    if rtype == "BinaryObjectString":
+        return rec.value
+    if rtype == "MemberReference":
+        return Ref(rec.ref_id)
+    if rtype == "MemberPrimitiveTyped":
+        return rec.value
+    if rtype == "ObjectNull":
+        return None
+    return rec
+
+# Member decode steps, built once per class layout
+_STEP_FIXED, _STEP_PRIMITIVE, _STEP_RECORD = range(3)
+_RECORD_STEP = (_STEP_RECORD,)
+
+def _build_steps(types, count: int):
+    # Consecutive fixed-size primitive members collapse into one struct, so a
+    # run like (Int32, Int32, Double, Boolean) is a single unpack_from call.
+    # Fixed steps also carry each member's offset within the run.
+    if types is None:
+        return (_RECORD_STEP,) * count
+    steps = []
+    run = ""
+    offsets = []
+    for bt, info in types:
+        if bt == BT_PRIMITIVE and info in PRIMITIVE_FORMATS and info != PRIM_DATETIME:
+            offsets.append(struct.calcsize("<" + run))
+            run += PRIMITIVE_FORMATS[info][1:]
+            continue
+        if run:
+            fixed = struct.Struct("<" + run)
+            steps.append((_STEP_FIXED, fixed.unpack_from, fixed.size, tuple(offsets)))
+            run = ""
+            offsets = []
+        steps.append((_STEP_PRIMITIVE, info) if bt == BT_PRIMITIVE else _RECORD_STEP)
+    if run:
+        fixed = struct.Struct("<" + run)
+        steps.append((_STEP_FIXED, fixed.unpack_from, fixed.size, tuple(offsets)))
+    return tuple(steps)
+
+def _register_class(r: _Reader, obj_id: int, name: str, members, types, library_id) -> Dict[str, Any]:
+    # Per-stream metadata cache: ClassWithId records reuse this entry as is
+    meta = {
+        "name": name,
+        "members": tuple(members),
+        "layout": Layout(name, r.libraries.get(library_id), members),
+        "types": types,
+        "library": r.libraries.get(library_id),
+        "steps": _build_steps(types, len(members)),
+    }
+    r.classes[obj_id] = meta
+    return meta
+
+def _read_object(r: _Reader, type_name: str, obj_id: int, meta: Dict[str, Any]) -> ClassRecord:
+    values = []
+    append = values.append
+    nulls = 0
+    forward = None
+    # Member offsets are only collected while building an index
+    marks = [] if r.index is not None else None
+    for step in meta["steps"]:
+        kind = step[0]
+        if kind == _STEP_FIXED:
+            pos = r.pos
+            size = step[2]
+            if pos + size > r.end:
+                raise NrbfTruncated(f"truncated record at offset {pos}")
+            values.extend(step[1](r.data, pos))
+            r.pos = pos + size
+            if marks is not None:
+                marks.extend([pos + o for o in step[3]])
+        elif kind == _STEP_PRIMITIVE:
+            if marks is not None:
+                marks.append(r.pos)
+            append(_read_primitive(r, step[1]))
+        elif nulls:
+            if marks is not None:
+                marks.append(run_at)
+            append(None)
+            nulls -= 1
+        else:
+            run_at = r.pos
+            if marks is not None:
+                marks.append(run_at)
+            rec = _read_record(r)
+            rtype = rec.type
+            if rtype in ("ObjectNullMultiple", "ObjectNullMultiple256"):
+                append(None)
+                nulls = rec.count - 1
+            elif rtype == "MemberReference" and r.resolve:
+                target = _resolve_ref(r, rec.ref_id)
+                if target is _MISSING:
+                    if forward is None:
+                        forward = []
+                    forward.append((len(values), rec.ref_id))
+                    append(_value_of(rec))
+                else:
+                    append(target)
+            else:
+                append(_value_of(rec))
+    if nulls:
+        raise NrbfError(f"null run overflows member list at offset {r.pos}")
+    obj = ClassRecord(type_name, obj_id, meta["layout"], values if forward else tuple(values))
+    r.objects.append(obj)
+    if forward:
+        for index, ref_id in forward:
+            _park(r, ref_id, values, index)
+    if marks is not None:
+        obj.member_offsets = marks
+    if r.resolve:
+        _link(r, obj_id, obj)
+    return obj
+
+def _stream_header_at_start(r: _Reader):
+    # Only the first record may be a header: elsewhere a 0 type byte is
+    # corruption (zero-filled torn writes), not a header every 17 bytes
+    start = r.base + r.pos - 1
+    if start != 0:
+        raise NrbfError(f"SerializedStreamHeader at offset {start}, not at the start of the stream")
+
+def _rec_stream_header(r: _Reader) -> Record:
+    _stream_header_at_start(r)
+    r.need(_STREAM_HEADER.size)
+    root_id, header_id, major, minor = _STREAM_HEADER.unpack_from(r.data, r.pos)
+    r.pos += _STREAM_HEADER.size
+    return StreamHeader(root_id, header_id, f"{major}.{minor}")
+
+def _rec_class_with_id(r: _Reader) -> Record:
+    obj_id, metadata_id = r.int32_pair()
+    # Indexed readers load layouts on first use, so this is a lookup rather than .get()
+    try:
+        meta = r.classes[metadata_id]
+    except KeyError:
+        raise NrbfError(f"ClassWithId references unknown metadata {metadata_id} at offset {r.pos}") from None
+    return _read_object(r, "ClassWithId", obj_id, meta)
+
+def _rec_system_class_with_members(r: _Reader) -> Record:
+    obj_id, name, members = _read_class_info(r)
+    meta = _register_class(r, obj_id, name, members, None, None)
+    return _read_object(r, "SystemClassWithMembers", obj_id, meta)
+
+def _rec_class_with_members(r: _Reader) -> Record:
+    obj_id, name, members = _read_class_info(r)
+    library_id = r.int32()
+    meta = _register_class(r, obj_id, name, members, None, library_id)
+    return _read_object(r, "ClassWithMembers", obj_id, meta)
+
+def _rec_system_class_with_members_and_types(r: _Reader) -> Record:
+    obj_id, name, members = _read_class_info(r)
+    types = _read_member_types(r, len(members))
+    meta = _register_class(r, obj_id, name, members, types, None)
+    return _read_object(r, "SystemClassWithMembersAndTypes", obj_id, meta)
+
+def _rec_class_with_members_and_types(r: _Reader) -> Record:
+    obj_id, name, members = _read_class_info(r)
+    types = _read_member_types(r, len(members))
+    library_id = r.int32()
+    meta = _register_class(r, obj_id, name, members, types, library_id)
+    return _read_object(r, "ClassWithMembersAndTypes", obj_id, meta)
+
+def _rec_binary_object_string(r: _Reader) -> Record:
+    obj_id = r.int32()
+    value = r.string_span() if r.zero_copy else r.string()
+    r.strings[obj_id] = value
+    if r.resolve:
+        _link(r, obj_id, value)
+    return StringRecord(obj_id, value)
+
+def _rec_binary_array(r: _Reader) -> Record:
+    obj_id = r.int32()
+    array_type = r.byte()
+    rank = _read_rank(r)
+    lengths = [r.int32() for _ in range(rank)]
+    lower_bounds = [r.int32() for _ in range(rank)] if array_type in (3, 4, 5) else None
+    element_type = _read_member_types(r, 1)[0]
+    total = 1
+    for n in lengths:
+        total *= n
+    marks = None
+    if element_type[0] == BT_PRIMITIVE:
+        values = _read_primitive_array(r, element_type[1], total)
+    else:
+        marks = [] if r.index is not None else None
+        values = _read_values(r, total, marks)
+    rec = BinaryArrayRecord(obj_id, array_type, lengths, values)
+    if lower_bounds is not None:
+        rec.lower_bounds = lower_bounds
+    if marks is not None:
+        rec.member_offsets = marks
+    r.objects.append(rec)
+    if r.resolve:
+        _link(r, obj_id, rec)
+    return rec
+
+def _rec_member_primitive_typed(r: _Reader) -> Record:
+    prim_type = r.byte()
+    return PrimitiveTypedRecord(prim_type, _read_primitive(r, prim_type))
+
+def _rec_member_reference(r: _Reader) -> Record:
+    return ReferenceRecord(r.int32())
+
+def _rec_object_null(r: _Reader) -> Record:
+    return OBJECT_NULL
+
+def _rec_message_end(r: _Reader) -> Record:
+    return MESSAGE_END
+
+def _rec_binary_library(r: _Reader) -> Record:
+    library_id = r.int32()
+    name = r.string()
+    r.libraries[library_id] = name
+    return LibraryRecord(library_id, name)
+
+def _rec_object_null_multiple_256(r: _Reader) -> Record:
+    return NullRunRecord("ObjectNullMultiple256", r.byte())
+
+def _rec_object_null_multiple(r: _Reader) -> Record:
+    return NullRunRecord("ObjectNullMultiple", r.int32())
+
+def _rec_array_single_primitive(r: _Reader) -> Record:
+    obj_id, length = r.int32_pair()
+    prim_type = r.byte()
+    values = _read_primitive_array(r, prim_type, length)
+    rec = PrimitiveArrayRecord(obj_id, prim_type, values)
+    r.objects.append(rec)
+    if r.resolve:
+        _link(r, obj_id, rec)
+    return rec
+
+def _rec_array_single_object(r: _Reader) -> Record:
+    obj_id, length = r.int32_pair()
+    marks = [] if r.index is not None else None
+    rec = ValueArrayRecord("ArraySingleObject", obj_id, _read_values(r, length, marks))
+    if marks is not None:
+        rec.member_offsets = marks
+    r.objects.append(rec)
+    if r.resolve:
+        _link(r, obj_id, rec)
+    return rec
+
+def _rec_array_single_string(r: _Reader) -> Record:
+    obj_id, length = r.int32_pair()
+    marks = [] if r.index is not None else None
+    rec = ValueArrayRecord("ArraySingleString", obj_id, _read_values(r, length, marks))
+    if marks is not None:
+        rec.member_offsets = marks
+    r.objects.append(rec)
+    if r.resolve:
+        _link(r, obj_id, rec)
+    return rec
+
+RECORD_HANDLERS = {
+    0: _rec_stream_header,
+    1: _rec_class_with_id,
+    2: _rec_system_class_with_members,
+    3: _rec_class_with_members,
+    4: _rec_system_class_with_members_and_types,
+    5: _rec_class_with_members_and_types,
+    6: _rec_binary_object_string,
+    7: _rec_binary_array,
+    8: _rec_member_primitive_typed,
+    9: _rec_member_reference,
+    10: _rec_object_null,
+    11: _rec_message_end,
+    12: _rec_binary_library,
+    13: _rec_object_null_multiple_256,
+    14: _rec_object_null_multiple,
+    15: _rec_array_single_primitive,
+    16: _rec_array_single_object,
+    17: _rec_array_single_string,
+}
+
+class Profile:
+    # Opt-in decoder instrumentation: count, bytes and perf_counter_ns per
+    # record type and per class name. Bytes and time are charged to the
+    # innermost record (a class's own members, not the records nested in
+    # them), so each column adds up to the whole decode.
+    __slots__ = ("records", "classes", "inner_bytes", "inner_ns", "journal")
+
+    def __init__(self):
+        self.records = [[0, 0, 0] for _ in range(len(RECORD_NAMES))]
+        self.classes = {}
+        self.inner_bytes = 0
+        self.inner_ns = 0
+        # Entries added by a streamed record that may still be retried
+        self.journal = None
+
+    def call(self, r: _Reader, handler, rec_type: int, start: int):
+        outer_bytes, outer_ns = self.inner_bytes, self.inner_ns
+        self.inner_bytes = self.inner_ns = 0
+        t0 = time.perf_counter_ns()
+        try:
+            rec = handler(r)
+        except NrbfError:
+            # Abandoned attempt (a streamed record may be retried): drop it
+            self.inner_bytes, self.inner_ns = outer_bytes, outer_ns
+            raise
+        elapsed = time.perf_counter_ns() - t0
+        size = r.pos - start
+        own_bytes = size - self.inner_bytes
+        own_ns = elapsed - self.inner_ns
+        stats = self.records[rec_type]
+        stats[0] += 1
+        stats[1] += own_bytes
+        stats[2] += own_ns
+        name = getattr(rec, "class_name", None)
+        class_stats = None
+        if name is not None:
+            class_stats = self.classes.get(name)
+            if class_stats is None:
+                class_stats = self.classes[name] = [0, 0, 0]
+            class_stats[0] += 1
+            class_stats[1] += own_bytes
+            class_stats[2] += own_ns
+        if self.journal is not None:
+            self.journal.append((stats, class_stats, own_bytes, own_ns))
+        self.inner_bytes = outer_bytes + size
+        self.inner_ns = outer_ns + elapsed
+        return rec
+
+    def rollback(self):
+        # Take back the records of an abandoned streamed attempt
+        for stats, class_stats, own_bytes, own_ns in self.journal:
+            for row in (stats, class_stats):
+                if row is not None:
+                    row[0] -= 1
+                    row[1] -= own_bytes
+                    row[2] -= own_ns
+        self.journal = []
+
+    def report(self) -> Dict[str, Any]:
+        # Both tables sorted by time, slowest first
+        def rows(items):
+            ranked = sorted(((k, v) for k, v in items if v[0]), key=lambda kv: -kv[1][2])
+            return [{"name": k, "count": v[0], "bytes": v[1], "ns": v[2]} for k, v in ranked]
+        return {
+            "records": rows((RECORD_NAMES[k], v) for k, v in enumerate(self.records)),
+            "classes": rows(self.classes.items()),
+            "ns": sum(v[2] for v in self.records),
+        }
+
+def _read_record(r: _Reader) -> Record:
+    summary = r.summary
+    while True:
+        start = r.pos
+        rec_type = r.byte()
+        handler = RECORD_HANDLERS.get(rec_type)
+        if handler is None:
+            raise NrbfError(f"unknown record type {rec_type} at offset {start}")
+        summary[rec_type] = summary.get(rec_type, 0) + 1
+        # BinaryLibrary records may precede any record that refers to them
+        if rec_type != 12:
+            if r.index is None and r.profile is None:
+                return handler(r)
+            rec = handler(r) if r.profile is None else r.profile.call(r, handler, rec_type, start)
+            if r.index is not None:
+                obj_id = getattr(rec, "id", None)
+                if obj_id is not None:
+                    marks = getattr(rec, "member_offsets", None)
+                    if marks is not None:
+                        del rec.member_offsets
+                    r.index[obj_id] = (start, rec_type, getattr(rec, "class_name", None), marks, r.pos)
+            return rec
+        if r.profile is None:
+            handler(r)
+        else:
+            r.profile.call(r, handler, rec_type, start)
+
+CLASS_RECORD_TYPES = (2, 3, 4, 5)
+
+def read_layout(r: _Reader, offset: int) -> Dict[str, Any]:
+    # Register the class layout defined by the record at offset without
+    # decoding its members; r.pos is left where it was
+    pos = r.pos
+    r.pos = offset
+    try:
+        rec_type = r.byte()
+        if rec_type not in CLASS_RECORD_TYPES:
+            raise NrbfError(f"no class definition at offset {offset} (record type {rec_type})")
+        obj_id, name, members = _read_class_info(r)
+        types = _read_member_types(r, len(members)) if rec_type in (4, 5) else None
+        library_id = r.int32() if rec_type in (3, 5) else None
+        return _register_class(r, obj_id, name, members, types, library_id)
+    finally:
+        r.pos = pos
+
+def index_records(data) -> Dict[str, Any]:
+    # One pass recording where every id'd record starts and ends and where
+    # each class member or record-valued array element sits; decoded values
+    # are dropped record by record
+    r = _Reader(data)
+    r.index = {}
+    root_id = None
+    error = None
+    try:
+        while r.pos < r.end:
+            rec = _read_record(r)
+            del r.objects[:]
+            r.strings.clear()
+            if rec.type == "SerializedStreamHeader":
+                root_id = rec.root_id
+            elif rec is MESSAGE_END:
+                break
+    except NrbfError as e:
+        error = str(e)
+    return {"root_id": root_id, "libraries": r.libraries, "entries": r.index, "offset_last": r.pos, "error": error}
+
+# Counts-only walk: the same record grammar as _read_record, but values are
+# stepped over rather than decoded and nothing is allocated per record.
+# Handlers return how many value slots the record fills (null runs fill
+# several, BinaryLibrary none).
+class _Counts:
+    __slots__ = ("records", "bytes", "classes", "inner", "root_id")
+
+    def __init__(self):
+        self.records = [0] * len(RECORD_NAMES)
+        self.bytes = [0] * len(RECORD_NAMES)
+        # Instances per class layout, in registration order (meta["slot"])
+        self.classes = []
+        # Bytes of nested records inside the record being walked
+        self.inner = 0
+        self.root_id = None
+
+def _skip(r: _Reader, n: int):
+    r.need(n)
+    r.pos += n
+
+def _skip_string_body(r: _Reader):
+    length = r.string_length()  # checks the payload is present
+    r.pos += length
+
+def _skip_primitive(r: _Reader, prim_type: int):
+    fixed = _FIXED_PRIMITIVES.get(prim_type)
+    if fixed is not None:
+        _skip(r, fixed[1])
+    elif prim_type in (PRIM_DECIMAL, PRIM_STRING):
+        _skip_string_body(r)
+    elif prim_type == PRIM_CHAR:
+        lead = r.data[r.pos] if r.pos < r.end else 0
+        _skip(r, 1 if lead < 0x80 else 2 if lead < 0xE0 else 3 if lead < 0xF0 else 4)
+    elif prim_type != PRIM_NULL:
+        raise NrbfError(f"unknown primitive type {prim_type} at offset {r.pos}")
+
+def _skip_primitive_array(r: _Reader, prim_type: int, length: int):
+    if length < 0:
+        raise NrbfError(f"negative array length {length} at offset {r.pos}")
+    fixed = _FIXED_PRIMITIVES.get(prim_type)
+    if fixed is not None:
+        _skip(r, fixed[1] * length)
+    else:
+        if prim_type == PRIM_NULL:
+            raise NrbfError(f"array of Null primitives at offset {r.pos}")
+        r.need(length)
+        for _ in range(length):
+            _skip_primitive(r, prim_type)
+
+def _skip_values(r: _Reader, c: _Counts, count: int):
+    filled = 0
+    while filled < count:
+        filled += _skip_record(r, c)
+    if filled > count:
+        raise NrbfError(f"null run overflows value list at offset {r.pos}")
+    return 1
+
+def _skip_object(r: _Reader, c: _Counts, meta: Dict[str, Any]) -> int:
+    slot = meta.get("slot")
+    if slot is None:
+        slot = meta["slot"] = len(c.classes)
+        c.classes.append(0)
+    c.classes[slot] += 1
+    nulls = 0
+    for step in meta["steps"]:
+        kind = step[0]
+        if kind == _STEP_FIXED:
+            _skip(r, step[2])
+        elif kind == _STEP_PRIMITIVE:
+            _skip_primitive(r, step[1])
+        elif nulls:
+            nulls -= 1
+        else:
+            filled = 0
+            while not filled:
+                filled = _skip_record(r, c)
+            nulls = filled - 1
+    if nulls:
+        raise NrbfError(f"null run overflows member list at offset {r.pos}")
+    return 1
+
+def _skip_stream_header(r: _Reader, c: _Counts) -> int:
+    _stream_header_at_start(r)
+    r.need(_STREAM_HEADER.size)
+    c.root_id = _unpack_int32(r.data, r.pos)[0]
+    r.pos += _STREAM_HEADER.size
+    return 1
+
+def _skip_class_with_id(r: _Reader, c: _Counts) -> int:
+    _, metadata_id = r.int32_pair()
+    try:
+        meta = r.classes[metadata_id]
+    except KeyError:
+        raise NrbfError(f"ClassWithId references unknown metadata {metadata_id} at offset {r.pos}") from None
+    return _skip_object(r, c, meta)
+
+def _skip_class_definition(r: _Reader, c: _Counts, with_types: bool, with_library: bool) -> int:
+    obj_id, name, members = _read_class_info(r)
+    types = _read_member_types(r, len(members)) if with_types else None
+    library_id = r.int32() if with_library else None
+    return _skip_object(r, c, _register_class(r, obj_id, name, members, types, library_id))
+
+def _skip_binary_array(r: _Reader, c: _Counts) -> int:
+    _skip(r, 4)
+    array_type = r.byte()
+    rank = _read_rank(r)
+    total = 1
+    for _ in range(rank):
+        total *= r.int32()
+    if array_type in (3, 4, 5):
+        _skip(r, 4 * rank)
+    bt, info = _read_member_types(r, 1)[0]
+    if bt == BT_PRIMITIVE:
+        _skip_primitive_array(r, info, total)
+        return 1
+    return _skip_values(r, c, total)
+
+def _skip_member_primitive_typed(r: _Reader, c: _Counts) -> int:
+    _skip_primitive(r, r.byte())
+    return 1
+
+def _skip_binary_library(r: _Reader, c: _Counts) -> int:
+    _skip(r, 4)
+    _skip_string_body(r)
+    return 0
+
+def _skip_array_single_primitive(r: _Reader, c: _Counts) -> int:
+    _, length = r.int32_pair()
+    _skip_primitive_array(r, r.byte(), length)
+    return 1
+
+def _skip_array_single_values(r: _Reader, c: _Counts) -> int:
+    _, length = r.int32_pair()
+    return _skip_values(r, c, length)
+
+def _skip_string(r: _Reader, c: _Counts) -> int:
+    _skip(r, 4)
+    _skip_string_body(r)
+    return 1
+
+SKIP_HANDLERS = {
+    0: _skip_stream_header,
+    1: _skip_class_with_id,
+    2: lambda r, c: _skip_class_definition(r, c, False, False),
+    3: lambda r, c: _skip_class_definition(r, c, False, True),
+    4: lambda r, c: _skip_class_definition(r, c, True, False),
+    5: lambda r, c: _skip_class_definition(r, c, True, True),
+    6: _skip_string,
+    7: _skip_binary_array,
+    8: _skip_member_primitive_typed,
+    9: lambda r, c: _skip(r, 4) or 1,
+    10: lambda r, c: 1,
+    11: lambda r, c: 1,
+    12: _skip_binary_library,
+    13: lambda r, c: r.byte(),
+    14: lambda r, c: r.int32(),
+    15: _skip_array_single_primitive,
+    16: _skip_array_single_values,
+    17: _skip_array_single_values,
+}
+
+def _skip_record(r: _Reader, c: _Counts) -> int:
+    start = r.pos
+    rec_type = r.byte()
+    handler = SKIP_HANDLERS.get(rec_type)
+    if handler is None:
+        raise NrbfError(f"unknown record type {rec_type} at offset {start}")
+    outer = c.inner
+    c.inner = 0
+    filled = handler(r, c)
+    size = r.pos - start
+    # Bytes are charged to the innermost record, so the totals add up to the stream
+    c.records[rec_type] += 1
+    c.bytes[rec_type] += size - c.inner
+    c.inner = outer + size
+    return filled
+
+def summarize(data) -> Dict[str, Any]:
+    # Record-type counts, bytes per record type and instances per class for
+    # the whole stream, without building records, values or the graph
+    r = _Reader(data)
+    c = _Counts()
+    result = {}
+    try:
+        while r.pos < r.end:
+            rec_type = r.data[r.pos]
+            _skip_record(r, c)
+            if rec_type == 11:
+                break
+    except NrbfError as e:
+        result["error"] = str(e)
+        result["error_offset"] = r.pos
+    classes = {}
+    for meta in r.classes.values():
+        if "slot" in meta:
+            classes[meta["name"]] = classes.get(meta["name"], 0) + c.classes[meta["slot"]]
+    result.update({
+        "root_id": c.root_id,
+        "record_summary": {RECORD_NAMES[k]: n for k, n in enumerate(c.records) if n},
+        "record_bytes": {RECORD_NAMES[k]: n for k, n in enumerate(c.bytes) if c.records[k]},
+        "class_summary": dict(sorted(classes.items(), key=lambda kv: -kv[1])),
+        "libraries": r.libraries,
+        "offset_last": r.pos,
+    })
+    return result
+
+# Strings-only scan: BinaryObjectString, class and library records are found
+# with compiled regexes over the raw bytes instead of walking the grammar.
+# A candidate is a record type byte, an id in 1..2**24-1 and a length
+# prefix followed by text (or, for BinaryObjectString, an empty string).
+# One pattern per type byte gives each a literal prefix, which re searches
+# for at memchr speed; the rest is a lookahead checked in C, so candidates
+# may overlap and Python only sees the plausible ones.
+_SCAN_TEXT = rb"[^\x00-\x08\x0b\x0c\x0e-\x1f]"
+_SCAN_PATTERNS = tuple(
+    re.compile(re.escape(bytes([rec_type])) + rb"(?=(?!\x00\x00\x00)[\x00-\xff]{3}\x00(?:"
+               + (rb"\x00|" if rec_type == 6 else b"") + rb"[\x01-\x7f]" + _SCAN_TEXT + rb"|[\x80-\xff]{1,4}" + _SCAN_TEXT + rb"))")
+    for rec_type in (2, 3, 4, 5, 6, 12)
+)
+_SCAN_CONTROL = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+def _scan_text(data, pos: int, end: int):
+    # (str, end offset) of a LengthPrefixedString at pos, or (None, pos) if
+    # it is not strict UTF-8 text
+    length = 0
+    for shift in range(0, 35, 7):
+        if pos >= end:
+            return None, pos
+        b = data[pos]
+        pos += 1
+        length |= (b & 0x7F) << shift
+        if b < 0x80:
+            break
+    else:
+        return None, pos
+    if pos + length > end:
+        return None, pos
+    try:
+        value = str(data[pos:pos + length], "utf-8")
+    except UnicodeDecodeError:
+        return None, pos
+    if _SCAN_CONTROL.search(value):
+        return None, pos
+    return value, pos + length
+
+def scan_strings(data) -> Dict[str, Any]:
+    # Triage view of a save without decoding it: the strings table decode()
+    # builds ({id: value} for every BinaryObjectString), library names and
+    # class names with their member names. A match's text is consumed, so
+    # bytes inside a string are never rescanned. The scan cannot tell a
+    # real record from bytes that merely look like one, so it may add rare
+    # extra entries (mostly empty strings), but it finds every string whose
+    # payload is valid UTF-8 text.
+    end = len(data)
+    strings = {}
+    libraries = {}
+    classes = {}
+    matches = heapq.merge(*(p.finditer(data) for p in _SCAN_PATTERNS), key=lambda m: m.start())
+    pos = 0
+    for m in matches:
+        at = m.start()
+        if at < pos:
+            continue
+        obj_id = _unpack_int32(data, at + 1)[0]
+        if obj_id > end:
+            # Every id belongs to a record of at least a byte
+            continue
+        value, after = _scan_text(data, at + 5, end)
+        if value is None:
+            continue
+        rec_type = data[at]
+        if rec_type == 6:
+            strings.setdefault(obj_id, value)
+            if not value:
+                # Nothing to skip, and the header bytes may start a real record
+                continue
+        elif rec_type == 12:
+            libraries.setdefault(obj_id, value)
+        else:
+            # ClassInfo: member count, then that many names
+            if after + 4 > end:
+                continue
+            count = _unpack_int32(data, after)[0]
+            after += 4
+            if not 0 <= count <= end - after:
+                continue
+            members = []
+            for _ in range(count):
+                name, after = _scan_text(data, after, end)
+                if not name:
+                    break
+                members.append(name)
+            else:
+                classes.setdefault(value, members)
+                pos = after
+            continue
+        pos = after
+    return {"strings": strings, "libraries": libraries, "classes": classes, "offset_last": end}
+
+def read_buffer(path: str, use_mmap: bool = True):
+    # mmap regular files so the decoder runs straight off the page cache;
+    # pipes, FIFOs, empty files and stdin ("-") fall back to a buffered read
+    if path == "-":
+        return sys.stdin.buffer.read()
+    with open(path, "rb") as f:
+        if use_mmap:
+            try:
+                st = os.fstat(f.fileno())
+                if stat.S_ISREG(st.st_mode) and st.st_size > 0:
+                    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                pass
+        return f.read()
+
+def decode(data, zero_copy: bool = False, resolve_refs: bool = False, profile: bool = False,
+           recover: bool = False) -> Dict[str, Any]:
+    # zero_copy: decode over a memoryview and keep BinaryObjectString payloads
+    # as StringSpan until read (result["strings"] is then a StringTable).
+    # resolve_refs: patch MemberReference slots with the objects they point
+    # to during the same pass and expose the graph as result["root"].
+    # profile: time every record (result["profile"], see Profile.report).
+    # recover: on a record that fails to decode, skip ahead to the next
+    # plausible record header instead of stopping (result["skipped"]).
+    r = _Reader(data, zero_copy, resolve_refs)
+    if profile:
+        r.profile = Profile()
+    result = _new_result(r)
+    records = result["records"]
+    if recover:
+        result["skipped"] = []
+        return _finish(r, _decode_recovering(r, result))
+    try:
+        while r.pos < r.end:
+            rec = _read_record(r)
+            records.append(rec)
+            if rec is MESSAGE_END:
+                break
+    except NrbfError as e:
+        result["error"] = str(e)
+        result["error_offset"] = r.pos
+    return _finish(r, result)
+
+# Top-level records that start with an object (or library) id: a type byte
+# and a little-endian int32 below 2**24. Zero-width so candidates may overlap.
+_RESYNC_HEADER = re.compile(rb"[\x01-\x07\x0c\x0f-\x11](?=[\x00-\xff]{3}\x00)")
+# A candidate's id may run this far past the highest id decoded so far,
+# plus one per byte skipped
+_RESYNC_SLACK = 1 << 16
+# Records that must decode back to back from a candidate, within a window
+# of this many bytes, before it is taken
+_RESYNC_RUN = 3
+_RESYNC_WINDOW = 1 << 20
+
+def _decode_recovering(r: _Reader, result: Dict[str, Any]) -> Dict[str, Any]:
+    # decode() with recover=True. Every top-level record is tried from a
+    # checkpoint; one that fails is rolled back and the bytes from its start
+    # to the next header _resync accepts are reported as one skipped span.
+    records = result["records"]
+    while r.pos < r.end:
+        mark = _checkpoint(r)
+        try:
+            rec = _read_record(r)
+        except NrbfError as e:
+            start = mark[0]
+            _rollback(r, mark)
+            r.pos = _resync(r, start + 1)
+            skipped = result["skipped"]
+            if skipped and skipped[-1]["end"] == start:
+                skipped[-1]["end"] = r.pos
+            else:
+                skipped.append({"start": start, "end": r.pos, "error": str(e)})
+            continue
+        records.append(rec)
+        if rec is MESSAGE_END:
+            break
+    r.journal = None
+    if r.profile is not None:
+        r.profile.journal = None
+    return result
+
+def _known_ids(r: _Reader):
+    if r.resolve:
+        return set(r.ids)
+    known = set(r.strings)
+    known.update(obj.id for obj in r.objects)
+    return known
+
+def _resync(r: _Reader, pos: int) -> int:
+    # Offset of the next record that decodes cleanly at the top level, or
+    # the end of the buffer. Candidate headers come from one regex scan; ids
+    # already decoded, or far beyond the highest one, are dismissed before
+    # a trial decode, which must get through a short run of records. Trials
+    # run on a zero-copy scratch reader over a bounded window, so a garbage
+    # length costs at most the window and r is left as it was.
+    known = _known_ids(r)
+    high = max(known, default=0) + _RESYNC_SLACK - pos
+    data = r.data
+    trial = _Reader(data, zero_copy=True)
+    for m in _RESYNC_HEADER.finditer(data, pos, r.end):
+        at = m.start()
+        obj_id = _unpack_int32(data, at + 1)[0]
+        if data[at] == 12:
+            if obj_id in r.libraries:
+                continue
+        elif obj_id == 0 or obj_id in known or (obj_id > high + at and obj_id not in r.pending):
+            continue
+        trial.pos = at
+        trial.end = min(r.end, at + _RESYNC_WINDOW)
+        trial.classes = dict(r.classes)
+        trial.libraries = dict(r.libraries)
+        try:
+            for _ in range(_RESYNC_RUN):
+                if trial.pos >= trial.end or _read_record(trial) is MESSAGE_END:
+                    break
+        except NrbfError:
+            continue
+        finally:
+            del trial.objects[:]
+            trial.strings.clear()
+        return at
+    return r.end
+
+def _checkpoint(r: _Reader):
+    # State to return to if the next top-level record is abandoned
+    if r.resolve:
+        r.journal = []
+    if r.profile is not None:
+        r.profile.journal = []
+    return r.pos, dict(r.summary), len(r.objects), len(r.strings)
+
+def _rollback(r: _Reader, mark):
+    r.pos, r.summary, objects, strings = mark
+    del r.objects[objects:]
+    while len(r.strings) > strings:
+        r.strings.popitem()
+    if r.resolve:
+        _undo(r)
+    if r.profile is not None:
+        r.profile.rollback()
+
+def decode_stream(source, chunk_size: int = 1 << 16, resolve_refs: bool = False, profile: bool = False) -> Dict[str, Any]:
+    # decode() over iter_records: same result shape (records, objects and
+    # strings included), but the input is only ever held one chunk (or one
+    # record) at a time
+    r = _Reader(bytearray(), resolve=resolve_refs)
+    if profile:
+        r.profile = Profile()
+    result = _new_result(r)
+    records = result["records"]
+    try:
+        for rec in _iter_records(r, _iter_chunks(source, chunk_size), chunk_size, keep=True):
+            records.append(rec)
+    except NrbfError as e:
+        result["error"] = str(e)
+        result["error_offset"] = r.base + r.pos
+    return _finish(r, result)
+
+def _new_result(r: _Reader) -> Dict[str, Any]:
+    return {
+        "__binary__": True,
+        "records": [],
+        "strings": StringTable(r.strings) if r.zero_copy else r.strings,
+        "objects": r.objects,
+        "libraries": r.libraries,
+        "record_summary": {},
+    }
+
+def _finish(r: _Reader, result: Dict[str, Any]) -> Dict[str, Any]:
+    records = result["records"]
+    result["record_summary"] = {RECORD_NAMES[k]: v for k, v in r.summary.items()}
+    result["offset_last"] = r.base + r.pos
+    if records and records[0].type == "SerializedStreamHeader":
+        result["root_id"] = records[0].root_id
+    if r.resolve:
+        result["root"] = r.ids.get(result.get("root_id"))
+        result["unresolved_refs"] = sorted(r.pending)
+    if r.profile is not None:
+        result["profile"] = r.profile.report()
+    return result
+
+def to_tree(value, _seen=None):
+    # Plain dicts/lists from a resolved graph: objects become their members,
+    # arrays their values. A node reached a second time becomes {"$ref": id},
+    # which keeps the output finite on shared or cyclic graphs.
+    if not isinstance(value, Record):
+        return value
+    if _seen is None:
+        _seen = set()
+    obj_id = getattr(value, "id", None)
+    if obj_id is not None:
+        if obj_id in _seen:
+            return {"$ref": obj_id}
+        _seen.add(obj_id)
+    if type(value) is ClassRecord:
+        return {k: to_tree(v, _seen) for k, v in value.members.items()}
+    values = getattr(value, "elements", None)
+    if values is not None:
+        return [to_tree(v, _seen) for v in values] if type(values) is list else values
+    return dict(value)
+
+def _iter_chunks(source, chunk_size: int) -> Iterator[bytes]:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield source
+    elif hasattr(source, "read"):
+        yield from iter(lambda: source.read(chunk_size), b"")
+    else:
+        yield from source
+
+def iter_records(source, chunk_size: int = 1 << 16) -> Iterator[Record]:
+    # Yield top-level records as soon as each one is complete. source is a
+    # binary file object, an iterator of byte chunks, or a bytes-like object.
+    # Only class layouts are kept between records, so memory stays bounded
+    # by the largest single record rather than the stream.
+    return _iter_records(_Reader(bytearray()), _iter_chunks(source, chunk_size), chunk_size)
+
+def _iter_records(r: _Reader, chunks: Iterator[bytes], chunk_size: int, keep: bool = False) -> Iterator[Record]:
+    # keep: leave r.objects and r.strings growing for a caller that builds
+    # the whole result; otherwise they are dropped record by record
+    buf = r.data
+    while True:
+        if r.pos >= len(buf):
+            chunk = next(chunks, None)
+            if chunk is None:
+                return
+            buf += chunk
+            r.end = len(buf)
+            continue
+        start = r.pos
+        mark = _checkpoint(r)
+        try:
+            rec = _read_record(r)
+        except NrbfTruncated:
+            # Roll back and retry once the pending bytes have at least doubled,
+            # so a record spanning many chunks is re-parsed O(log n) times
+            _rollback(r, mark)
+            want = max((len(buf) - start) * 2, chunk_size)
+            grew = False
+            while len(buf) - start < want:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                buf += chunk
+                grew = True
+            r.end = len(buf)
+            if not grew:
+                raise
+            continue
+        if not keep:
+            del r.objects[:]
+            r.strings.clear()
+        yield rec
+        if rec is MESSAGE_END:
+            return
+        if r.pos >= chunk_size:
+            del buf[:r.pos]
+            r.base += r.pos
+            r.pos = 0
+            r.end = len(buf)
@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+import argparse, bisect, collections, gc, itertools, json, operator, os, struct, sys, time
+from typing import Dict, Any, List, Optional
+
+try:
+    from tools import nrbf, nrbf_index
+except ImportError:  # run as a script from inside tools/
+    import nrbf, nrbf_index
+
+# Slot record types that carry an object id right after the type byte and
+# may hold references further down
+_NESTED_WITH_ID = frozenset((1, 2, 3, 4, 5, 7, 15, 16, 17))
+_MEMBER_REFERENCE = 9
+_MISSING = object()
+_PLAIN = (int, float, str, bool)
+
+def _child_path(path: str, key) -> str:
+    if isinstance(key, int):
+        return f"{path}[{key}]"
+    return f"{path}.{key}" if path else key
+
+def _plain(value):
+    # JSON-friendly stand-in for a reported value
+    if isinstance(value, nrbf.ClassRecord):
+        return {"class": value.class_name}
+    if isinstance(value, nrbf.Record):
+        if "values" in value:
+            return {"length": len(value.elements)}
+        return dict(value)
+    if isinstance(value, nrbf.StringSpan):
+        return str(value)
+    return value
+
+# Byte ranges are narrowed by halving until they are at most this long
+_BLOCK = 1 << 20
+_GRAIN = 64
+# Aligned diffs locate each changed top-level record's referrer with one
+# bytes.find over the save; past this many it is cheaper to walk the graph
+_FIND_LIMIT = 64
+
+def diff_ranges(a, b, start: int, end: int, grain: int = _GRAIN):
+    # (start, end) spans of at most `grain` bytes where a and b differ; equal
+    # halves are dismissed with one slice comparison each
+    if a[start:end] == b[start:end]:
+        return
+    if end - start <= grain:
+        yield start, end
+        return
+    mid = (start + end) // 2
+    yield from diff_ranges(a, b, start, mid, grain)
+    yield from diff_ranges(a, b, mid, end, grain)
+
+class _Differ:
+    # Aligns both graphs by member name and array index from the root.
+    #
+    # When both indexes lay out the same ids at the same offsets (the usual
+    # case for snapshots minutes apart), only byte ranges that differ are
+    # looked at: each is mapped to the innermost record holding it, those
+    # records alone are decoded, and their paths are found by climbing to
+    # the root. Otherwise the graphs are walked in step, and a record whose
+    # bytes (ids included) are identical is not decoded: only its reference
+    # slots are peeked to continue the walk.
+    def __init__(self, a: nrbf_index.SaveIndex, b: nrbf_index.SaveIndex):
+        self.a = a
+        self.b = b
+        self.changes = []
+        self.seen = set()
+        self.queue = collections.deque()
+        self.paths = {}
+        self.parents = {}
+        self.tops = None
+        self.stats = {"mode": "walk", "records_visited": 0, "records_identical": 0, "records_decoded": 0, "bytes_skipped": 0}
+
+    def aligned(self) -> bool:
+        ea, eb = self.a.entries, self.b.entries
+        return (len(self.a.data) == len(self.b.data) and ea.ids == eb.ids
+                and ea.offsets == eb.offsets and ea.lengths == eb.lengths)
+
+    def run(self) -> List[Dict[str, Any]]:
+        if self.aligned():
+            changed = self.changed_rows()
+            if len(changed) <= _FIND_LIMIT:
+                self.run_aligned(changed)
+                return self.changes
+        self.queue.append((self.a.root_id, self.b.root_id, "", False))
+        while self.queue:
+            self.visit(*self.queue.popleft())
+        return self.changes
+
+    def changed_rows(self) -> List[int]:
+        # Rows (file order) of the innermost records holding differing bytes.
+        # Header and library bytes belong to no row and are not reported.
+        a, b = self.a.data, self.b.data
+        rows = set()
+        size = len(a)
+        for block in range(0, size, _BLOCK):
+            for start, end in diff_ranges(a, b, block, min(block + _BLOCK, size)):
+                for pos in range(start, end):
+                    if a[pos] != b[pos]:
+                        i = self.innermost(pos)
+                        if i is not None:
+                            rows.add(i)
+        return sorted(rows)
+
+    def innermost(self, pos: int) -> Optional[int]:
+        entries = self.a.entries
+        i = bisect.bisect_right(entries.offsets, pos) - 1
+        while i is not None and i >= 0 and entries.offsets[i] + entries.lengths[i] <= pos:
+            i = self.parent(i)
+        return i if i is not None and i >= 0 else None
+
+    def top_level(self) -> bytearray:
+        # 1 for rows no earlier record encloses: those starting at or after
+        # the furthest end seen so far
+        if self.tops is None:
+            entries = self.a.entries
+            ends = map(operator.add, entries.offsets, entries.lengths)
+            reach = itertools.accumulate(ends, max, initial=0)
+            self.tops = bytearray(map(operator.ge, entries.offsets, reach))
+        return self.tops
+
+    def parent(self, i: int) -> Optional[int]:
+        # Row of the innermost record containing row i, None at top level.
+        # Earlier rows that end before i starts are skipped a subtree at a
+        # time via their own parents, resolved iteratively and memoised.
+        tops = self.top_level()
+        entries = self.a.entries
+        offsets, lengths, parents = entries.offsets, entries.lengths, self.parents
+        pending = [i]
+        while pending:
+            k = pending[-1]
+            if tops[k] or k in parents:
+                pending.pop()
+                continue
+            start = offsets[k]
+            j = k - 1
+            while offsets[j] + lengths[j] <= start:
+                if tops[j]:
+                    j = None  # unreachable for a nested row; kept for safety
+                    break
+                if j not in parents:
+                    pending.append(j)
+                    break
+                j = parents[j]
+            else:
+                parents[k] = j
+                pending.pop()
+                continue
+            if j is None:
+                parents[k] = None
+                pending.pop()
+        return None if tops[i] else parents[i]
+
+    def slot_key(self, container: int, offset: int):
+        # Member name or array index of the slot at offset in a container row
+        entries = self.a.entries
+        obj_id = entries.ids[container]
+        marks = entries.row(container)[3] or ()
+        try:
+            i = marks.index(offset)
+        except ValueError:
+            return None
+        if entries.types[container] == 1 or entries.types[container] in nrbf.CLASS_RECORD_TYPES:
+            return self.a.layout(obj_id)["members"][i]
+        return i
+
+    def path_of(self, i: int) -> str:
+        entries = self.a.entries
+        obj_id = entries.ids[i]
+        if obj_id in self.paths:
+            return self.paths[obj_id]
+        self.paths[obj_id] = f"#{obj_id}"  # placeholder while climbing a cycle
+        if obj_id == self.a.root_id:
+            path = ""
+        else:
+            path = None
+            container = self.parent(i)
+            if container is not None:
+                key = self.slot_key(container, entries.offsets[i])
+                if key is not None:
+                    path = _child_path(self.path_of(container), key)
+            else:
+                path = self.referrer_path(obj_id)
+            if path is None:
+                path = f"#{obj_id}"
+        self.paths[obj_id] = path
+        return path
+
+    def referrer_path(self, obj_id: int) -> Optional[str]:
+        # First MemberReference slot pointing at obj_id; candidate hits are
+        # accepted only where the containing record has a slot
+        data = self.a.data
+        needle = bytes((_MEMBER_REFERENCE,)) + struct.pack("<i", obj_id)
+        pos = data.find(needle)
+        while pos >= 0:
+            container = self.innermost(pos)
+            if container is not None:
+                key = self.slot_key(container, pos)
+                if key is not None:
+                    return _child_path(self.path_of(container), key)
+            pos = data.find(needle, pos + 1)
+        return None
+
+    def run_aligned(self, changed: List[int]):
+        # A nested record is decoded with its container, so only changed rows
+        # without a changed ancestor are compared; equal-id references are not
+        # followed since their targets are in the changed list if they differ
+        entries = self.a.entries
+        self.stats["mode"] = "aligned"
+        wanted = set(changed)
+        outer = []
+        for i in changed:
+            j = self.parent(i)
+            while j is not None and j not in wanted:
+                j = self.parent(j)
+            if j is None:
+                outer.append(i)
+        for i in outer:
+            obj_id = entries.ids[i]
+            self.stats["records_decoded"] += 2
+            self.compare(nrbf._value_of(self.a.read(obj_id)), nrbf._value_of(self.b.read(obj_id)), self.path_of(i))
+        self.stats["records_changed"] = len(changed)
+        self.stats["bytes_skipped"] = len(self.a.data) - sum(entries.lengths[i] for i in outer)
+
+    def change(self, path: str, old, new):
+        entry = {"path": path, "old": _plain(old), "new": _plain(new)}
+        if type(old) in (int, float) and type(new) in (int, float):
+            entry["delta"] = new - old
+        self.changes.append(entry)
+
+    def visit(self, a_id: int, b_id: int, path: str, inline: bool = False):
+        if (a_id, b_id) in self.seen:
+            return
+        self.seen.add((a_id, b_id))
+        self.stats["records_visited"] += 1
+        ea = self.a.entries.get(a_id)
+        eb = self.b.entries.get(b_id)
+        if ea is None or eb is None:
+            self.change(path, {"$ref": a_id}, {"$ref": b_id})
+            return
+        if ea[2] != eb[2]:
+            self.change(path, {"class": ea[2]}, {"class": eb[2]})
+            return
+        if a_id == b_id and self.a.data[ea[0]:ea[4]] == self.b.data[eb[0]:eb[4]]:
+            self.stats["records_identical"] += 1
+            if not inline:  # nested records were counted with their parent
+                self.stats["bytes_skipped"] += ea[4] - ea[0]
+            self.follow(a_id, ea, path)
+            return
+        self.stats["records_decoded"] += 2
+        self.compare(nrbf._value_of(self.a.read(a_id)), nrbf._value_of(self.b.read(b_id)), path)
+
+    def follow(self, obj_id: int, entry: tuple, path: str):
+        # Identical bytes: same values and same ids, so only what the slots
+        # point at can differ. Primitive members are skipped via the layout.
+        marks = entry[3]
+        if not marks:
+            return
+        data = self.a.data
+        if entry[1] == 1 or entry[1] in nrbf.CLASS_RECORD_TYPES:
+            meta = self.a.layout(obj_id)
+            types = meta["types"]
+            keys = meta["members"]
+        else:
+            types = None
+            keys = range(len(marks))
+        for i, offset in enumerate(marks):
+            if types is not None and types[i][0] == nrbf.BT_PRIMITIVE:
+                continue
+            rec_type = data[offset]
+            if rec_type == _MEMBER_REFERENCE or rec_type in _NESTED_WITH_ID:
+                target = nrbf._unpack_int32(data, offset + 1)[0]
+                self.queue.append((target, target, _child_path(path, keys[i]), rec_type != _MEMBER_REFERENCE))
+
+    def resolve(self, side: nrbf_index.SaveIndex, value):
+        if type(value) is nrbf.Ref and value.id in side.entries:
+            return nrbf._value_of(side.read(value.id))
+        return value
+
+    def compare(self, va, vb, path: str):
+        ref_a = type(va) is nrbf.Ref
+        ref_b = type(vb) is nrbf.Ref
+        if ref_a and ref_b:
+            if va.id == vb.id and self.stats["mode"] == "aligned":
+                return  # the target is compared on its own if it changed
+            self.queue.append((va.id, vb.id, path, False))
+            return
+        if ref_a or ref_b:
+            # Shared on one side, inline on the other: compare the targets
+            va, vb = self.resolve(self.a, va), self.resolve(self.b, vb)
+            if type(va) is nrbf.Ref or type(vb) is nrbf.Ref:
+                self.change(path, va, vb)
+                return
+        rec_a, rec_b = isinstance(va, nrbf.Record), isinstance(vb, nrbf.Record)
+        if rec_a and rec_b:
+            if type(va) is nrbf.ClassRecord and type(vb) is nrbf.ClassRecord:
+                if va.class_name != vb.class_name:
+                    self.change(path, va, vb)
+                    return
+                ma, mb = va.members, vb.members
+                for name in ma:
+                    self.compare(ma[name], mb.get(name, _MISSING), _child_path(path, name))
+                for name in mb:
+                    if name not in ma:
+                        self.compare(_MISSING, mb[name], _child_path(path, name))
+                return
+            if "values" in va and "values" in vb:
+                self.compare_values(va.elements, vb.elements, path)
+                return
+            if va != vb:
+                self.change(path, va, vb)
+            return
+        if va is _MISSING or vb is _MISSING:
+            self.change(path, None if va is _MISSING else va, None if vb is _MISSING else vb)
+            return
+        if rec_a or rec_b:
+            self.change(path, va, vb)
+            return
+        if va != vb:
+            self.change(path, va, vb)
+
+    def compare_values(self, xs, ys, path: str):
+        if type(xs) is not list and xs == ys:
+            return  # primitive arrays compare in C
+        n = min(len(xs), len(ys))
+        if type(xs) is list or type(ys) is list:
+            for i in range(n):
+                self.compare(xs[i], ys[i], f"{path}[{i}]")
+        else:
+            for i in range(n):
+                if xs[i] != ys[i]:
+                    self.change(f"{path}[{i}]", xs[i], ys[i])
+        for i in range(n, len(xs)):
+            self.change(f"{path}[{i}]", _plain(xs[i]), None)
+        for i in range(n, len(ys)):
+            self.change(f"{path}[{i}]", None, _plain(ys[i]))
+
+class _DecodedDiffer(_Differ):
+    # The same walk over two plain decodes, for saves without sidecars:
+    # building both indexes costs several decodes, so a one-off diff is
+    # cheaper without them. Refs are looked up by id instead of read
+    # through an index.
+    def __init__(self, a: Dict[str, Any], b: Dict[str, Any]):
+        super().__init__(a, b)
+        self.ids_a = self.by_id(a)
+        self.ids_b = self.by_id(b)
+        self.layouts = {}
+        self.stats = {"mode": "decode", "records_visited": 0, "records_decoded": len(a["records"]) + len(b["records"])}
+
+    @staticmethod
+    def by_id(result: Dict[str, Any]) -> Dict[int, Any]:
+        ids = dict(result["strings"])
+        ids.update((rec.id, rec) for rec in result["objects"])
+        return ids
+
+    def run(self) -> List[Dict[str, Any]]:
+        self.queue.append((self.a.get("root_id"), self.b.get("root_id"), "", False))
+        while self.queue:
+            self.visit(*self.queue.popleft())
+        return self.changes
+
+    def visit(self, a_id: int, b_id: int, path: str, inline: bool = False):
+        if (a_id, b_id) in self.seen:
+            return
+        self.seen.add((a_id, b_id))
+        self.stats["records_visited"] += 1
+        va = self.ids_a.get(a_id, _MISSING)
+        vb = self.ids_b.get(b_id, _MISSING)
+        if va is _MISSING or vb is _MISSING:
+            self.change(path, {"$ref": a_id}, {"$ref": b_id})
+            return
+        self.compare(va, vb, path)
+
+    def resolve(self, side, value):
+        if type(value) is nrbf.Ref:
+            return (self.ids_a if side is self.a else self.ids_b).get(value.id, value)
+        return value
+
+    def same_layout(self, la: nrbf.Layout, lb: nrbf.Layout) -> bool:
+        key = (id(la), id(lb))
+        same = self.layouts.get(key)
+        if same is None:
+            same = self.layouts[key] = la.class_name == lb.class_name and la.slots == lb.slots
+        return same
+
+    def compare(self, va, vb, path: str):
+        # Every record is visited here (there are no bytes to skip), so
+        # objects of one class check their plain members inline and send
+        # only references and nested records down the general comparison
+        if type(va) is nrbf.ClassRecord and type(vb) is nrbf.ClassRecord and self.same_layout(va.layout, vb.layout):
+            fa, fb = va.fields, vb.fields
+            for name, i in va.layout.slots.items():
+                x, y = fa[i], fb[i]
+                if type(x) in _PLAIN and type(y) is type(x):
+                    if x != y:
+                        self.change(_child_path(path, name), x, y)
+                else:
+                    self.compare(x, y, _child_path(path, name))
+            return
+        super().compare(va, vb, path)
+
+def _decode_save(path: str, data: bytes) -> Dict[str, Any]:
+    result = nrbf.decode(data)
+    if "error" in result:
+        raise nrbf.NrbfError(f"cannot diff {path}: {result['error']}")
+    return result
+
+def diff_saves(path_a: str, path_b: str, check_hash: bool = True, write_index: bool = True) -> Dict[str, Any]:
+    # Record-level diff of two NRBF saves, aligned from the root by member
+    # path. Saves go through their sidecar index (built if missing) when
+    # either has one; otherwise both are decoded and walked directly, which
+    # is cheaper than building two indexes, and no sidecar is written.
+    t0 = time.perf_counter()
+    if not any(os.path.exists(nrbf_index.index_path(p)) for p in (path_a, path_b)):
+        data_a = nrbf.read_buffer(path_a, use_mmap=False)
+        data_b = nrbf.read_buffer(path_b, use_mmap=False)
+        if data_a == data_b:
+            changes = []
+            stats = {"identical_files": True}
+        else:
+            # Two decodes hold millions of acyclic objects: full collections
+            # would rescan them over and over without freeing any
+            collect = gc.isenabled()
+            gc.disable()
+            try:
+                a, b = _decode_save(path_a, data_a), _decode_save(path_b, data_b)
+                decoded = time.perf_counter()
+                differ = _DecodedDiffer(a, b)
+                changes = differ.run()
+            finally:
+                if collect:
+                    gc.enable()
+            stats = differ.stats
+            stats["decode_seconds"] = round(decoded - t0, 6)
+        stats["seconds"] = round(time.perf_counter() - t0, 6)
+        return {"a": path_a, "b": path_b, "changes": changes, "stats": stats}
+    with nrbf_index.open_index(path_a, check_hash, write_index) as a, nrbf_index.open_index(path_b, check_hash, write_index) as b:
+        indexed = time.perf_counter()
+        if a.index["digest"] == b.index["digest"]:
+            changes = []
+            stats = {"identical_files": True}
+        else:
+            differ = _Differ(a, b)
+            changes = differ.run()
+            stats = differ.stats
+        stats["index_seconds"] = round(indexed - t0, 6)
+        stats["index_rebuilt"] = [a.rebuilt, b.rebuilt]
+    stats["seconds"] = round(time.perf_counter() - t0, 6)
+    return {"a": path_a, "b": path_b, "changes": changes, "stats": stats}
+
+def format_change(change: Dict[str, Any]) -> str:
+    line = f"{change['path'] or '<root>'}: {json.dumps(change['old'], default=nrbf.json_default)} → {json.dumps(change['new'], default=nrbf.json_default)}"
+    delta = change.get("delta")
+    if delta is not None:
+        line += f" ({delta:+g})"
+    return line
+
+def main():
+    parser = argparse.ArgumentParser(description="Report what changed between two BinaryFormatter saves")
+    parser.add_argument("a", help="Older playerInfo.dat")
+    parser.add_argument("b", help="Newer playerInfo.dat")
+    parser.add_argument("--json", metavar="FILE", help="Also write the diff as JSON")
+    parser.add_argument("--no-index-write", action="store_true", help="Do not leave .nrbfidx sidecars beside the saves")
+    args = parser.parse_args()
+
+    result = diff_saves(args.a, args.b, write_index=not args.no_index_write)
+    for change in result["changes"]:
+        print(format_change(change))
+    stats = result["stats"]
+    print(f"{len(result['changes'])} changed values in {stats['seconds']}s", end="")
+    if stats.get("mode") == "aligned":
+        print(f" (aligned: {stats['records_changed']} records changed, {stats['bytes_skipped']} bytes skipped)")
+    elif stats.get("mode") == "decode":
+        print(f" (decoded in full, {stats['records_visited']} records visited; no sidecar indexes)")
+    elif "records_visited" in stats:
+        print(f" ({stats['records_identical']}/{stats['records_visited']} records identical, {stats['bytes_skipped']} bytes skipped)")
+    else:
+        print(" (files identical)")
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False, default=nrbf.json_default)
+    return 1 if result["changes"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+import argparse, array, hashlib, itertools, json, mmap, os, struct, sys, zlib
+from collections.abc import Mapping
+from typing import Dict, Any, List, Optional
+
+try:
+    from tools import nrbf
+except ImportError:  # run as a script from inside tools/
+    import nrbf
+
+read_buffer = nrbf.read_buffer
+
+# Sidecar layout: fixed header (checked before anything is decompressed),
+# then a zlib body holding the name table, libraries, one row per id'd record
+# (offset and length) and every slot offset (class members, record-valued
+# array elements) relative to its record start.
+INDEX_SUFFIX = ".nrbfidx"
+INDEX_MAGIC = b"NRBFIDX2"
+_HEADER = struct.Struct("<8sQ32siIIII")  # magic, size, sha256, root id, names, libraries, rows, members
+_ROW_FIELDS = 6  # id, offset, length, record type, name index (-1: none), slot count
+_NO_NAME = -1
+# Record types whose object id follows the type byte: class instances and arrays
+_DEFERRED_TYPES = frozenset((1, 2, 3, 4, 5, 7, 15, 16, 17))
+
+def index_path(path: str) -> str:
+    return path + INDEX_SUFFIX
+
+def file_digest(data) -> bytes:
+    return hashlib.sha256(data).digest()
+
+def _little(a: array.array) -> array.array:
+    if not nrbf._LITTLE_ENDIAN:
+        a.byteswap()
+    return a
+
+def encode_index(index: Dict[str, Any], size: int, digest: bytes) -> bytes:
+    names = {}
+    libraries = array.array("i")
+    for library_id, name in index["libraries"].items():
+        libraries.extend((library_id, names.setdefault(name, len(names))))
+    rows = array.array("i")
+    members = array.array("I")
+    # Rows go out in file order, so readers can bisect on the offsets
+    for obj_id, (offset, rec_type, name, marks, end) in sorted(index["entries"].items(), key=lambda kv: kv[1][0]):
+        name_index = _NO_NAME if name is None else names.setdefault(name, len(names))
+        marks = marks or ()
+        rows.extend((obj_id, offset, end - offset, rec_type, name_index, len(marks)))
+        members.extend([m - offset for m in marks])
+    blob = "\0".join(names).encode("utf-8")
+    body = struct.pack("<I", len(blob)) + blob + _little(libraries).tobytes() + _little(rows).tobytes() + _little(members).tobytes()
+    root_id = index["root_id"] if index["root_id"] is not None else 0
+    header = _HEADER.pack(INDEX_MAGIC, size, digest, root_id, len(names), len(libraries) // 2,
+                          len(rows) // _ROW_FIELDS, len(members))
+    return header + zlib.compress(body)
+
+def read_header(raw: bytes) -> Optional[tuple]:
+    if len(raw) < _HEADER.size:
+        return None
+    header = _HEADER.unpack_from(raw)
+    return header if header[0] == INDEX_MAGIC else None
+
+class _Entries(Mapping):
+    # Read-only id -> (offset, record type, class name, slot offsets, end) view
+    # over the decoded rows; a row becomes a tuple only when it is looked up.
+    # Rows are in file order: offsets is sorted and row(i) is by position.
+    def __init__(self, names: List[str], rows: array.array, members: array.array):
+        self.names = names
+        self.ids = rows[0::_ROW_FIELDS]
+        self.offsets = rows[1::_ROW_FIELDS]
+        self.lengths = rows[2::_ROW_FIELDS]
+        self.types = rows[3::_ROW_FIELDS]
+        self.name_index = rows[4::_ROW_FIELDS]
+        counts = rows[5::_ROW_FIELDS]
+        self.starts = array.array("I", itertools.accumulate(counts, initial=0))
+        self.members = members
+        self.rows = dict(zip(self.ids, range(len(counts))))
+
+    def __getitem__(self, obj_id: int) -> tuple:
+        return self.row(self.rows[obj_id])
+
+    def row(self, i: int) -> tuple:
+        offset = self.offsets[i]
+        name_index = self.name_index[i]
+        start, stop = self.starts[i], self.starts[i + 1]
+        marks = tuple([offset + m for m in self.members[start:stop]]) if stop > start else None
+        return (offset, self.types[i], None if name_index == _NO_NAME else self.names[name_index], marks,
+                offset + self.lengths[i])
+
+    def slot_count(self, obj_id: int) -> int:
+        i = self.rows[obj_id]
+        return self.starts[i + 1] - self.starts[i]
+
+    def slot_offset(self, obj_id: int, n: int) -> int:
+        # One slot's offset without building the row (an array's marks may
+        # run to millions)
+        i = self.rows[obj_id]
+        start = self.starts[i]
+        if not 0 <= n < self.starts[i + 1] - start:
+            raise IndexError(n)
+        return self.offsets[i] + self.members[start + n]
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, obj_id) -> bool:
+        return obj_id in self.rows
+
+    def with_name(self, name: str) -> List[int]:
+        try:
+            wanted = self.names.index(name)
+        except ValueError:
+            return []
+        return [obj_id for obj_id, i in self.rows.items() if self.name_index[i] == wanted]
+
+def decode_index(raw: bytes) -> Dict[str, Any]:
+    _, size, digest, root_id, n_names, n_libraries, n_rows, n_members = read_header(raw)
+    body = zlib.decompress(raw[_HEADER.size:])
+    pos = 4
+    blob_len = struct.unpack_from("<I", body)[0]
+    names = body[pos:pos + blob_len].decode("utf-8").split("\0") if n_names else []
+    pos += blob_len
+    libraries = _little(array.array("i", body[pos:pos + 8 * n_libraries]))
+    pos += 8 * n_libraries
+    rows = _little(array.array("i", body[pos:pos + 4 * _ROW_FIELDS * n_rows]))
+    pos += 4 * _ROW_FIELDS * n_rows
+    members = _little(array.array("I", body[pos:pos + 4 * n_members]))
+    entries = _Entries(names, rows, members)
+    return {
+        "size": size,
+        "digest": digest,
+        "root_id": root_id,
+        "libraries": {libraries[i]: names[libraries[i + 1]] for i in range(0, len(libraries), 2)},
+        "entries": entries,
+    }
+
+def build_index(data) -> Dict[str, Any]:
+    if len(data) >= 1 << 31:
+        raise nrbf.NrbfError("saves of 2 GiB or more cannot be indexed")
+    index = nrbf.index_records(data)
+    if index["error"]:
+        raise nrbf.NrbfError(f"cannot index: {index['error']}")
+    index["size"] = len(data)
+    index["digest"] = file_digest(data)
+    return index
+
+def write_index(path: str, index) -> str:
+    # Written beside the save under a temporary name, then swapped in;
+    # index is a build_index() result or its encode_index() bytes
+    target = index_path(path)
+    raw = index if isinstance(index, bytes) else encode_index(index, index["size"], index["digest"])
+    tmp = f"{target}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(raw)
+        os.replace(tmp, target)
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return target
+
+def load_index(path: str, data=None, check_hash: bool = True) -> Optional[Dict[str, Any]]:
+    # The sidecar for path, or None when it is missing, unreadable or stale.
+    # Size is compared first; the hash only when the sizes agree.
+    try:
+        with open(index_path(path), "rb") as f:
+            raw = f.read()
+    except OSError:
+        return None
+    header = read_header(raw)
+    if header is None:
+        return None
+    size = len(data) if data is not None else os.path.getsize(path)
+    if header[1] != size:
+        return None
+    if check_hash:
+        buf = data if data is not None else read_buffer(path)
+        try:
+            if header[2] != file_digest(buf):
+                return None
+        finally:
+            if buf is not data and isinstance(buf, mmap.mmap):
+                buf.close()
+    try:
+        return decode_index(raw)
+    except (zlib.error, struct.error, ValueError, IndexError):
+        return None
+
+class _Layouts(dict):
+    # Class layouts keyed by metadata id, read from their defining record on
+    # first use, so a ClassWithId record decodes without a walk from byte 0
+    def __init__(self, entries: Dict[int, tuple]):
+        super().__init__()
+        self.entries = entries
+        self.reader = None
+
+    def __missing__(self, metadata_id: int):
+        entry = self.entries.get(metadata_id)
+        if entry is None or entry[1] not in nrbf.CLASS_RECORD_TYPES:
+            raise KeyError(metadata_id)
+        return nrbf.read_layout(self.reader, entry[0])
+
+class SaveIndex:
+    # Random access into one save through its index: read() decodes a single
+    # record at its offset, member() a single member value.
+    def __init__(self, data, index: Dict[str, Any], rebuilt: bool = False):
+        self.data = data
+        self.index = index
+        self.entries = index["entries"]
+        self.root_id = index["root_id"]
+        self.rebuilt = rebuilt
+        layouts = _Layouts(self.entries)
+        r = nrbf._Reader(data)
+        r.classes = layouts
+        r.libraries = dict(index["libraries"])
+        layouts.reader = r
+        self._reader = r
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._reader = None
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    def ids(self, class_name: str) -> List[int]:
+        return self.entries.with_name(class_name)
+
+    def _entry(self, obj_id: int) -> tuple:
+        entry = self.entries.get(obj_id)
+        if entry is None:
+            raise KeyError(obj_id)
+        return entry
+
+    def read(self, obj_id: int) -> Dict[str, Any]:
+        r = self._reader
+        r.pos = self._entry(obj_id)[0]
+        rec = nrbf._read_record(r)
+        del r.objects[:]
+        r.strings.clear()
+        return rec
+
+    def value(self, obj_id: int) -> Any:
+        return nrbf._value_of(self.read(obj_id))
+
+    def layout(self, obj_id: int) -> Dict[str, Any]:
+        offset, rec_type = self._entry(obj_id)[:2]
+        if rec_type == 1:
+            # ClassWithId: [type][object id][metadata id]
+            metadata_id = nrbf._unpack_int32(self.data, offset + 5)[0]
+        elif rec_type in nrbf.CLASS_RECORD_TYPES:
+            metadata_id = obj_id
+        else:
+            raise KeyError(f"record {obj_id} is not a class instance")
+        return self._reader.classes[metadata_id]
+
+    def members(self, obj_id: int) -> tuple:
+        return self.layout(obj_id)["members"]
+
+    def member(self, obj_id: int, name: str, follow_refs: bool = True, defer: bool = False) -> Any:
+        # Seek to one member's bytes; a reference is followed to its target
+        # through the index rather than left as {"$ref": id}
+        meta = self.layout(obj_id)
+        try:
+            i = meta["members"].index(name)
+        except ValueError:
+            raise KeyError(name) from None
+        pos = self.entries.slot_offset(obj_id, i)
+        if meta["types"] is not None:
+            bt, info = meta["types"][i]
+            if bt == nrbf.BT_PRIMITIVE:
+                r = self._reader
+                r.pos = pos
+                return nrbf._read_primitive(r, info)
+        return self._slot_at(pos, follow_refs, defer)
+
+    def slot(self, obj_id: int, i: int, follow_refs: bool = True, defer: bool = False) -> Any:
+        # Element i of a record-valued array, read alone like member()
+        if obj_id not in self.entries:
+            raise KeyError(obj_id)
+        return self._slot_at(self.entries.slot_offset(obj_id, i), follow_refs, defer)
+
+    def _slot_at(self, pos: int, follow_refs: bool, defer: bool) -> Any:
+        # defer: an inline object or array that has its own entry comes back
+        # as a Ref without decoding its body, for callers walking down lazily
+        if defer and self.data[pos] in _DEFERRED_TYPES:
+            obj_id = nrbf._unpack_int32(self.data, pos + 1)[0]
+            if obj_id in self.entries:
+                return nrbf.Ref(obj_id)
+        r = self._reader
+        r.pos = pos
+        rec = nrbf._read_record(r)
+        del r.objects[:]
+        r.strings.clear()
+        rtype = rec.type
+        if rtype in ("ObjectNullMultiple", "ObjectNullMultiple256"):
+            return None
+        if rtype == "MemberReference" and rec.ref_id in self.entries:
+            if defer:
+                return nrbf.Ref(rec.ref_id)
+            if follow_refs:
+                return self.value(rec.ref_id)
+        return nrbf._value_of(rec)
+
+def open_index(path: str, check_hash: bool = True, write: bool = True) -> SaveIndex:
+    # Reuse a valid sidecar, otherwise index the save and (re)write it
+    data = read_buffer(path)
+    index = load_index(path, data, check_hash)
+    rebuilt = index is None
+    if rebuilt:
+        try:
+            index = build_index(data)
+        except Exception:
+            if isinstance(data, mmap.mmap):
+                data.close()
+            raise
+        # Readers always get the sidecar's row view, freshly built or not
+        raw = encode_index(index, index["size"], index["digest"])
+        if write:
+            try:
+                write_index(path, raw)
+            except OSError:
+                # Read-only folder or full disk: serve the index from memory
+                pass
+        index = decode_index(raw)
+    return SaveIndex(data, index, rebuilt)
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or reuse a record offset index beside a BinaryFormatter save")
+    parser.add_argument("file", help="Path to playerInfo.dat")
+    parser.add_argument("--member", action="append", default=[], help="Root member to read through the index (repeatable)")
+    parser.add_argument("--no-hash", action="store_true", help="Trust a sidecar whose recorded size matches without hashing the save")
+    args = parser.parse_args()
+
+    with open_index(args.file, check_hash=not args.no_hash) as idx:
+        status = "built" if idx.rebuilt else "reused"
+        sidecar = index_path(args.file)
+        size = f"{os.path.getsize(sidecar)} bytes" if os.path.exists(sidecar) else "not written"
+        print(f"Index {status}: {sidecar} ({size}, {len(idx.entries)} records)")
+        for name in args.member:
+            value = idx.member(idx.root_id, name)
+            print(f"{name}: {json.dumps(nrbf.to_tree(value), default=nrbf.json_default)}")
+
+if __name__ == "__main__":
+    sys.exit(main())
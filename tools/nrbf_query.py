@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+import argparse, array, functools, json, re, sys
+from collections.abc import Mapping
+from typing import Any, Iterator, List, Tuple
+
+try:
+    from tools import nrbf, nrbf_index
+except ImportError:  # run as a script from inside tools/
+    import nrbf, nrbf_index
+
+# Path queries over a save: dotted member names, each optionally followed by
+# [n] or [*] element steps, e.g. completedLabs[*].Level or *Workshop*.coins.
+# Names may be globs (* and ?). Paths start at the root object's members; a
+# leading "$." is accepted and ignored. A List`1 is indexed through its
+# _items array, cut to _size.
+_TOKEN = re.compile(r"\s*(?:(\.)|\[\s*(\*|-?\d+)\s*\]|([^.\[\]\s]+))")
+_MEMBER, _MATCH, _INDEX, _ALL = range(4)
+
+class Query:
+    __slots__ = ("expr", "steps")
+
+    def __init__(self, expr: str, steps: tuple):
+        self.expr = expr
+        self.steps = steps
+
+    def __repr__(self):
+        return f"Query({self.expr!r})"
+
+    def find(self, target) -> Iterator[Tuple[str, Any]]:
+        # (path, value) for every match, in file order. Over a SaveIndex only
+        # the records on the path are read; the matched values are decoded
+        # in full.
+        walker = _Walker(target if isinstance(target, nrbf_index.SaveIndex) else None)
+        for path, node in walker.walk(_start(target), self.steps, 0, ""):
+            yield path, walker.materialise(node, set())
+
+    def values(self, target) -> List[Any]:
+        return [value for _, value in self.find(target)]
+
+    def first(self, target, default=None) -> Any:
+        return next((value for _, value in self.find(target)), default)
+
+@functools.lru_cache(maxsize=256)
+def compile_query(expr: str) -> Query:
+    steps = []
+    pos, end = 0, len(expr.rstrip())
+    want_name = True
+    while pos < end:
+        m = _TOKEN.match(expr, pos)
+        if m is None:
+            raise ValueError(f"bad query {expr!r} at offset {pos}")
+        dot, index, name = m.groups()
+        if dot:
+            if want_name:
+                raise ValueError(f"bad query {expr!r}: empty name at offset {m.start(1)}")
+            want_name = True
+        elif index is not None:
+            if want_name and steps:
+                raise ValueError(f"bad query {expr!r}: index after '.' at offset {m.start(2) - 1}")
+            steps.append((_ALL, None) if index == "*" else (_INDEX, int(index)))
+            want_name = False
+        else:
+            if not want_name:
+                raise ValueError(f"bad query {expr!r}: missing '.' before {name!r}")
+            if not (name == "$" and not steps):
+                steps.append(_name_step(name))
+            want_name = False
+        pos = m.end()
+    if want_name and pos:
+        raise ValueError(f"bad query {expr!r}: ends with '.'")
+    return Query(expr, tuple(steps))
+
+def _name_step(name: str) -> tuple:
+    if "*" not in name and "?" not in name:
+        return (_MEMBER, name)
+    pattern = re.escape(name).replace(r"\*", ".*").replace(r"\?", ".")
+    return (_MATCH, re.compile(pattern, re.DOTALL).fullmatch)
+
+def query(target, expr: str) -> List[Any]:
+    return compile_query(expr).values(target)
+
+def _start(target):
+    if isinstance(target, nrbf_index.SaveIndex):
+        return nrbf.Ref(target.root_id)
+    if isinstance(target, dict) and target.get("__binary__"):
+        return target.get("root")
+    return target
+
+_SEQUENCES = (list, tuple, array.array, memoryview)
+_ARRAY_TYPES = (7, 15, 16, 17)  # BinaryArray, ArraySinglePrimitive/Object/String
+
+class _Walker:
+    # Steps through in-memory values, and through the index wherever a Ref
+    # names a record it holds. Index reads use defer=True, so objects stay
+    # Refs (unread) until a step or the final value needs them.
+    def __init__(self, idx: "nrbf_index.SaveIndex" = None):
+        self.idx = idx
+
+    def _indexed(self, node) -> bool:
+        return type(node) is nrbf.Ref and self.idx is not None and node.id in self.idx.entries
+
+    def walk(self, node, steps: tuple, i: int, path: str) -> Iterator[Tuple[str, Any]]:
+        if i == len(steps):
+            yield path, node
+            return
+        kind, arg = steps[i]
+        if kind == _MEMBER or kind == _MATCH:
+            for name, child in self.members(node, arg if kind == _MEMBER else None, arg):
+                yield from self.walk(child, steps, i + 1, f"{path}.{name}" if path else name)
+        else:
+            items = self.elements(node)
+            if items is None:
+                return
+            count, get = items
+            if kind == _ALL:
+                indices = range(count)
+            else:
+                n = arg + count if arg < 0 else arg
+                if not 0 <= n < count:
+                    return
+                indices = (n,)
+            for n in indices:
+                yield from self.walk(get(n), steps, i + 1, f"{path}[{n}]")
+
+    def members(self, node, exact, match) -> Iterator[Tuple[str, Any]]:
+        if self._indexed(node):
+            idx = self.idx
+            try:
+                names = idx.members(node.id)
+            except KeyError:
+                return
+            for name in ((exact,) if exact is not None else names):
+                if (name in names) if exact is not None else match(name):
+                    yield name, idx.member(node.id, name, follow_refs=False, defer=True)
+            return
+        if isinstance(node, nrbf.ClassRecord):
+            node = node.members
+        elif isinstance(node, nrbf.Record) or not isinstance(node, Mapping):
+            return
+        if exact is not None:
+            if exact in node:
+                yield exact, node[exact]
+            return
+        for name, child in node.items():
+            if match(name):
+                yield name, child
+
+    def member(self, node, name: str):
+        return next((child for _, child in self.members(node, name, None)), None)
+
+    def elements(self, node):
+        # (count, get) for an array or List`1, else None
+        if self._indexed(node):
+            idx = self.idx
+            entries = idx.entries
+            obj_id = node.id
+            if entries.types[entries.rows[obj_id]] in _ARRAY_TYPES:
+                count = entries.slot_count(obj_id)
+                if not count:
+                    # Primitive elements carry no slot offsets: read the array
+                    values = idx.read(obj_id).elements
+                    return len(values), values.__getitem__
+                return count, lambda n: idx.slot(obj_id, n, follow_refs=False, defer=True)
+            return self._list(node)
+        if isinstance(node, nrbf.ClassRecord) or (isinstance(node, Mapping) and not isinstance(node, nrbf.Record)):
+            return self._list(node)
+        if isinstance(node, nrbf.Record):
+            values = getattr(node, "elements", None)
+            return None if values is None else (len(values), values.__getitem__)
+        if isinstance(node, _SEQUENCES):
+            return len(node), node.__getitem__
+        return None
+
+    def _list(self, node):
+        # A List`1 exposes its live elements: _items[:_size]
+        size = self.member(node, "_size")
+        if not isinstance(size, int):
+            return None
+        items = self.elements(self.member(node, "_items"))
+        if items is None:
+            return None
+        return min(size, items[0]), items[1]
+
+    def materialise(self, node, seen: set) -> Any:
+        # The plain value (as nrbf.to_tree) of a match, following indexed Refs;
+        # a cycle back to an object on the current path stays {"$ref": id}
+        if self._indexed(node):
+            if node.id in seen:
+                return nrbf.to_tree(node)
+            seen.add(node.id)
+            try:
+                return self.materialise(self.idx.value(node.id), seen)
+            finally:
+                seen.discard(node.id)
+        if self.idx is None:
+            return nrbf.to_tree(node)
+        if isinstance(node, nrbf.ClassRecord):
+            return {name: self.materialise(value, seen) for name, value in node.members.items()}
+        if isinstance(node, (nrbf.BinaryArrayRecord, nrbf.ValueArrayRecord)) and isinstance(node.elements, list):
+            return [self.materialise(value, seen) for value in node.elements]
+        return nrbf.to_tree(node)
+
+def main():
+    parser = argparse.ArgumentParser(description="Read values out of a BinaryFormatter save by path, e.g. completedLabs[*].Level")
+    parser.add_argument("file", help="Path to playerInfo.dat")
+    parser.add_argument("query", nargs="+", help="Path expression: dotted member names (globs allowed), [n] or [*] for elements")
+    parser.add_argument("--no-hash", action="store_true", help="Trust a sidecar index whose recorded size matches without hashing the save")
+    parser.add_argument("--no-write-index", action="store_true", help="Do not write the .nrbfidx sidecar when it has to be built")
+    args = parser.parse_args()
+
+    queries = [compile_query(expr) for expr in args.query]
+    with nrbf_index.open_index(args.file, check_hash=not args.no_hash, write=not args.no_write_index) as idx:
+        for q in queries:
+            for path, value in q.find(idx):
+                print(f"{path}: {json.dumps(value, default=nrbf.json_default, ensure_ascii=False)}")
+
+if __name__ == "__main__":
+    sys.exit(main())
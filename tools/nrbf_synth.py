@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+import argparse, random, struct, sys, time
+from typing import Dict, Any, Iterator
+
+# Synthetic BinaryFormatter saves shaped like Tower's playerInfo.dat: a
+# SaveLoad+PlayerData root with primitive members, primitive and string
+# arrays, and two List`1 collections (completed labs, module inventory)
+# whose items share name strings by MemberReference, as real saves do.
+# The collections grow with the requested size; every other part is fixed.
+
+LIBRARY = "Assembly-CSharp, Version=0.0.0.0, Culture=neutral, PublicKeyToken=null"
+MSCORLIB_LIST = "System.Collections.Generic.List`1[[{0}, " + LIBRARY + "]]"
+LAB_NAMES = tuple(f"Lab_{name}" for name in (
+    "GameSpeed", "WorkshopDiscount", "LabSpeed", "CoinBonus", "CashBonus", "Damage", "AttackSpeed", "CriticalFactor",
+    "Range", "DamagePerMeter", "Health", "HealthRegen", "DefensePercent", "DefenseAbsolute", "Thorns", "LifeSteal",
+    "OrbSpeed", "LandMineDamage", "DeathWaveHealth", "ChainLightningDamage", "BlackHoleSize", "SpotlightAngle",
+    "EnemyHealthSkip", "EnemyAttackSkip", "BotRange", "GoldenBotBonus", "FlameBotDamage", "AmplifyBotBonus",
+    "RerollShards", "ModuleShardCost", "CommonDropChance", "CellsPerWave",
+))
+MODULE_NAMES = tuple(f"Module_{kind}_{i}" for kind in ("Cannon", "Armor", "Generator", "Core") for i in range(8))
+SIZE_SUFFIXES = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+MIN_BYTES = 100 << 10
+MAX_BYTES = 1 << 30
+CHUNK = 1 << 20
+
+# BinaryTypeEnum / PrimitiveTypeEnum codes used below
+_BT_PRIMITIVE, _BT_STRING, _BT_SYSTEM_CLASS, _BT_CLASS, _BT_STRING_ARRAY, _BT_PRIMITIVE_ARRAY = 0, 1, 3, 4, 6, 7
+_BOOL, _DOUBLE, _INT32, _INT64, _SINGLE, _DATETIME = 1, 6, 8, 9, 11, 13
+
+def parse_size(text: str) -> int:
+    # "100K", "25M", "1G" or plain bytes
+    text = text.strip().upper().removesuffix("B").removesuffix("I")
+    unit = text[-1:] if text[-1:] in SIZE_SUFFIXES else ""
+    return int(float(text[:len(text) - len(unit)]) * SIZE_SUFFIXES[unit])
+
+def _lps(s: str) -> bytes:
+    raw = s.encode("utf-8")
+    out = bytearray()
+    n = len(raw)
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out) + raw
+
+class _Stream:
+    # Output buffer plus the object id and record counters
+    def __init__(self):
+        self.buf = bytearray()
+        self.next_id = 1
+        self.records = 0
+
+    def new_id(self) -> int:
+        obj_id = self.next_id
+        self.next_id += 1
+        return obj_id
+
+    def record(self, payload: bytes):
+        self.buf += payload
+        self.records += 1
+
+    def reference(self, obj_id: int):
+        self.record(b"\x09" + struct.pack("<i", obj_id))
+
+    def string(self, value: str) -> int:
+        obj_id = self.new_id()
+        self.record(b"\x06" + struct.pack("<i", obj_id) + _lps(value))
+        return obj_id
+
+    def class_header(self, obj_id: int, name: str, members, types, library_id=None) -> bytes:
+        # ClassWithMembersAndTypes (library given) or its System variant
+        out = bytearray(b"\x05" if library_id is not None else b"\x04")
+        out += struct.pack("<i", obj_id) + _lps(name) + struct.pack("<i", len(members))
+        for member in members:
+            out += _lps(member)
+        out += bytes(bt for bt, _ in types)
+        for bt, info in types:
+            if bt in (_BT_PRIMITIVE, _BT_PRIMITIVE_ARRAY):
+                out.append(info)
+            elif bt == _BT_SYSTEM_CLASS:
+                out += _lps(info)
+            elif bt == _BT_CLASS:
+                out += _lps(info[0]) + struct.pack("<i", info[1])
+        if library_id is not None:
+            out += struct.pack("<i", library_id)
+        return bytes(out)
+
+ROOT_MEMBERS = (
+    ("coins", (_BT_PRIMITIVE, _DOUBLE)),
+    ("cells", (_BT_PRIMITIVE, _INT64)),
+    ("gems", (_BT_PRIMITIVE, _INT32)),
+    ("stones", (_BT_PRIMITIVE, _INT32)),
+    ("gameSpeedMemory", (_BT_PRIMITIVE, _SINGLE)),
+    ("rateGameBetaBool", (_BT_PRIMITIVE, _BOOL)),
+    ("gameStartedDate", (_BT_PRIMITIVE, _DATETIME)),
+    ("currentTier", (_BT_PRIMITIVE, _INT32)),
+    ("userName", (_BT_STRING, None)),
+    ("highestCoinsEarnedThisTier", (_BT_PRIMITIVE_ARRAY, _DOUBLE)),
+    ("cardLevel", (_BT_PRIMITIVE_ARRAY, _INT32)),
+    ("presetName", (_BT_STRING_ARRAY, None)),
+    ("completedLabs", (_BT_SYSTEM_CLASS, MSCORLIB_LIST.format("CompletedLab"))),
+    ("inventory", (_BT_SYSTEM_CLASS, MSCORLIB_LIST.format("ModuleItem"))),
+)
+LAB_MEMBERS = (
+    ("labName", (_BT_STRING, None)),
+    ("level", (_BT_PRIMITIVE, _INT32)),
+    ("duration", (_BT_PRIMITIVE, _DOUBLE)),
+    ("completedDate", (_BT_PRIMITIVE, _DATETIME)),
+)
+MODULE_MEMBERS = (
+    ("moduleName", (_BT_STRING, None)),
+    ("rarity", (_BT_PRIMITIVE, _INT32)),
+    ("level", (_BT_PRIMITIVE, _INT32)),
+    ("substats", (_BT_PRIMITIVE_ARRAY, _DOUBLE)),
+)
+LIST_MEMBERS = ("_items", "_size", "_version")
+SUBSTATS = 4
+LIST_SLACK = 3  # unused capacity at the end of each List`1 backing array
+
+def _ticks(rng: random.Random) -> int:
+    # DateTime ticks in 2020-2026, Kind=Utc
+    return rng.randrange(637134336000000000, 639035136000000000) | (1 << 62)
+
+def iter_save(items: int, seed: int = 0, chunk_size: int = CHUNK, stats: Dict[str, Any] = None) -> Iterator[bytes]:
+    # The stream in chunks of about chunk_size bytes; `items` is the number
+    # of labs and of modules. Values are random but sizes are not, so the
+    # byte count is a linear function of items (see items_for_size).
+    # stats, when given, receives the record count once the stream ends.
+    rng = random.Random(seed)
+    s = _Stream()
+    s.record(b"\x00" + struct.pack("<iiii", 1, -1, 1, 0))
+    root_id = s.new_id()
+    library_id = s.new_id()
+    s.record(b"\x0c" + struct.pack("<i", library_id) + _lps(LIBRARY))
+
+    names = [name for name, _ in ROOT_MEMBERS]
+    types = [t for _, t in ROOT_MEMBERS]
+    s.record(s.class_header(root_id, "SaveLoad+PlayerData", names, types, library_id))
+    tiers_id, cards_id, presets_id, labs_id, modules_id = (s.new_id() for _ in range(5))
+    s.buf += struct.pack("<dqiifB", rng.uniform(1e6, 1e16), rng.randrange(1 << 40), rng.randrange(1 << 20),
+                         rng.randrange(1 << 16), 1.0 + rng.randrange(6) / 2, 1)
+    s.buf += struct.pack("<Qi", _ticks(rng), 12)
+    s.string("SyntheticPlayer")
+    for obj_id in (tiers_id, cards_id, presets_id, labs_id, modules_id):
+        s.reference(obj_id)
+
+    s.record(b"\x0f" + struct.pack("<iiB", tiers_id, 18, _DOUBLE) + struct.pack("<18d", *(rng.uniform(0, 1e15) for _ in range(18))))
+    s.record(b"\x0f" + struct.pack("<iiB", cards_id, 30, _INT32) + struct.pack("<30i", *(rng.randrange(8) for _ in range(30))))
+    s.record(b"\x11" + struct.pack("<ii", presets_id, 4))
+    for i in range(3):
+        s.string(f"Preset {i + 1}")
+    s.record(b"\x0a")
+
+    collections = (
+        (labs_id, "CompletedLab", LAB_MEMBERS, LAB_NAMES),
+        (modules_id, "ModuleItem", MODULE_MEMBERS, MODULE_NAMES),
+    )
+    for list_id, class_name, members, item_names in collections:
+        list_types = ((_BT_CLASS, (class_name + "[]", library_id)), (_BT_PRIMITIVE, _INT32), (_BT_PRIMITIVE, _INT32))
+        items_id = s.new_id()
+        s.record(s.class_header(list_id, MSCORLIB_LIST.format(class_name), LIST_MEMBERS, list_types))
+        s.reference(items_id)
+        s.buf += struct.pack("<ii", items, items)
+        # BinaryArray, single-dimensional, elements of a user class
+        s.record(b"\x07" + struct.pack("<iBii", items_id, 0, 1, items + LIST_SLACK) + bytes((_BT_CLASS,))
+                 + _lps(class_name) + struct.pack("<i", library_id))
+        first_id = s.next_id
+        for i in range(items):
+            s.reference(first_id + i)
+        s.record(b"\x0d" + bytes((LIST_SLACK,)))
+        s.next_id += items
+        if len(s.buf) >= chunk_size:
+            yield bytes(s.buf)
+            s.buf.clear()
+
+        name_ids = {}
+        is_lab = class_name == "CompletedLab"
+        for i in range(items):
+            obj_id = first_id + i
+            if i == 0:
+                s.record(s.class_header(obj_id, class_name, [n for n, _ in members], [t for _, t in members], library_id))
+            else:
+                s.record(b"\x01" + struct.pack("<ii", obj_id, first_id))
+            name = item_names[i % len(item_names)]
+            if name in name_ids:
+                s.reference(name_ids[name])
+            else:
+                name_ids[name] = s.string(name)
+            if is_lab:
+                s.buf += struct.pack("<idQ", rng.randrange(1, 100), rng.uniform(60, 1e7), _ticks(rng))
+            else:
+                substats_id = s.new_id()
+                s.buf += struct.pack("<ii", rng.randrange(6), rng.randrange(1, 300))
+                s.reference(substats_id)
+                s.record(b"\x0f" + struct.pack("<iiB", substats_id, SUBSTATS, _DOUBLE)
+                         + struct.pack(f"<{SUBSTATS}d", *(rng.random() * 100 for _ in range(SUBSTATS))))
+            if len(s.buf) >= chunk_size:
+                yield bytes(s.buf)
+                s.buf.clear()
+    s.record(b"\x0b")
+    if stats is not None:
+        stats["records"] = s.records
+    yield bytes(s.buf)
+
+def save_size(items: int) -> int:
+    return sum(len(chunk) for chunk in iter_save(items))
+
+def items_for_size(target_bytes: int) -> int:
+    # Past the first occurrence of every shared name, each lab and module
+    # pair adds the same number of bytes
+    base = max(len(LAB_NAMES), len(MODULE_NAMES))
+    at_base = save_size(base)
+    step = save_size(base + 1) - at_base
+    return max(base, base + (target_bytes - at_base) // step)
+
+def make_save(target_bytes: int = MIN_BYTES, seed: int = 0) -> bytes:
+    return b"".join(iter_save(items_for_size(target_bytes), seed))
+
+def write_save(path: str, target_bytes: int, seed: int = 0) -> Dict[str, Any]:
+    # Streams to disk, so a 1 GB save never sits in memory
+    items = items_for_size(target_bytes)
+    t0 = time.perf_counter()
+    written = 0
+    stats = {}
+    with open(path, "wb") as f:
+        for chunk in iter_save(items, seed, stats=stats):
+            f.write(chunk)
+            written += len(chunk)
+    return {"file": path, "bytes": written, "items": items, "records": stats["records"],
+            "seed": seed, "seconds": round(time.perf_counter() - t0, 4)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic playerInfo-shaped NRBF save")
+    parser.add_argument("out", help="Output file")
+    parser.add_argument("--size", default="1M", help="Approximate size, e.g. 100K, 25M, 1G")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for member values (layout does not depend on it)")
+    args = parser.parse_args()
+
+    target = parse_size(args.size)
+    if not MIN_BYTES <= target <= MAX_BYTES:
+        parser.error(f"--size must be between {MIN_BYTES >> 10}K and {MAX_BYTES >> 30}G")
+    info = write_save(args.out, target, args.seed)
+    print(f"Wrote {info['file']}: {info['bytes']} bytes, {info['records']} records, "
+          f"{info['items']} labs and modules ({info['seconds']}s)")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+import argparse, glob, json, os, sys, time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    from tools import parse_cache
+    from tools import parse_playerinfo_staged_v13 as parser
+except ImportError:  # run as a script from inside tools/
+    import parse_cache
+    import parse_playerinfo_staged_v13 as parser
+
+DEFAULT_PATTERN = "*.dat"
+SUMMARY_NAME = "summary.json"
+
+def expand_inputs(inputs: List[str], pattern: str = DEFAULT_PATTERN, recursive: bool = False) -> List[Tuple[str, str]]:
+    # (path, output key) for every save named by a file, directory or glob.
+    # Keys keep the path below a directory argument so that snapshots with
+    # the same file name land in separate output folders.
+    found = []
+    for arg in inputs:
+        if os.path.isdir(arg):
+            matches = glob.glob(os.path.join(glob.escape(arg), "**" if recursive else "", pattern), recursive=recursive)
+            found.extend((path, os.path.relpath(path, arg)) for path in sorted(matches) if os.path.isfile(path))
+        elif any(c in arg for c in "*?["):
+            found.extend((path, os.path.basename(path)) for path in sorted(glob.glob(arg, recursive=True)) if os.path.isfile(path))
+        else:
+            found.append((arg, os.path.basename(arg)))
+    jobs = []
+    seen = set()
+    for path, rel in found:
+        key = os.path.splitext(rel)[0] or "input"
+        unique = key
+        n = 1
+        while unique in seen:
+            n += 1
+            unique = f"{key}~{n}"
+        seen.add(unique)
+        jobs.append((path, unique))
+    return jobs
+
+# Per-process state, set once by the pool initializer
+_options: Dict[str, Any] = {}
+_cache: Optional[parse_cache.ParseCache] = None
+
+def _init_worker(options: Dict[str, Any]):
+    global _options, _cache
+    _options = options
+    _cache = None if options["no_cache"] else parse_cache.ParseCache(options["cache_dir"], options["cache_max_bytes"])
+
+def process_one(job: Tuple[str, str]) -> Dict[str, Any]:
+    # Parse one save and write its outputs here in the worker; only the
+    # small summary row travels back to the parent
+    path, key = job
+    out_dir = os.path.join(_options["out"], key)
+    row = {"file": path, "out": out_dir}
+    t0 = time.perf_counter()
+    try:
+        result = parser.parse_playerinfo(path, zero_copy=_options["zero_copy"], cache=_cache)
+        parsed = time.perf_counter()
+        parser.write_outputs(result, out_dir)
+        meta = result["_meta"]
+        row["method"] = meta.get("method")
+        row["route"] = meta.get("route")
+        row["counts"] = parser.count_schema_fields(result)
+        if "cache" in meta:
+            row["cache"] = meta["cache"]["status"]
+        binary = meta.get("nrbf", {})
+        if "error" in binary:
+            # Partial decode: outputs hold what was read before the decoder stopped
+            row["decoder_error"] = binary["error"]
+        elif binary.get("skipped"):
+            # Recovered decode: these byte ranges were corrupt and left out.
+            # The decode went on, but the outputs are still partial.
+            spans = binary["skipped"]
+            row["decoder_error"] = f"{len(spans)} corrupt spans skipped, first: {spans[0]['error']}"
+        if binary.get("skipped"):
+            row["skipped"] = [[span["start"], span["end"]] for span in binary["skipped"]]
+        row["parse_seconds"] = round(parsed - t0, 6)
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    row["seconds"] = round(time.perf_counter() - t0, 6)
+    return row
+
+def default_chunksize(jobs: int, workers: int) -> int:
+    # About four chunks per worker: few enough to amortise IPC on tens of
+    # thousands of small saves, enough to even out uneven file sizes
+    return max(1, jobs // (workers * 4))
+
+def run_batch(jobs: List[Tuple[str, str]], options: Dict[str, Any], workers: int = 1, chunksize: int = 0) -> Dict[str, Any]:
+    chunksize = chunksize or default_chunksize(len(jobs), workers)
+    t0 = time.perf_counter()
+    if workers <= 1:
+        _init_worker(options)
+        rows = [process_one(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(options,)) as pool:
+            rows = list(pool.map(process_one, jobs, chunksize=chunksize))
+    elapsed = time.perf_counter() - t0
+    methods = {}
+    totals = dict.fromkeys(("currencies", "towers", "cards", "modules", "labs", "relics", "research", "workshop_upgrades", "_raw"), 0)
+    for row in rows:
+        if "method" in row:
+            methods[row["method"]] = methods.get(row["method"], 0) + 1
+        for bucket, n in row.get("counts", {}).items():
+            totals[bucket] += n
+    failed = sum(1 for row in rows if "error" in row)
+    partial = sum(1 for row in rows if "decoder_error" in row)
+    return {
+        "files": rows,
+        "totals": {
+            "files": len(rows),
+            "ok": len(rows) - failed,
+            "failed": failed,
+            "partial": partial,
+            "methods": methods,
+            "counts": totals,
+            "workers": workers,
+            "chunksize": chunksize,
+            "seconds": round(elapsed, 4),
+            "files_per_sec": round(len(rows) / elapsed, 2) if elapsed else None,
+        },
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description="Parse many playerInfo saves across a process pool (staged v13)")
+    ap.add_argument("inputs", nargs="+", help="Save files, directories or glob patterns")
+    ap.add_argument("--out", default="out", help="Output folder; one subfolder per input plus summary.json")
+    ap.add_argument("--pattern", default=DEFAULT_PATTERN, help="File pattern used inside directories")
+    ap.add_argument("--recursive", action="store_true", help="Search directories recursively")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (1 runs in-process)")
+    ap.add_argument("--chunksize", type=int, default=0, help="Saves handed to a worker at a time (default: about 4 chunks per worker)")
+    ap.add_argument("--zero-copy", action="store_true", help="Decode over a memoryview and materialise strings lazily")
+    ap.add_argument("--no-cache", action="store_true", help="Always decode; neither read nor write the parse cache")
+    ap.add_argument("--cache-dir", help=f"Parse cache folder (default: ${parse_cache.CACHE_ENV} or ~/.cache/the-tower/playerinfo)")
+    ap.add_argument("--cache-max-mb", type=int, default=parse_cache.DEFAULT_MAX_BYTES >> 20, help="Evict least recently used results above this size")
+    args = ap.parse_intermixed_args()
+
+    jobs = expand_inputs(args.inputs, args.pattern, args.recursive)
+    if not jobs:
+        print("No input files matched.")
+        return 1
+    options = {
+        "out": args.out,
+        "zero_copy": args.zero_copy,
+        "no_cache": args.no_cache,
+        "cache_dir": args.cache_dir,
+        "cache_max_bytes": args.cache_max_mb << 20,
+    }
+    workers = max(1, min(args.workers, len(jobs)))
+    summary = run_batch(jobs, options, workers, args.chunksize)
+
+    os.makedirs(args.out, exist_ok=True)
+    summary_path = os.path.join(args.out, SUMMARY_NAME)
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    totals = summary["totals"]
+    print(f"Parsed {totals['ok']}/{totals['files']} files in {totals['seconds']}s "
+          f"({totals['files_per_sec']} files/s, {totals['workers']} workers, chunks of {totals['chunksize']})")
+    for method, n in sorted(totals["methods"].items(), key=lambda kv: -kv[1]):
+        print(f"  {method}: {n}")
+    for row in summary["files"]:
+        if "error" in row:
+            print(f"❌ {row['file']}: {row['error']}")
+        elif "decoder_error" in row:
+            print(f"⚠ {row['file']}: partial decode ({row['decoder_error']})")
+    print(f"Summary written to {summary_path}")
+    return 1 if totals["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,620 @@
+#!/usr/bin/env python3
+import argparse, codecs, functools, hashlib, itertools, json, json.scanner, mmap, os, re, sys, time, zlib
+from typing import Dict, Any, Iterator, List, Optional
+
+try:
+    from tools import key_classifier, nrbf, parse_cache
+except ImportError:  # run as a script from inside tools/
+    import key_classifier, nrbf, parse_cache
+
+# Shared with the index and the other tools: the mmap loader lives in nrbf
+read_buffer = nrbf.read_buffer
+
+NRBF_VERSION = b"\x01\x00\x00\x00\x00\x00\x00\x00"  # header MajorVersion 1, MinorVersion 0
+TEXT_BOMS = (b"\xef\xbb\xbf", b"\xff\xfe", b"\xfe\xff")
+JSON_WHITESPACE = b" \t\r\n"
+
+def sniff_format(head: bytes) -> str:
+    # Route on the first bytes only: nrbf, gzip, zlib, json or unknown
+    if len(head) >= 17 and head[0] == 0 and head[9:17] == NRBF_VERSION:
+        return "nrbf"
+    if head[:2] == b"\x1f\x8b":
+        return "gzip"
+    if len(head) >= 2 and head[0] & 0x0F == 8 and (head[0] << 8 | head[1]) % 31 == 0:
+        return "zlib"
+    for bom in TEXT_BOMS:
+        if head.startswith(bom):
+            return "json"
+    if head.lstrip(JSON_WHITESPACE)[:1] in (b"{", b"["):
+        return "json"
+    return "unknown"
+
+def load_file(path: str, zero_copy: bool = False, use_mmap: bool = True, meta: Dict[str, Any] = None):
+    # meta, when given, receives the sniffed route and the sniff cost
+    data = read_buffer(path, use_mmap=use_mmap)
+    try:
+        return _load_buffer(data, zero_copy, meta if meta is not None else {})
+    finally:
+        # Zero-copy results still point into the map; it is released with them
+        if isinstance(data, mmap.mmap) and not zero_copy:
+            data.close()
+
+def _load_buffer(data, zero_copy: bool, meta: Dict[str, Any], profile: bool = False):
+    t0 = time.perf_counter_ns()
+    route = sniff_format(bytes(data[:64]))
+    meta["sniff_ns"] = time.perf_counter_ns() - t0
+    meta["route"] = route
+    try:
+        if route == "nrbf":
+            return parse_binaryformatter(data, zero_copy=zero_copy, profile=profile), "binaryformatter_v13"
+        if route == "json":
+            # Plain UTF-8 decodes straight from the buffer; with a BOM, bytes
+            # input lets json pick UTF-8/16/32 itself
+            text = bytes(data) if data[:3] in TEXT_BOMS or data[:2] in TEXT_BOMS else str(data, "utf-8")
+            return json.loads(text), "json"
+        if route in ("gzip", "zlib"):
+            # Decompressed and decoded chunk by chunk, never as a whole buffer
+            return _load_compressed(data, route, meta, profile)
+    except Exception as e:
+        return {"_note": "unknown format", "bytes": len(data), "error": str(e)}, "unknown"
+    return {"_note": "unknown format", "bytes": len(data)}, "unknown"
+
+STREAM_CHUNK = 1 << 16
+
+def iter_decompressed(data, route: str, chunk_size: int = STREAM_CHUNK) -> Iterator[bytes]:
+    # zlib.decompressobj over chunk_size slices with output capped per call,
+    # so neither the whole compressed nor decompressed payload is resident
+    wbits = 31 if route == "gzip" else 15
+    d = zlib.decompressobj(wbits)
+    for i in range(0, len(data), chunk_size):
+        chunk = data[i:i + chunk_size]
+        while chunk:
+            if d.eof:
+                if route != "gzip":
+                    return
+                d = zlib.decompressobj(wbits)  # concatenated gzip members
+            out = d.decompress(chunk, chunk_size)
+            if out:
+                yield out
+            chunk = d.unused_data if d.eof else d.unconsumed_tail
+    tail = d.flush()
+    if tail:
+        yield tail
+    if not d.eof:
+        raise EOFError("compressed stream ended before the end-of-stream marker")
+
+def _load_compressed(data, route: str, meta: Dict[str, Any], profile: bool = False):
+    chunks = iter_decompressed(data, route)
+    head = b""
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= 64:
+            break
+    t0 = time.perf_counter_ns()
+    inner = sniff_format(head[:64])
+    meta["sniff_ns"] += time.perf_counter_ns() - t0
+    meta["route"] = f"{route}+{inner}"
+    stream = itertools.chain((head,), chunks)
+    if inner == "nrbf":
+        return nrbf.decode_stream(stream, STREAM_CHUNK, resolve_refs=True, profile=profile), f"{route}_binaryformatter_v13"
+    if inner == "json":
+        return load_json_stream(stream), f"{route}_json"
+    return {"_note": "unknown format", "bytes": len(data)}, "unknown"
+
+def load_json_stream(chunks: Iterator[bytes]):
+    # A top-level object is built member by member (see iter_json_members);
+    # anything else is small enough in practice to parse in one go
+    chunks = iter(chunks)
+    head = next(chunks, b"")
+    stream = itertools.chain((head,), chunks)
+    if head.lstrip(b"\xef\xbb\xbf" + JSON_WHITESPACE)[:1] == b"{":
+        return dict(iter_json_members(stream))
+    return json.loads(b"".join(stream))
+
+_JSON_WS = re.compile(r"[ \t\r\n]*")
+_JSON_KEY = re.compile(r'[ \t\r\n]*"((?:[^"\\]|\\.)*)"[ \t\r\n]*:[ \t\r\n]*')
+_JSON_SEP = re.compile(r"[ \t\r\n]*[,}]")
+_scan_json = json.scanner.make_scanner(json.JSONDecoder())
+
+def iter_json_members(chunks: Iterator[bytes]) -> Iterator:
+    # Yield (key, value) for each member of a top-level JSON object as soon
+    # as it is complete; only the text of the current member is buffered
+    text = _JsonText(chunks)
+    if text.next_char() != "{":
+        raise ValueError("JSON input is not an object")
+    if text.peek() == "}":
+        return
+    while True:
+        key, value = text.member()
+        yield key, value
+        sep = text.next_char()
+        if sep == "}":
+            return
+        if sep != ",":
+            raise ValueError(f"expected ',' or '}}' in JSON object, got {sep!r}")
+
+class _JsonText:
+    __slots__ = ("chunks", "decoder", "buf", "pos", "eof")
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, want: int = 1) -> bool:
+        # Read until at least want characters are pending past pos
+        grew = False
+        while not self.eof and (len(self.buf) - self.pos < want or not grew):
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                self.eof = True
+                self.buf += self.decoder.decode(b"", final=True)
+            else:
+                if self.pos > STREAM_CHUNK:
+                    self.buf = self.buf[self.pos:]
+                    self.pos = 0
+                self.buf += self.decoder.decode(chunk)
+            grew = True
+        return grew
+
+    def peek(self) -> str:
+        while True:
+            self.pos = _JSON_WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                raise ValueError("unexpected end of JSON input")
+
+    def next_char(self) -> str:
+        ch = self.peek()
+        self.pos += 1
+        return ch
+
+    def member(self):
+        while True:
+            buf = self.buf
+            m = _JSON_KEY.match(buf, self.pos)
+            if m:
+                try:
+                    value, end = _scan_json(buf, m.end())
+                except (StopIteration, json.JSONDecodeError):
+                    end = None
+                # Only trust the value once its separator is in view: "-1" may
+                # still turn into "-1.5e3" with the next chunk
+                if end is not None and (self.eof or _JSON_SEP.match(buf, end)):
+                    key = m.group(1)
+                    if "\\" in key:
+                        key = json.decoder.scanstring(buf, m.start(1))[0]
+                    self.pos = end
+                    return key, value
+            # Grow by at least the pending length so retries stay O(log n)
+            if not self.fill(2 * (len(buf) - self.pos) or 1):
+                if m and end is not None:
+                    self.pos = end
+                    return m.group(1), value
+                raise ValueError("truncated or invalid JSON object member")
+
+PARSER_VERSION = "v13"
+
+@functools.lru_cache(maxsize=None)
+def parser_fingerprint() -> bytes:
+    return parse_cache.source_fingerprint(nrbf, key_classifier, sys.modules[__name__], key_classifier.RULES_PATH)
+
+def parse_playerinfo(filepath: str, zero_copy: bool = False, use_mmap: bool = True,
+                     cache: "parse_cache.ParseCache" = None, profile: bool = False) -> Dict[str, Any]:
+    # With a cache, an unchanged save (same bytes, same parser) is one hash
+    # and one unpickle instead of a decode
+    t0 = time.perf_counter_ns()
+    data = read_buffer(filepath, use_mmap=use_mmap)
+    read_ns = time.perf_counter_ns() - t0
+    try:
+        result = parse_buffer(data, zero_copy=zero_copy, cache=cache, profile=profile)
+        if profile:
+            result["_meta"]["profile"]["phases"]["read_ns"] = read_ns
+        return result
+    finally:
+        if isinstance(data, mmap.mmap) and not zero_copy:
+            data.close()
+
+def parse_buffer(data, zero_copy: bool = False, cache: "parse_cache.ParseCache" = None,
+                 profile: bool = False) -> Dict[str, Any]:
+    # parse_playerinfo() for bytes already in memory (uploads, pipelines).
+    # profile: time the phases and every decoded record into _meta["profile"];
+    # the cache is bypassed, since a hit would have nothing to measure.
+    if profile:
+        return _parse_profiled(data, zero_copy)
+    key = None
+    if cache is not None:
+        t0 = time.perf_counter_ns()
+        key = parse_cache.content_key(data, PARSER_VERSION, parser_fingerprint())
+        result = cache.get(key)
+        if result is not None:
+            result["_meta"]["cache"] = {"status": "hit", "lookup_ns": time.perf_counter_ns() - t0}
+            return result
+    load_meta = {}
+    raw_data, method = _load_buffer(data, zero_copy, load_meta)
+    result = map_playerinfo(raw_data, method, load_meta)
+    if key is not None:
+        stored = cache.put(key, result)
+        result["_meta"]["cache"] = {"status": "miss"} if stored else {"status": "miss", "stored": False}
+    return result
+
+def _parse_profiled(data, zero_copy: bool) -> Dict[str, Any]:
+    load_meta = {}
+    t0 = time.perf_counter_ns()
+    raw_data, method = _load_buffer(data, zero_copy, load_meta, profile=True)
+    t1 = time.perf_counter_ns()
+    decoder = raw_data.pop("profile", None) if isinstance(raw_data, dict) and raw_data.get("__binary__") else None
+    result = map_playerinfo(raw_data, method, load_meta)
+    t2 = time.perf_counter_ns()
+    phases = {
+        "sniff_ns": load_meta["sniff_ns"],
+        # Compressed routes inflate inside the decode; it is timed with it
+        "decode_ns": t1 - t0 - load_meta["sniff_ns"],
+        "map_ns": t2 - t1,
+    }
+    result["_meta"]["profile"] = {"phases": phases, **(decoder or {"records": [], "classes": [], "ns": 0})}
+    return result
+
+def map_playerinfo(raw_data, method: str, load_meta: Dict[str, Any]) -> Dict[str, Any]:
+    result = {
+        "currencies": {},
+        "towers": {},
+        "cards": {},
+        "modules": {},
+        "labs": {},
+        "relics": {},
+        "research": {},
+        "workshop_upgrades": {},
+        "_raw": {},
+        "_meta": {"method": method, **load_meta},
+    }
+    if isinstance(raw_data, dict) and raw_data.get("__binary__"):
+        result["_meta"]["nrbf"] = binary_summary(raw_data)
+        items = nrbf.to_tree(raw_data.get("root"))
+        if not isinstance(items, dict):
+            items = {"root": items} if items is not None else {}
+    elif isinstance(raw_data, dict):
+        items = raw_data
+    else:
+        items = {}
+    classify = key_classifier.default_classifier()
+    for k, v in items.items():
+        result[classify(k)][k] = v
+    return result
+
+def parse_binaryformatter(data: bytes, zero_copy: bool = False, profile: bool = False) -> Dict[str, Any]:
+    # Full MS-NRBF decode: one forward pass, table-driven record dispatch,
+    # MemberReferences resolved into a graph rooted at the header's root id.
+    # Corrupt regions are skipped to the next plausible record, not fatal.
+    return nrbf.decode(data, zero_copy=zero_copy, resolve_refs=True, profile=profile, recover=True)
+
+def summarize_playerinfo(filepath: str, use_mmap: bool = True) -> Dict[str, Any]:
+    # Counts-only pass (--summary-only): record and class histograms for the
+    # whole save with no per-record dicts, no graph and no schema mapping
+    data = read_buffer(filepath, use_mmap=use_mmap)
+    try:
+        return summarize_buffer(data)
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+def summarize_buffer(data) -> Dict[str, Any]:
+    return _scan_buffer(data, nrbf.summarize, "summary_ns")
+
+def strings_playerinfo(filepath: str, use_mmap: bool = True) -> Dict[str, Any]:
+    # Strings-only pass (--strings-only): the strings table, library names and
+    # class/member names found by a regex scan, without decoding any records
+    data = read_buffer(filepath, use_mmap=use_mmap)
+    try:
+        return strings_buffer(data)
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+def strings_buffer(data) -> Dict[str, Any]:
+    return _scan_buffer(data, nrbf.scan_strings, "scan_ns")
+
+def _scan_buffer(data, scan, timer: str) -> Dict[str, Any]:
+    t0 = time.perf_counter_ns()
+    route = sniff_format(bytes(data[:64]))
+    if route in ("gzip", "zlib"):
+        # Both scans need random access, so the payload is inflated whole
+        data = b"".join(iter_decompressed(data, route))
+        route = f"{route}+{sniff_format(data[:64])}"
+    if not route.endswith("nrbf"):
+        return {"route": route, "bytes": len(data), "_note": "not a BinaryFormatter stream"}
+    result = {"route": route, "bytes": len(data), **scan(data)}
+    result[timer] = time.perf_counter_ns() - t0
+    return result
+
+def binary_summary(raw: Dict[str, Any]) -> Dict[str, Any]:
+    root = raw.get("root")
+    summary = {
+        "root_class": root.get("class") if isinstance(root, nrbf.Record) else None,
+        "libraries": raw.get("libraries", {}),
+        "record_summary": raw.get("record_summary", {}),
+        "offset_last": raw.get("offset_last", 0),
+        "unresolved_refs": raw.get("unresolved_refs", []),
+    }
+    if "error" in raw:
+        summary["error"] = raw["error"]
+    if raw.get("skipped"):
+        summary["skipped"] = raw["skipped"]
+    records = raw.get("records")
+    if records and records[-1] is not nrbf.MESSAGE_END:
+        summary["truncated"] = True
+    return summary
+
+def count_schema_fields(result: Dict[str, Any]) -> Dict[str, int]:
+    return {
+        "currencies": len(result.get("currencies", {})),
+        "towers": len(result.get("towers", {})),
+        "cards": len(result.get("cards", {})),
+        "modules": len(result.get("modules", {})),
+        "labs": len(result.get("labs", {})),
+        "relics": len(result.get("relics", {})),
+        "research": len(result.get("research", {})),
+        "workshop_upgrades": len(result.get("workshop_upgrades", {})),
+        "_raw": len(result.get("_raw", {})),
+    }
+
+def write_outputs(result: Dict[str, Any], out_dir: str):
+    os.makedirs(out_dir, exist_ok=True)
+    schema_path = os.path.join(out_dir, "playerInfo.json")
+    with open(schema_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False, default=nrbf.json_default)
+
+    raw_path = os.path.join(out_dir, "playerInfo_raw.json")
+    with open(raw_path, "w", encoding="utf-8") as f:
+        json.dump(result.get("_raw", {}), f, indent=2, ensure_ascii=False, default=nrbf.json_default)
+    return schema_path, raw_path
+
+class SaveWatch:
+    # One watched save: the stat signature (mtime, size, inode) last seen and
+    # when it last moved, plus the content key and mapped-result digest of
+    # the last parse, so touches and identical rewrites cost one stat
+    __slots__ = ("path", "out_dir", "stat", "changed_ns", "done_stat", "content", "output")
+
+    def __init__(self, path: str, out_dir: str):
+        self.path = path
+        self.out_dir = out_dir
+        self.stat = None
+        self.changed_ns = 0
+        self.done_stat = None
+        self.content = None
+        self.output = None
+
+def watch_targets(paths: List[str], out: str) -> List[SaveWatch]:
+    # One save writes to out itself; several get out/<path below their
+    # common folder>, e.g. out/alice/playerInfo and out/bob/playerInfo
+    paths = list(dict.fromkeys(os.path.abspath(p) for p in paths))
+    if len(paths) == 1:
+        return [SaveWatch(paths[0], out)]
+    base = os.path.commonpath([os.path.dirname(p) for p in paths])
+    watches = []
+    seen = set()
+    for path in paths:
+        key = os.path.splitext(os.path.relpath(path, base))[0]
+        unique = key
+        n = 1
+        while unique in seen:
+            n += 1
+            unique = f"{key}~{n}"
+        seen.add(unique)
+        watches.append(SaveWatch(path, os.path.join(out, unique)))
+    return watches
+
+def mapped_digest(result: Dict[str, Any]) -> bytes:
+    # _meta holds per-run timings: leave it out so only mapped values count
+    mapped = {k: v for k, v in result.items() if k != "_meta"}
+    text = json.dumps(mapped, ensure_ascii=False, separators=(",", ":"), default=nrbf.json_default)
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+def incomplete_reason(result: Dict[str, Any]) -> Optional[str]:
+    # Why a parse looks like a partial write, or None. The recovering decoder
+    # turns torn saves into results, so check what it had to leave out.
+    meta = result["_meta"]
+    if meta.get("method") == "unknown":
+        return f"not a readable save (route {meta.get('route')})"
+    binary = meta.get("nrbf", {})
+    if "error" in binary:
+        return binary["error"]
+    if binary.get("skipped"):
+        return f"{len(binary['skipped'])} corrupt spans skipped"
+    if binary.get("unresolved_refs"):
+        return f"{len(binary['unresolved_refs'])} unresolved references"
+    if binary.get("truncated"):
+        return "no MessageEnd record"
+    return None
+
+def check_watch(w: SaveWatch, now_ns: int, settle_ns: int) -> Optional[str]:
+    # One poll of one save; returns what happened, or None when nothing did.
+    # A changed signature only restarts the settle clock: the save is read
+    # once it has held still for settle_ns, so half-written files are skipped.
+    try:
+        st = os.stat(w.path)
+    except FileNotFoundError:
+        if w.stat is None:
+            return None
+        w.stat = None
+        return "missing"
+    sig = (st.st_mtime_ns, st.st_size, st.st_ino)
+    if sig != w.stat:
+        w.stat = sig
+        w.changed_ns = now_ns
+        return None
+    if sig == w.done_stat or now_ns - w.changed_ns < settle_ns:
+        return None
+    w.done_stat = sig
+    # Read into memory, not mmap: the game truncates and rewrites the save
+    # in place, which would fault a mapped reader
+    try:
+        data = read_buffer(w.path, use_mmap=False)
+    except OSError as e:
+        # Replaced, removed or locked since the stat: try again next poll
+        w.done_stat = None
+        return f"read failed, retrying ({type(e).__name__}: {e})"
+    content = parse_cache.content_key(data, PARSER_VERSION, parser_fingerprint())
+    if content == w.content:
+        return None
+    try:
+        result = parse_buffer(data)
+    except Exception as e:
+        return f"parse failed, waiting for the next write ({type(e).__name__}: {e})"
+    reason = incomplete_reason(result)
+    if reason:
+        # Still being written (or torn): keep the last good outputs
+        return f"incomplete save ({reason}), waiting for the next write"
+    w.content = content
+    output = mapped_digest(result)
+    if output == w.output:
+        return "parsed, mapped result unchanged"
+    write_outputs(result, w.out_dir)
+    w.output = output
+    counts = count_schema_fields(result)
+    return f"parsed, {sum(counts.values()) - counts['_raw']} fields mapped, outputs written to {w.out_dir}"
+
+def watch_playerinfo(paths: List[str], out: str, poll: float = 1.0, settle: float = 0.5, stop=None, log=print):
+    # Poll every save's stat until stop (a threading.Event) is set; each
+    # poll is one os.stat per path, so dozens of saves stay cheap
+    watches = watch_targets(paths, out)
+    settle_ns = int(settle * 1e9)
+    while stop is None or not stop.is_set():
+        now = time.monotonic_ns()
+        for w in watches:
+            status = check_watch(w, now, settle_ns)
+            if status:
+                log(f"{time.strftime('%H:%M:%S')} {w.path}: {status}")
+        if stop is None:
+            time.sleep(poll)
+        else:
+            stop.wait(poll)
+    return watches
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse playerInfo.dat with a full MS-NRBF decoder (staged v13)")
+    parser.add_argument("file", nargs="+", help="Path to playerInfo.dat (- for stdin); several only with --watch")
+    parser.add_argument("--out", default="out", help="Output folder")
+    parser.add_argument("--zero-copy", action="store_true", help="Decode over a memoryview and materialise strings lazily")
+    parser.add_argument("--no-mmap", action="store_true", help="Read the file into memory instead of mapping it")
+    parser.add_argument("--no-cache", action="store_true", help="Always decode; neither read nor write the parse cache")
+    parser.add_argument("--cache-dir", help=f"Parse cache folder (default: ${parse_cache.CACHE_ENV} or ~/.cache/the-tower/playerinfo)")
+    parser.add_argument("--cache-max-mb", type=int, default=parse_cache.DEFAULT_MAX_BYTES >> 20, help="Evict least recently used results above this size")
+    parser.add_argument("--summary-only", action="store_true", help="Only count records, bytes and classes; no JSON mapping")
+    parser.add_argument("--strings-only", action="store_true", help="Only scan for strings, library and class/member names; no decode")
+    parser.add_argument("--profile", action="store_true", help="Time load, decode, mapping, output and each record type and class (bypasses the cache)")
+    parser.add_argument("--watch", action="store_true", help="Keep polling the saves; re-parse on content change, rewrite outputs when the result changes")
+    parser.add_argument("--poll", type=float, default=1.0, help="Seconds between stat polls in --watch mode")
+    parser.add_argument("--settle", type=float, default=0.5, help="Seconds a save must be unchanged before --watch reads it")
+    args = parser.parse_intermixed_args()
+
+    if args.watch:
+        if "-" in args.file:
+            parser.error("--watch needs file paths, not stdin")
+        try:
+            watch_playerinfo(args.file, args.out, args.poll, args.settle)
+        except KeyboardInterrupt:
+            pass
+        return 0
+    if len(args.file) > 1:
+        parser.error("several files need --watch (use parse_playerinfo_batch.py for one-off runs)")
+    args.file = args.file[0]
+
+    if args.summary_only:
+        return print_summary(summarize_playerinfo(args.file, use_mmap=not args.no_mmap), args.out)
+    if args.strings_only:
+        return print_strings(strings_playerinfo(args.file, use_mmap=not args.no_mmap), args.out)
+
+    cache = None if args.no_cache else parse_cache.ParseCache(args.cache_dir, args.cache_max_mb << 20)
+    result = parse_playerinfo(args.file, zero_copy=args.zero_copy, use_mmap=not args.no_mmap, cache=cache, profile=args.profile)
+    t0 = time.perf_counter_ns()
+    schema_path, raw_path = write_outputs(result, args.out)
+    write_ns = time.perf_counter_ns() - t0
+
+    counts = count_schema_fields(result)
+    print("Parsing complete (v13).")
+    for bucket in ["currencies","towers","cards","modules","labs","relics","research","workshop_upgrades"]:
+        print(f"✔ {bucket}: {counts[bucket]} fields mapped")
+    print(f"❌ {counts['_raw']} fields left in _raw (see {raw_path})")
+    if result["_meta"].get("cache", {}).get("status") == "hit":
+        print("Result served from the parse cache")
+    binary = result["_meta"].get("nrbf")
+    if binary:
+        print(f"Root object: {binary['root_class']}")
+        print("Record counts:")
+        for rtype, count in binary["record_summary"].items():
+            print(f"  {rtype}: {count}")
+        if "error" in binary:
+            print(f"⚠ decoder stopped: {binary['error']}")
+        for span in binary.get("skipped", []):
+            print(f"⚠ skipped bytes {span['start']}-{span['end']}: {span['error']}")
+    if args.profile:
+        profile = result["_meta"]["profile"]
+        # The output files cannot time their own writing: the full report,
+        # write phase included, goes to a sidecar as well
+        profile["phases"]["write_ns"] = write_ns
+        profile_path = os.path.join(args.out, "playerInfo_profile.json")
+        with open(profile_path, "w", encoding="utf-8") as f:
+            json.dump(profile, f, indent=2)
+        print_profile(profile)
+        print(f"Profile written to {profile_path}")
+
+def print_profile(profile: Dict[str, Any], top: int = 15):
+    phases = profile["phases"]
+    total = sum(phases.values()) or 1
+    print("Profile (phases):")
+    for phase, ns in sorted(phases.items(), key=lambda kv: -kv[1]):
+        print(f"  {phase[:-3]:8s} {ns / 1e6:>10.2f} ms  {100 * ns / total:5.1f}%")
+    decode_ns = profile["ns"] or 1
+    for title, rows in (("record types", profile["records"]), ("classes", profile["classes"])):
+        print(f"Profile ({title}, top {min(top, len(rows))} of {len(rows)} by decode time):")
+        for row in rows[:top]:
+            print(f"  {row['name'][:60]:60s} {row['count']:>9d} x {row['bytes']:>11d} B {row['ns'] / 1e6:>10.2f} ms"
+                  f"  {100 * row['ns'] / decode_ns:5.1f}%")
+
+def print_summary(summary: Dict[str, Any], out_dir: str, top: int = 20):
+    os.makedirs(out_dir, exist_ok=True)
+    summary_path = os.path.join(out_dir, "playerInfo_summary.json")
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    if "record_summary" not in summary:
+        print(f"Summary skipped: {summary['_note']} (route {summary['route']})")
+        return 1
+    print(f"Summary complete (v13): {summary['bytes']} bytes in {summary['summary_ns'] / 1e6:.1f} ms")
+    print("Record counts:")
+    for rtype, count in summary["record_summary"].items():
+        print(f"  {rtype}: {count} ({summary['record_bytes'][rtype]} bytes)")
+    classes = summary["class_summary"]
+    print(f"Classes ({len(classes)}, top {min(top, len(classes))} by instances):")
+    for name, count in itertools.islice(classes.items(), top):
+        print(f"  {name}: {count}")
+    if "error" in summary:
+        print(f"⚠ decoder stopped: {summary['error']}")
+    print(f"Summary written to {summary_path}")
+    return 0
+
+def print_strings(found: Dict[str, Any], out_dir: str, top: int = 20):
+    os.makedirs(out_dir, exist_ok=True)
+    strings_path = os.path.join(out_dir, "playerInfo_strings.json")
+    with open(strings_path, "w", encoding="utf-8") as f:
+        json.dump(found, f, indent=2, ensure_ascii=False)
+    if "strings" not in found:
+        print(f"String scan skipped: {found['_note']} (route {found['route']})")
+        return 1
+    print(f"String scan complete (v13): {found['bytes']} bytes in {found['scan_ns'] / 1e6:.1f} ms")
+    print(f"Strings: {len(found['strings'])}")
+    print("Libraries:")
+    for name in found["libraries"].values():
+        print(f"  {name}")
+    classes = found["classes"]
+    print(f"Classes ({len(classes)}, first {min(top, len(classes))}):")
+    for name, members in itertools.islice(classes.items(), top):
+        print(f"  {name} ({len(members)} members)")
+    print(f"Strings written to {strings_path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
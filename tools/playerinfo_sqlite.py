@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+import argparse, datetime, json, os, sqlite3, sys, time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    from tools import nrbf, parse_cache
+    from tools import parse_playerinfo_staged_v13 as parser
+    from tools.parse_playerinfo_batch import DEFAULT_PATTERN, expand_inputs
+except ImportError:  # run as a script from inside tools/
+    import nrbf, parse_cache
+    import parse_playerinfo_staged_v13 as parser
+    from parse_playerinfo_batch import DEFAULT_PATTERN, expand_inputs
+
+# Mapped categories of many saves in one SQLite file. Each save is one
+# snapshot, keyed by (player, snapshot time). Its fields go into one table
+# indexed on (category, key, snapshot), so "cards.X over time" is an index
+# range scan. Every category also gets a view of the same name.
+CATEGORIES = ("currencies", "towers", "cards", "modules", "labs", "relics", "research", "workshop_upgrades")
+DEFAULT_DB = os.path.join("out", "playerinfo.sqlite")
+# Save members that name the player and date the save, in order of preference
+PLAYER_KEYS = ("playfabID", "userName")
+SNAPSHOT_KEYS = ("lastCloudSaveTime",)
+
+_TICKS_EPOCH = datetime.datetime(1, 1, 1)
+_INT64_MIN, _INT64_MAX = -(1 << 63), (1 << 63) - 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    player TEXT NOT NULL,
+    snapshot TEXT NOT NULL,
+    source TEXT,
+    method TEXT,
+    fields INTEGER NOT NULL,
+    imported_at TEXT NOT NULL,
+    PRIMARY KEY (player, snapshot)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS fields (
+    player TEXT NOT NULL,
+    snapshot TEXT NOT NULL,
+    category TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value,
+    json TEXT,
+    PRIMARY KEY (player, snapshot, category, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS fields_category_key_snapshot ON fields (category, key, snapshot);
+""" + "".join(
+    f"CREATE VIEW IF NOT EXISTS {c} AS SELECT player, snapshot, key, value, json FROM fields WHERE category = '{c}';\n"
+    for c in CATEGORIES)
+
+_INSERT_FIELD = "INSERT INTO fields (player, snapshot, category, key, value, json) VALUES (?, ?, ?, ?, ?, ?)"
+
+def connect(path: str) -> sqlite3.Connection:
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    db = sqlite3.connect(path)
+    # WAL lets readers query the history while an import is running
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(SCHEMA)
+    return db
+
+def ticks_to_iso(ticks: int) -> str:
+    # .NET DateTime ticks (100 ns since 0001-01-01) as fixed-width UTC text,
+    # so snapshots sort and compare as strings
+    when = _TICKS_EPOCH + datetime.timedelta(microseconds=ticks // 10)
+    return when.isoformat(timespec="microseconds") + "Z"
+
+def _field(result: Dict[str, Any], names) -> Any:
+    # First of names present in any bucket (classification rules move keys)
+    for name in names:
+        for bucket, items in result.items():
+            if bucket != "_meta" and isinstance(items, dict) and items.get(name) not in (None, "", 0):
+                return items[name]
+    return None
+
+def snapshot_key(result: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    # (player, snapshot) as the save itself records them; either is None
+    # when absent
+    player = _field(result, PLAYER_KEYS)
+    ticks = _field(result, SNAPSHOT_KEYS)
+    snapshot = ticks_to_iso(ticks) if isinstance(ticks, int) else None
+    return (str(player) if player is not None else None), snapshot
+
+def file_snapshot(source: Optional[str]) -> Optional[str]:
+    # A save file's mtime in the same form, for saves without a save time
+    if not source or not os.path.exists(source):
+        return None
+    mtime = datetime.datetime.fromtimestamp(os.path.getmtime(source), datetime.timezone.utc)
+    return mtime.replace(tzinfo=None).isoformat(timespec="microseconds") + "Z"
+
+def _columns(value: Any) -> Tuple[Any, Optional[str]]:
+    # (value, json): scalars are stored as themselves, anything else as JSON
+    if value is None or isinstance(value, (float, str)):
+        return value, None
+    if isinstance(value, int):
+        # bool is an int; SQLite integers are 64-bit, wider values (UInt64) keep their digits as text
+        return (int(value) if _INT64_MIN <= value <= _INT64_MAX else str(value)), None
+    if isinstance(value, nrbf.StringSpan):
+        return str(value), None
+    return None, json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=nrbf.json_default)
+
+def field_rows(result: Dict[str, Any], player: str, snapshot: str) -> Iterator[tuple]:
+    for category in CATEGORIES:
+        for key, value in result.get(category, {}).items():
+            yield (player, snapshot, category, key) + _columns(value)
+
+def export_result(db: sqlite3.Connection, result: Dict[str, Any], player: Optional[str] = None,
+                  snapshot: Optional[str] = None, source: Optional[str] = None) -> Dict[str, Any]:
+    # One transaction per save: an existing (player, snapshot) is replaced
+    # whole, so a re-import never leaves a mix of old and new fields.
+    # What the save records wins; player and snapshot only fill in what it
+    # lacks, and the file's mtime comes last.
+    found_player, found_snapshot = snapshot_key(result)
+    player = found_player or player
+    snapshot = found_snapshot or snapshot or file_snapshot(source)
+    if player is None or snapshot is None:
+        raise ValueError(f"cannot tell the {'player' if player is None else 'snapshot time'} of {source or 'this save'}; pass it explicitly")
+    imported_at = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None).isoformat(timespec="seconds") + "Z"
+    with db:
+        db.execute("DELETE FROM fields WHERE player = ? AND snapshot = ?", (player, snapshot))
+        cur = db.executemany(_INSERT_FIELD, field_rows(result, player, snapshot))
+        fields = cur.rowcount
+        db.execute("INSERT OR REPLACE INTO snapshots (player, snapshot, source, method, fields, imported_at) "
+                   "VALUES (?, ?, ?, ?, ?, ?)",
+                   (player, snapshot, source, result.get("_meta", {}).get("method"), fields, imported_at))
+    return {"player": player, "snapshot": snapshot, "fields": fields}
+
+def export_files(db: sqlite3.Connection, paths: List[str], player: Optional[str] = None,
+                 cache: "parse_cache.ParseCache" = None) -> List[Dict[str, Any]]:
+    rows = []
+    for path in paths:
+        row = {"file": path}
+        t0 = time.perf_counter()
+        try:
+            result = parser.parse_playerinfo(path, cache=cache)
+            row.update(export_result(db, result, player=player, source=path))
+        except Exception as e:
+            row["error"] = f"{type(e).__name__}: {e}"
+        row["seconds"] = round(time.perf_counter() - t0, 6)
+        rows.append(row)
+    return rows
+
+def main():
+    ap = argparse.ArgumentParser(description="Load mapped playerInfo categories from many saves into SQLite (staged v13)")
+    ap.add_argument("inputs", nargs="+", help="Save files, directories or glob patterns")
+    ap.add_argument("--db", default=DEFAULT_DB, help="SQLite database to create or add to")
+    ap.add_argument("--player", help="Player id for saves that do not name one (default: playfabID, then userName)")
+    ap.add_argument("--pattern", default=DEFAULT_PATTERN, help="File pattern used inside directories")
+    ap.add_argument("--recursive", action="store_true", help="Search directories recursively")
+    ap.add_argument("--no-cache", action="store_true", help="Always decode; neither read nor write the parse cache")
+    ap.add_argument("--cache-dir", help=f"Parse cache folder (default: ${parse_cache.CACHE_ENV} or ~/.cache/the-tower/playerinfo)")
+    args = ap.parse_intermixed_args()
+
+    paths = [path for path, _ in expand_inputs(args.inputs, args.pattern, args.recursive)]
+    if not paths:
+        print("No input files matched.")
+        return 1
+    cache = None if args.no_cache else parse_cache.ParseCache(args.cache_dir)
+    t0 = time.perf_counter()
+    db = connect(args.db)
+    try:
+        rows = export_files(db, paths, player=args.player, cache=cache)
+    finally:
+        db.close()
+    failed = [row for row in rows if "error" in row]
+    print(f"Exported {len(rows) - len(failed)}/{len(rows)} saves "
+          f"({sum(row.get('fields', 0) for row in rows)} fields) to {args.db} in {time.perf_counter() - t0:.2f}s")
+    for row in failed:
+        print(f"❌ {row['file']}: {row['error']}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())